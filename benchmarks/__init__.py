@@ -0,0 +1,10 @@
+import os
+
+# Бенчмарки работают офлайн: подставляем фиктивные настройки, если .env не задан
+os.environ.setdefault("BOT_TOKEN", "123456:BENCHMARK")
+os.environ.setdefault("CHAT_ID", "-1001")
+os.environ.setdefault("CHANNEL_ID", "-1002")
+os.environ.setdefault("SHARECHAT_ID", "-1003")
+os.environ.setdefault("OWNER_ID", "1")
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///benchmark.db")
+os.environ.setdefault("WEBHOOK_SECRET", "benchmark-secret")
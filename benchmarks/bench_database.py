@@ -0,0 +1,116 @@
+"""
+Пропускная способность базы на нагрузке count_messages: движок с настройками
+по умолчанию против build_engine() (пул соединений и PRAGMA для SQLite,
+настройки пула и кэш подготовленных запросов для PostgreSQL).
+
+Каждое сообщение - отдельная транзакция с upsert счётчика пользователя,
+как в исходном count_messages; несколько сообщений обрабатываются параллельно.
+Для сравнения отдельно измеряется запись того же объёма пачками MessageCounter.
+
+Запуск из корня проекта (по умолчанию SQLite во временном каталоге,
+можно передать адрес другой базы - только пустой: бенчмарк пересоздаёт
+в ней таблицы бота и удаляет их в конце, базу с таблицами он не трогает):
+    python -m benchmarks.bench_database [DATABASE_URL]
+"""
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import List
+
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from database.base import Base
+from database.database import build_engine
+from database.repository import bulk_add_message_counts
+
+MESSAGES = 3000
+CONCURRENCY = 20
+USERS = 300
+CHAT_ID = -1001
+
+
+async def run(name: str, engine: AsyncEngine) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    session_factory = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    rnd = random.Random(0)
+    users = [rnd.randrange(USERS) for _ in range(MESSAGES)]
+    queue: "asyncio.Queue[int]" = asyncio.Queue()
+    for user_id in users:
+        queue.put_nowait(user_id)
+
+    async def worker() -> None:
+        while not queue.empty():
+            user_id = queue.get_nowait()
+            async with session_factory() as session:
+                async with session.begin():
+                    await bulk_add_message_counts(session, [(CHAT_ID, user_id, 1, datetime.utcnow())])
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(CONCURRENCY)))
+    elapsed = time.perf_counter() - start
+    print(f"{name}: {MESSAGES / elapsed:.0f} транзакций/с (по одной на сообщение)")
+
+    start = time.perf_counter()
+    for offset in range(0, MESSAGES, 500):
+        counts = {}
+        for user_id in users[offset:offset + 500]:
+            counts[user_id] = counts.get(user_id, 0) + 1
+        async with session_factory() as session:
+            async with session.begin():
+                await bulk_add_message_counts(
+                    session, [(CHAT_ID, user_id, delta, datetime.utcnow()) for user_id, delta in counts.items()]
+                )
+    elapsed = time.perf_counter() - start
+    print(f"{name}: {MESSAGES / elapsed:.0f} сообщений/с пачками по 500")
+
+    await engine.dispose()
+
+
+async def existing_tables(url: str) -> List[str]:
+    engine = create_async_engine(url)
+    try:
+        async with engine.connect() as conn:
+            return await conn.run_sync(lambda sync_conn: inspect(sync_conn).get_table_names())
+    finally:
+        await engine.dispose()
+
+
+async def drop_tables(url: str) -> None:
+    engine = create_async_engine(url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    await engine.dispose()
+
+
+async def main() -> None:
+    if len(sys.argv) > 1:
+        url = sys.argv[1]
+        # drop_all в run() стёр бы данные настоящей базы бота
+        tables = await existing_tables(url)
+        if tables:
+            sys.exit(f"В базе уже есть таблицы ({', '.join(sorted(tables))}), нужна пустая база")
+        try:
+            await run("по умолчанию", create_async_engine(url))
+            await run("build_engine", build_engine(url))
+        finally:
+            await drop_tables(url)
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        default_url = f"sqlite+aiosqlite:///{os.path.join(directory, 'default.db')}"
+        tuned_url = f"sqlite+aiosqlite:///{os.path.join(directory, 'tuned.db')}"
+        await run("по умолчанию", create_async_engine(default_url))
+        await run("build_engine", build_engine(tuned_url))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
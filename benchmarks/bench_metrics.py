@@ -0,0 +1,107 @@
+"""
+Накладные расходы сбора показателей на горячем пути.
+
+1. Стоимость Counter.inc и Histogram.observe.
+2. Обработка потока обновлений диспетчером с middleware показателей и без них
+   (обработчик пустой, запросы к Bot API идут в фиктивную сессию).
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_metrics
+"""
+import asyncio
+import time
+from typing import List
+
+from aiogram import Bot, Dispatcher, Router
+from aiogram.types import Message, Update
+
+from benchmarks.fake_session import FakeSession
+from config import get_settings
+from middlewares.metrics import api_metrics, handler_metrics, update_metrics
+from utils.metrics import MetricsRegistry, registry
+
+ITERATIONS = 200_000
+UPDATES = 20_000
+
+settings = get_settings()
+
+
+def bench_primitives() -> None:
+    local = MetricsRegistry()
+    counter = local.counter("bench_total", "bench", ["type"])
+    histogram = local.histogram("bench_seconds", "bench", ["handler"])
+
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        pass
+    empty = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        counter.inc("message")
+    print(f"Counter.inc: {(time.perf_counter() - start - empty) / ITERATIONS * 1e9:.0f} нс")
+
+    start = time.perf_counter()
+    for i in range(ITERATIONS):
+        histogram.observe(0.0003, "user_commands.show_top_users")
+    print(f"Histogram.observe: {(time.perf_counter() - start - empty) / ITERATIONS * 1e9:.0f} нс")
+
+
+def make_updates(bot: Bot) -> List[Update]:
+    return [
+        Update.model_validate({
+            "update_id": i,
+            "message": {
+                "message_id": i,
+                "date": int(time.time()),
+                "chat": {"id": settings.CHAT_ID, "type": "supergroup", "title": "bench"},
+                "from": {"id": 1000 + i % 50, "is_bot": False, "first_name": "User"},
+                "text": f"сообщение {i}",
+            },
+        }, context={"bot": bot})
+        for i in range(UPDATES)
+    ]
+
+
+async def bench_dispatcher(instrumented: bool) -> float:
+    dp = Dispatcher()
+    router = Router()
+
+    @router.message()
+    async def echo(message: Message):
+        await message.bot.get_me()
+
+    dp.include_router(router)
+    session = FakeSession()
+    if instrumented:
+        dp.update.outer_middleware(update_metrics)
+        for event_name, observer in dp.observers.items():
+            if event_name not in ("update", "error"):
+                observer.middleware(handler_metrics)
+        session.middleware(api_metrics)
+
+    bot = Bot(token=settings.BOT_TOKEN, session=session)
+    updates = make_updates(bot)
+    start = time.perf_counter()
+    for update in updates:
+        await dp.feed_update(bot, update)
+    return (time.perf_counter() - start) / UPDATES * 1e6
+
+
+async def main() -> None:
+    bench_primitives()
+    # Первый прогон прогревает кэши aiogram и pydantic
+    await bench_dispatcher(False)
+    plain = await bench_dispatcher(False)
+    instrumented = await bench_dispatcher(True)
+    print(f"Обновление без показателей: {plain:.1f} мкс")
+    print(f"Обновление с показателями: {instrumented:.1f} мкс (+{instrumented - plain:.1f} мкс, "
+          f"{(instrumented / plain - 1) * 100:.1f}%)")
+
+    start = time.perf_counter()
+    text = registry.render()
+    print(f"Вывод /metrics: {len(text.splitlines())} строк за {(time.perf_counter() - start) * 1000:.2f} мс")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
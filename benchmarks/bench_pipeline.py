@@ -0,0 +1,236 @@
+"""
+Пропускная способность полного конвейера обработки обновлений: настоящий
+диспетчер из bot.py (все роутеры и middleware) и фоновые службы, база SQLite,
+Bot API заменён фиктивной сессией с заготовленными ответами. На сессии стоят
+те же middleware, что в bot.py (планировщик запросов и замеры API), но лимиты
+планировщика подняты: иначе ответы в один чат упирались бы в 20 сообщений в минуту,
+и замерялись бы квоты Telegram, а не стоимость обработки. Очереди под лимитами
+Telegram показывает benchmarks.load_test.
+
+Сценарии:
+1. chatter - обычная переписка в чате;
+2. forbidden - сообщения с запрещёнными словами (удаление, предупреждения, баны);
+3. commands - пользовательские команды и /stats от администратора;
+4. joins - волна входов новых участников (chat_member);
+5. recorded - обновления из файла JSONL (по одному Update в строке), если он указан.
+
+Обновления подаются в dp.feed_update по одному, поэтому задержка каждого
+измеряется без влияния соседних. Для каждого сценария выводятся обновлений
+в секунду, p50/p99 задержки, запросы к Bot API и SQL-запросы на обновление
+(включая пачечную запись счётчиков и имён после сценария).
+
+База всегда отдельная (benchmark.db в текущем каталоге, удаляется после
+прогона): DATABASE_URL из окружения игнорируется, чтобы не писать в рабочую базу.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_pipeline [updates.jsonl]
+"""
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from typing import Any, Dict, List
+
+# До импорта настроек: DATABASE_URL из окружения может указывать на рабочую базу бота
+BENCHMARK_DATABASE_URL = "sqlite+aiosqlite:///benchmark.db"
+os.environ["DATABASE_URL"] = BENCHMARK_DATABASE_URL
+
+from aiogram import Bot, Dispatcher
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.types import Update
+from sqlalchemy import event
+
+from benchmarks.fake_session import FakeSession
+from bot import setup_dispatcher, setup_session, start_services, stop_services
+from config import get_settings
+from database.database import engine, init_db
+from middlewares.request_scheduler import OutgoingRequestScheduler
+from utils.message_counter import message_counter
+from utils.user_directory import user_directory
+
+CHATTER_UPDATES = 5000
+FORBIDDEN_UPDATES = 500
+COMMAND_UPDATES = 1000
+JOIN_UPDATES = 1000
+USERS = 2000
+ADMIN_USER_ID = 500
+# Лимиты планировщика в бенчмарке: запросов в секунду, фактически без ожидания
+UNTHROTTLED_RATE = 1_000_000
+
+DB_FILES = ("benchmark.db", "benchmark.db-wal", "benchmark.db-shm")
+
+settings = get_settings()
+
+WORDS = (
+    "привет всем кто знает как настроить роутер дома вчера обновил прошивку "
+    "и теперь ничего не работает python docker kubernetes деплой сервер база "
+    "данных запрос индекс миграция тест ревью коммит ветка релиз"
+).split()
+COMMANDS = ("/ping", "/top", "/rules", "/help", "/about")
+
+
+class UpdateFactory:
+    def __init__(self, seed: int = 1):
+        self.random = random.Random(seed)
+        self.update_id = 0
+        self.message_id = 0
+
+    def _user(self, user_id: int) -> Dict[str, Any]:
+        return {"id": user_id, "is_bot": False, "first_name": f"User {user_id}", "username": f"user{user_id}"}
+
+    def message(self, user_id: int, text: str) -> Dict[str, Any]:
+        self.update_id += 1
+        self.message_id += 1
+        return {
+            "update_id": self.update_id,
+            "message": {
+                "message_id": self.message_id,
+                "date": int(time.time()),
+                "chat": {"id": settings.CHAT_ID, "type": "supergroup", "title": "Benchmark"},
+                "from": self._user(user_id),
+                "text": text,
+            },
+        }
+
+    def chatter(self, count: int) -> List[Dict[str, Any]]:
+        return [
+            self.message(
+                1000 + self.random.randrange(USERS),
+                " ".join(self.random.choice(WORDS) for _ in range(self.random.randint(3, 20))),
+            )
+            for _ in range(count)
+        ]
+
+    def forbidden(self, count: int) -> List[Dict[str, Any]]:
+        words = settings.FORBIDDEN_WORDS
+        return [
+            self.message(
+                1000 + self.random.randrange(USERS // 10),
+                f"{self.random.choice(WORDS)} {self.random.choice(words)} {self.random.choice(WORDS)}",
+            )
+            for _ in range(count)
+        ]
+
+    def commands(self, count: int) -> List[Dict[str, Any]]:
+        updates = []
+        for i in range(count):
+            if i % 10 == 0:
+                updates.append(self.message(ADMIN_USER_ID, "/stats"))
+            else:
+                updates.append(self.message(1000 + self.random.randrange(USERS), self.random.choice(COMMANDS)))
+        return updates
+
+    def joins(self, count: int) -> List[Dict[str, Any]]:
+        updates = []
+        for i in range(count):
+            self.update_id += 1
+            user = self._user(100_000 + i)
+            updates.append({
+                "update_id": self.update_id,
+                "chat_member": {
+                    "chat": {"id": settings.CHAT_ID, "type": "supergroup", "title": "Benchmark"},
+                    "from": user,
+                    "date": int(time.time()),
+                    "old_chat_member": {"status": "left", "user": user},
+                    "new_chat_member": {"status": "member", "user": user},
+                },
+            })
+        return updates
+
+
+def load_recorded(path: str) -> List[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+class StatementCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+async def run_scenario(name: str, raw_updates: List[Dict[str, Any]], dp: Dispatcher, bot: Bot,
+                       session: FakeSession, statements: StatementCounter) -> None:
+    updates = [Update.model_validate(update, context={"bot": bot}) for update in raw_updates]
+    api_before = len(session.requests)
+    statements_before = statements.count
+    latencies = []
+
+    started = time.perf_counter()
+    for update in updates:
+        update_started = time.perf_counter()
+        await dp.feed_update(bot, update)
+        latencies.append(time.perf_counter() - update_started)
+    elapsed = time.perf_counter() - started
+
+    # Счётчики сообщений и имена пишутся в базу пачками: их запись относится к этому сценарию
+    await message_counter.flush()
+    await user_directory.flush()
+
+    latencies.sort()
+    count = len(updates)
+    print(
+        f"{name:<10} {count / elapsed:>8.0f} обн/с   "
+        f"p50 {percentile(latencies, 50) * 1000:>6.2f} мс   p99 {percentile(latencies, 99) * 1000:>6.2f} мс   "
+        f"API {(len(session.requests) - api_before) / count:>5.2f}/обн   "
+        f"SQL {(statements.count - statements_before) / count:>5.2f}/обн"
+    )
+
+
+def remove_database() -> None:
+    for path in DB_FILES:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+async def main() -> None:
+    if settings.DATABASE_URL != BENCHMARK_DATABASE_URL:
+        sys.exit(f"Настройки загружены раньше бенчмарка, база {settings.DATABASE_URL} не тронута")
+    remove_database()
+    await init_db()
+
+    statements = StatementCounter()
+    event.listen(engine.sync_engine, "before_cursor_execute", statements)
+
+    session = FakeSession(admins=[ADMIN_USER_ID])
+    scheduler = OutgoingRequestScheduler(
+        global_rate=UNTHROTTLED_RATE,
+        group_rate=UNTHROTTLED_RATE,
+        private_rate=UNTHROTTLED_RATE,
+        burst=UNTHROTTLED_RATE,
+        max_retries=settings.API_MAX_RETRIES,
+        max_queue=settings.API_MAX_QUEUE,
+    )
+    setup_session(session, scheduler)
+    bot = Bot(token=settings.BOT_TOKEN, session=session)
+    dp = Dispatcher(storage=MemoryStorage())
+    setup_dispatcher(dp)
+    await start_services(bot)
+
+    print("Сессия: планировщик запросов без лимитов Telegram и замеры API, как в bot.py")
+    factory = UpdateFactory()
+    try:
+        # Прогрев: кэши aiogram, pydantic, участников и подготовленные запросы
+        await run_scenario("warmup", factory.chatter(500), dp, bot, session, statements)
+        await run_scenario("chatter", factory.chatter(CHATTER_UPDATES), dp, bot, session, statements)
+        await run_scenario("forbidden", factory.forbidden(FORBIDDEN_UPDATES), dp, bot, session, statements)
+        await run_scenario("commands", factory.commands(COMMAND_UPDATES), dp, bot, session, statements)
+        await run_scenario("joins", factory.joins(JOIN_UPDATES), dp, bot, session, statements)
+        if len(sys.argv) > 1:
+            await run_scenario("recorded", load_recorded(sys.argv[1]), dp, bot, session, statements)
+    finally:
+        await stop_services()
+        await engine.dispose()
+        remove_database()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,64 @@
+"""
+Бенчмарк трекера частоты сообщений спам-фильтра: прежний defaultdict(list)
+против RateTracker на 100k разных пользователей. Меряется занятая память
+(tracemalloc) и стоимость учёта одного сообщения.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_rate_tracker
+"""
+import random
+import time
+import tracemalloc
+from collections import defaultdict
+
+from utils.rate_tracker import RateTracker
+
+USERS = 100_000
+MESSAGES = 500_000
+WINDOW = 10
+LIMIT = 5
+
+
+def legacy_hit(user_messages, user_id, now):
+    # Прежняя логика SpamFilter: пересборка списка на каждое сообщение
+    user_messages[user_id] = [t for t in user_messages[user_id] if now - t < WINDOW]
+    user_messages[user_id].append(now)
+    return len(user_messages[user_id])
+
+
+def run(name, hit):
+    rnd = random.Random(0)
+    # Половина сообщений от небольшого ядра активных участников, остальное - длинный хвост
+    stream = [
+        rnd.randrange(500) if rnd.random() < 0.5 else rnd.randrange(USERS)
+        for _ in range(MESSAGES)
+    ]
+    now = 0.0
+    tracemalloc.start()
+    start = time.perf_counter()
+    for user_id in stream:
+        now += 0.01  # 100 сообщений в секунду
+        hit(user_id, now)
+    elapsed = time.perf_counter() - start
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"{name}: {memory / 1024 / 1024:.1f} MB, {elapsed / MESSAGES * 1e6:.2f} мкс/сообщ.")
+
+
+def main() -> None:
+    legacy = defaultdict(list)
+    run("defaultdict(list)", lambda user_id, now: legacy_hit(legacy, user_id, now))
+
+    tracker = RateTracker(window=WINDOW, limit=LIMIT, max_keys=USERS)
+    run("RateTracker", tracker.hit)
+
+    removed = tracker.sweep(now=MESSAGES * 0.01)
+    print(f"RateTracker после sweep: удалено {removed}, осталось {len(tracker)} пользователей")
+
+    capped = RateTracker(window=WINDOW, limit=LIMIT, max_keys=10_000)
+    run("RateTracker (max_keys=10000)", capped.hit)
+    print(f"RateTracker (max_keys=10000): {capped.get_stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Сквозная задержка доставки обновлений: long polling против webhook.
+
+Для polling обновления кладутся в фиктивную сессию, которую опрашивает
+dp.start_polling. Для webhook они отправляются POST-запросами на локальный
+сервер из utils.webhook с заголовком секретного токена. Задержка - время
+от отправки обновления до входа в обработчик. Сетевой путь до Telegram
+не моделируется: сравнивается только накладной расход бота.
+
+Запуск из корня проекта (можно передать файл с записанными обновлениями,
+по одному JSON на строку):
+    python -m benchmarks.bench_webhook [updates.jsonl]
+"""
+import asyncio
+import json
+import statistics
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+from aiogram import Bot, Dispatcher
+from aiogram.types import Message
+from aiohttp import web
+
+from benchmarks.fake_session import FakeSession
+from config import get_settings
+from utils.webhook import ConcurrencyLimitMiddleware, create_app
+
+UPDATES = 2000
+INTERVAL = 0.002  # секунды между обновлениями
+PORT = 8081
+
+settings = get_settings()
+
+
+def synthetic_updates(count: int) -> List[Dict[str, Any]]:
+    return [
+        {
+            "update_id": i,
+            "message": {
+                "message_id": i,
+                "date": int(time.time()),
+                "chat": {"id": settings.CHAT_ID, "type": "supergroup", "title": "bench"},
+                "from": {"id": 1000 + i % 50, "is_bot": False, "first_name": "User"},
+                "text": f"сообщение {i}",
+            },
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+def load_updates(path: str) -> List[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        updates = [json.loads(line) for line in f if line.strip()]
+    # Перенумеровываем, чтобы задержку можно было сопоставить по update_id
+    for i, update in enumerate(updates, 1):
+        update["update_id"] = i
+    return updates
+
+
+def build_dispatcher(sent: Dict[int, float], latencies: List[float], done: asyncio.Event, total: int,
+                     limiter: Optional[ConcurrencyLimitMiddleware] = None) -> Dispatcher:
+    dp = Dispatcher()
+    # Как в bot.py: ограничитель стоит первым, задержка считается до входа в обработку
+    if limiter is not None:
+        dp.update.outer_middleware(limiter)
+
+    @dp.update.outer_middleware()
+    async def measure(handler, event, data):
+        latencies.append(time.perf_counter() - sent[event.update_id])
+        if len(latencies) == total:
+            done.set()
+        return await handler(event, data)
+
+    @dp.message()
+    async def echo(message: Message):
+        pass
+
+    return dp
+
+
+def report(name: str, latencies: List[float]) -> None:
+    latencies = sorted(latencies)
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+    print(f"{name}: {len(latencies)} обновлений, mean {statistics.mean(latencies) * 1000:.2f} мс, "
+          f"p50 {p50:.2f} мс, p99 {p99:.2f} мс")
+
+
+async def run_polling(updates: List[Dict[str, Any]]) -> None:
+    sent: Dict[int, float] = {}
+    latencies: List[float] = []
+    done = asyncio.Event()
+    dp = build_dispatcher(sent, latencies, done, len(updates))
+    session = FakeSession()
+    bot = Bot(token=settings.BOT_TOKEN, session=session)
+
+    polling = asyncio.create_task(dp.start_polling(bot, polling_timeout=1, handle_signals=False))
+    await asyncio.sleep(0.1)
+    for update in updates:
+        sent[update["update_id"]] = time.perf_counter()
+        session.updates.put_nowait(update)
+        await asyncio.sleep(INTERVAL)
+    await asyncio.wait_for(done.wait(), timeout=30)
+    await dp.stop_polling()
+    await polling
+    report("polling", latencies)
+
+
+async def run_webhook(updates: List[Dict[str, Any]]) -> None:
+    sent: Dict[int, float] = {}
+    latencies: List[float] = []
+    done = asyncio.Event()
+    limiter = ConcurrencyLimitMiddleware(settings.WEBHOOK_MAX_CONCURRENT_UPDATES, settings.WEBHOOK_MAX_WAITING_UPDATES)
+    dp = build_dispatcher(sent, latencies, done, len(updates), limiter)
+    bot = Bot(token=settings.BOT_TOKEN, session=FakeSession())
+
+    runner = web.AppRunner(create_app(dp, bot, limiter))
+    await runner.setup()
+    await web.TCPSite(runner, host="127.0.0.1", port=PORT).start()
+
+    url = f"http://127.0.0.1:{PORT}{settings.WEBHOOK_PATH}"
+    headers = {"X-Telegram-Bot-Api-Secret-Token": settings.WEBHOOK_SECRET or ""}
+    async with aiohttp.ClientSession() as client:
+        async with client.post(url, json=updates[0], headers={}) as response:
+            assert response.status == 401, "webhook must reject requests without the secret token"
+
+        async def post(update: Dict[str, Any]) -> None:
+            sent[update["update_id"]] = time.perf_counter()
+            async with client.post(url, json=update, headers=headers) as response:
+                response.raise_for_status()
+
+        posts = []
+        for update in updates:
+            posts.append(asyncio.create_task(post(update)))
+            await asyncio.sleep(INTERVAL)
+        await asyncio.gather(*posts)
+
+        async with client.get(f"http://127.0.0.1:{PORT}{settings.WEBHOOK_HEALTH_PATH}") as response:
+            health = await response.json()
+
+    await asyncio.wait_for(done.wait(), timeout=30)
+    await runner.cleanup()
+    report("webhook", latencies)
+    print(f"health: {health}")
+
+
+async def main() -> None:
+    updates = load_updates(sys.argv[1]) if len(sys.argv) > 1 else synthetic_updates(UPDATES)
+    await run_polling(updates)
+    await run_webhook(updates)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,212 @@
+"""
+Локальная замена api.telegram.org для нагрузочных тестов настоящего процесса бота.
+
+Сервер отдаёт getUpdates из очереди обновлений сценария (long polling с offset),
+отвечает на методы, которые вызывают обработчики (sendMessage, deleteMessage,
+getChatMember, restrictChatMember, banChatMember, getChat и др.), добавляет
+настраиваемую задержку и долю ответов 429, а каждый вызов записывает.
+Бот направляется сюда настройкой TELEGRAM_API_URL=http://host:port.
+
+Отдельный запуск (обновления можно подкладывать через POST /_push):
+    python -m benchmarks.fake_api_server [port]
+"""
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import Counter
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from aiohttp import web
+
+BOT_USER = {"id": 42, "is_bot": True, "first_name": "LoadTest", "username": "load_test_bot"}
+
+
+class ApiCall(NamedTuple):
+    at: float
+    method: str
+    params: Dict[str, Any]
+
+
+def _parse_param(value: str) -> Any:
+    # aiogram отправляет вложенные объекты и списки строками JSON
+    if value[:1] in "{[":
+        try:
+            return json.loads(value)
+        except ValueError:
+            return value
+    return value
+
+
+class FakeTelegramServer:
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, flood_rate: float = 0.0,
+                 retry_after: int = 1, admins: tuple = (), seed: int = 1):
+        self.latency = latency
+        self.jitter = jitter
+        self.flood_rate = flood_rate
+        self.retry_after = retry_after
+        self.admins = set(admins)
+        self.random = random.Random(seed)
+
+        self.calls: List[ApiCall] = []
+        self.by_method: Counter = Counter()
+        self.floods = 0
+        # Отданные боту обновления: update_id -> время первой выдачи в getUpdates
+        self.served_at: Dict[int, float] = {}
+        self.queued_at: Dict[int, float] = {}
+
+        self._updates: List[Dict[str, Any]] = []
+        self._next_update_id = 1
+        self._new_updates = asyncio.Event()
+        # Бот начал опрашивать getUpdates
+        self.polling = asyncio.Event()
+        self._message_ids = iter(range(10_000_000, 100_000_000))
+        self._runner: Optional[web.AppRunner] = None
+
+    # --- обновления сценария ---
+
+    def push(self, kind: str, payload: Dict[str, Any]) -> int:
+        """Ставит обновление в очередь getUpdates и возвращает его update_id"""
+        update_id = self._next_update_id
+        self._next_update_id += 1
+        self._updates.append({"update_id": update_id, kind: payload})
+        self.queued_at[update_id] = time.monotonic()
+        self._new_updates.set()
+        return update_id
+
+    @property
+    def backlog(self) -> int:
+        return len(self._updates)
+
+    async def _get_updates(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        offset = int(params.get("offset", 0))
+        limit = int(params.get("limit", 100))
+        timeout = float(params.get("timeout", 0))
+        # offset подтверждает обработку всех обновлений с меньшим id
+        if offset:
+            self._updates = [update for update in self._updates if update["update_id"] >= offset]
+        if not self._updates and timeout:
+            self._new_updates.clear()
+            try:
+                await asyncio.wait_for(self._new_updates.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        batch = self._updates[:limit]
+        now = time.monotonic()
+        for update in batch:
+            self.served_at.setdefault(update["update_id"], now)
+        return batch
+
+    # --- заготовленные ответы ---
+
+    def _chat_id(self, params: Dict[str, Any]) -> int:
+        try:
+            return int(params.get("chat_id", 0))
+        except ValueError:
+            return 0
+
+    def _user(self, user_id: int) -> Dict[str, Any]:
+        if user_id == BOT_USER["id"]:
+            return BOT_USER
+        return {"id": user_id, "is_bot": False, "first_name": f"User {user_id}"}
+
+    def _member(self, user_id: int) -> Dict[str, Any]:
+        user = self._user(user_id)
+        if user_id == BOT_USER["id"] or user_id in self.admins:
+            return {
+                "status": "administrator", "user": user, "can_be_edited": False, "is_anonymous": False,
+                "can_manage_chat": True, "can_delete_messages": True, "can_manage_video_chats": True,
+                "can_restrict_members": True, "can_promote_members": False, "can_change_info": True,
+                "can_invite_users": True, "can_post_stories": False, "can_edit_stories": False,
+                "can_delete_stories": False,
+            }
+        return {"status": "member", "user": user}
+
+    def _message(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        chat_id = self._chat_id(params)
+        return {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private" if chat_id > 0 else "supergroup"},
+            "from": BOT_USER,
+            "text": params.get("text") or params.get("caption") or "",
+        }
+
+    def _result(self, method: str, params: Dict[str, Any]) -> Any:
+        if method == "getme":
+            return BOT_USER
+        if method.startswith(("send", "copymessage", "forwardmessage", "edit")) and method != "sendchataction":
+            return self._message(params)
+        if method == "getchatmember":
+            return self._member(int(params.get("user_id", 0)))
+        if method == "getchatadministrators":
+            return [self._member(user_id) for user_id in (BOT_USER["id"], *self.admins)]
+        if method == "getchatmembercount":
+            return 1000
+        if method == "getchat":
+            chat_id = self._chat_id(params)
+            return {"id": chat_id, "type": "supergroup", "title": "Load test",
+                    "accent_color_id": 0, "max_reaction_count": 11}
+        if method == "getwebhookinfo":
+            return {"url": "", "has_custom_certificate": False, "pending_update_count": 0}
+        # deleteMessage, restrictChatMember, banChatMember, answerCallbackQuery и прочие
+        return True
+
+    # --- HTTP ---
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        form = await request.post()
+        params = {key: _parse_param(value) if isinstance(value, str) else value for key, value in form.items()}
+        key = method.lower()
+
+        if key == "getupdates":
+            self.polling.set()
+            return web.json_response({"ok": True, "result": await self._get_updates(params)})
+
+        self.calls.append(ApiCall(time.monotonic(), method, params))
+        self.by_method[method] += 1
+        if self.latency or self.jitter:
+            await asyncio.sleep(max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter)))
+        if key != "getme" and self.flood_rate and self.random.random() < self.flood_rate:
+            self.floods += 1
+            return web.json_response({
+                "ok": False,
+                "error_code": 429,
+                "description": f"Too Many Requests: retry after {self.retry_after}",
+                "parameters": {"retry_after": self.retry_after},
+            })
+        return web.json_response({"ok": True, "result": self._result(key, params)})
+
+    async def _handle_push(self, request: web.Request) -> web.Response:
+        update = await request.json()
+        kind = next(key for key in update if key != "update_id")
+        return web.json_response({"update_id": self.push(kind, update[kind])})
+
+    def create_app(self) -> web.Application:
+        app = web.Application(client_max_size=50 * 1024 * 1024)
+        app.router.add_post("/_push", self._handle_push)
+        app.router.add_route("*", "/bot{token}/{method}", self._handle)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8081) -> None:
+        self._runner = web.AppRunner(self.create_app())
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host=host, port=port).start()
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+async def _serve(port: int) -> None:
+    server = FakeTelegramServer()
+    await server.start(port=port)
+    print(f"Fake Bot API: TELEGRAM_API_URL=http://127.0.0.1:{port}")
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    asyncio.run(_serve(int(sys.argv[1]) if len(sys.argv) > 1 else 8081))
@@ -0,0 +1,102 @@
+"""
+Сессия aiogram без сети для бенчмарков: запросы к Bot API не уходят наружу,
+getUpdates отдаёт обновления из очереди, остальные методы получают заготовленные
+ответы: отправка - сообщение с новым message_id, getChatMember - участник
+(администратор для admins и самого бота), всё прочее - True.
+"""
+import asyncio
+import itertools
+from datetime import datetime, timezone
+from typing import Any, AsyncGenerator, Dict, Iterable, List, Optional
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import (
+    GetChatAdministrators,
+    GetChatMember,
+    GetChatMemberCount,
+    GetMe,
+    GetUpdates,
+    TelegramMethod,
+)
+from aiogram.types import Chat, ChatMemberAdministrator, ChatMemberMember, Message, Update, User
+
+
+def _administrator(user: User) -> ChatMemberAdministrator:
+    return ChatMemberAdministrator(
+        user=user,
+        can_be_edited=False,
+        is_anonymous=False,
+        can_manage_chat=True,
+        can_delete_messages=True,
+        can_manage_video_chats=True,
+        can_restrict_members=True,
+        can_promote_members=False,
+        can_change_info=True,
+        can_invite_users=True,
+        can_post_stories=False,
+        can_edit_stories=False,
+        can_delete_stories=False,
+    )
+
+
+class FakeSession(BaseSession):
+    def __init__(self, admins: Iterable[int] = (), **kwargs: Any):
+        super().__init__(**kwargs)
+        self.updates: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+        self.requests: List[TelegramMethod] = []
+        self.admins = set(admins)
+        self._message_ids = itertools.count(1_000_000)
+
+    def _me(self, bot: Bot) -> User:
+        return User(id=bot.id, is_bot=True, first_name="Benchmark", username="benchmark_bot")
+
+    def _user(self, bot: Bot, user_id: int) -> User:
+        if user_id == bot.id:
+            return self._me(bot)
+        return User(id=user_id, is_bot=False, first_name=f"User {user_id}")
+
+    def _canned_response(self, bot: Bot, method: TelegramMethod) -> Any:
+        if method.__returning__ is Message:
+            chat_id = method.chat_id if isinstance(getattr(method, "chat_id", None), int) else 0
+            return Message(
+                message_id=next(self._message_ids),
+                date=datetime.now(timezone.utc),
+                chat=Chat(id=chat_id, type="private" if chat_id > 0 else "supergroup"),
+                from_user=self._me(bot),
+                text=getattr(method, "text", None),
+            ).as_(bot)
+        if isinstance(method, GetChatMember):
+            user = self._user(bot, method.user_id)
+            if method.user_id == bot.id or method.user_id in self.admins:
+                return _administrator(user)
+            return ChatMemberMember(user=user)
+        if isinstance(method, GetChatAdministrators):
+            return [_administrator(self._user(bot, user_id)) for user_id in (bot.id, *self.admins)]
+        if isinstance(method, GetChatMemberCount):
+            return 100
+        return True
+
+    async def make_request(self, bot: Bot, method: TelegramMethod, timeout: Optional[int] = None) -> Any:
+        if isinstance(method, GetUpdates):
+            # Long polling: ждём первое обновление, затем забираем всё накопившееся
+            try:
+                first = await asyncio.wait_for(self.updates.get(), timeout=method.timeout or 0.1)
+            except asyncio.TimeoutError:
+                return []
+            batch = [first]
+            while not self.updates.empty():
+                batch.append(self.updates.get_nowait())
+            return [Update.model_validate(update, context={"bot": bot}) for update in batch]
+        if isinstance(method, GetMe):
+            return self._me(bot)
+
+        self.requests.append(method)
+        return self._canned_response(bot, method)
+
+    async def stream_content(self, url: str, headers: Optional[Dict[str, Any]] = None, timeout: int = 30,
+                             chunk_size: int = 65536, raise_for_status: bool = True) -> AsyncGenerator[bytes, None]:
+        yield b""
+
+    async def close(self) -> None:
+        pass
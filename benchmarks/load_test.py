@@ -0,0 +1,237 @@
+"""
+Нагрузочный тест настоящего процесса бота (polling, все middleware, база SQLite)
+против локальной замены Bot API из benchmarks.fake_api_server.
+
+Сценарий: N пользователей пишут в чат M сообщений в секунду (с долей команд
+и запрещённых слов), в момент raid-at в чат входит raid-size новых участников,
+и каждый сразу присылает серию сообщений. Bot API отвечает с задержкой
+latency ± jitter и с долей flood-rate ответов 429.
+
+Выводится:
+- пропускная способность: сколько обновлений бот забрал через getUpdates;
+- задержка выдачи: от постановки в очередь до выдачи в getUpdates;
+- задержка ответа: от постановки обновления до первого вызова API по нему
+  (ответ на команду, удаление сообщения);
+- вызовы по методам и число отданных 429.
+
+Лимиты исходящих запросов бота берутся из окружения, например API_GLOBAL_RATE.
+
+Запуск из корня проекта:
+    python -m benchmarks.load_test --users 500 --rate 50 --duration 60 --raid-at 30 --raid-size 100
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import signal
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+from benchmarks.fake_api_server import BOT_USER, FakeTelegramServer
+from config import get_settings
+
+ADMIN_USER_ID = 500
+COMMANDS = ("/ping", "/rules", "/help", "/top")
+WORDS = (
+    "привет всем кто знает как настроить роутер дома вчера обновил прошивку "
+    "и теперь ничего не работает python docker kubernetes деплой сервер база"
+).split()
+
+settings = get_settings()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--rate", type=float, default=50, help="сообщений в секунду")
+    parser.add_argument("--duration", type=float, default=30, help="секунд нагрузки")
+    parser.add_argument("--command-share", type=float, default=0.05)
+    parser.add_argument("--forbidden-share", type=float, default=0.02)
+    parser.add_argument("--raid-at", type=float, default=None, help="секунда начала рейда")
+    parser.add_argument("--raid-size", type=int, default=100)
+    parser.add_argument("--raid-messages", type=int, default=settings.SPAM_MESSAGE_LIMIT + 2)
+    parser.add_argument("--latency", type=float, default=0.05, help="задержка Bot API, секунд")
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--flood-rate", type=float, default=0.0, help="доля ответов 429")
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--drain-quiet", type=float, default=5,
+                        help="после нагрузки ждать, пока бот столько секунд не вызывает API")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--seed", type=int, default=1)
+    return parser.parse_args()
+
+
+class Scenario:
+    def __init__(self, server: FakeTelegramServer, args: argparse.Namespace):
+        self.server = server
+        self.args = args
+        self.random = random.Random(args.seed)
+        self.message_id = 0
+        # (chat_id, message_id) -> update_id, чтобы сопоставить вызовы API с обновлениями
+        self.messages: Dict[Tuple[int, int], int] = {}
+        self.max_backlog = 0
+
+    def _user(self, user_id: int) -> Dict:
+        return {"id": user_id, "is_bot": False, "first_name": f"User {user_id}", "username": f"user{user_id}"}
+
+    def message(self, user_id: int, text: str) -> None:
+        self.message_id += 1
+        update_id = self.server.push("message", {
+            "message_id": self.message_id,
+            "date": int(time.time()),
+            "chat": {"id": settings.CHAT_ID, "type": "supergroup", "title": "Load test"},
+            "from": self._user(user_id),
+            "text": text,
+        })
+        self.messages[(settings.CHAT_ID, self.message_id)] = update_id
+
+    def join(self, user_id: int) -> None:
+        user = self._user(user_id)
+        self.server.push("chat_member", {
+            "chat": {"id": settings.CHAT_ID, "type": "supergroup", "title": "Load test"},
+            "from": user,
+            "date": int(time.time()),
+            "old_chat_member": {"status": "left", "user": user},
+            "new_chat_member": {"status": "member", "user": user},
+        })
+
+    def chatter(self) -> None:
+        roll = self.random.random()
+        user_id = 1000 + self.random.randrange(self.args.users)
+        if roll < self.args.command_share:
+            text = self.random.choice(COMMANDS)
+        elif roll < self.args.command_share + self.args.forbidden_share:
+            text = f"{self.random.choice(WORDS)} {self.random.choice(settings.FORBIDDEN_WORDS)}"
+        else:
+            text = " ".join(self.random.choice(WORDS) for _ in range(self.random.randint(3, 15)))
+        self.message(user_id, text)
+
+    def raid(self) -> None:
+        raiders = [1_000_000 + i for i in range(self.args.raid_size)]
+        for user_id in raiders:
+            self.join(user_id)
+        for _ in range(self.args.raid_messages):
+            for user_id in raiders:
+                self.message(user_id, "заходите к нам https://example.com/spam")
+
+    async def run(self) -> float:
+        """Подаёт сообщения с заданной частотой; возвращает время начала"""
+        started = time.monotonic()
+        sent = 0
+        raided = self.args.raid_at is None
+        while True:
+            elapsed = time.monotonic() - started
+            if elapsed >= self.args.duration:
+                return started
+            if not raided and elapsed >= self.args.raid_at:
+                self.raid()
+                raided = True
+            # Догоняем расписание, если цикл отстал
+            while sent < elapsed * self.args.rate:
+                self.chatter()
+                sent += 1
+            self.max_backlog = max(self.max_backlog, self.server.backlog)
+            await asyncio.sleep(0.01)
+
+
+def response_target(method: str, params: Dict) -> List[Tuple[int, int]]:
+    """Сообщения пользователей, к которым относится вызов API"""
+    try:
+        chat_id = int(params.get("chat_id", 0))
+    except (TypeError, ValueError):
+        return []
+    if method == "deleteMessage":
+        return [(chat_id, int(params["message_id"]))]
+    if method == "deleteMessages":
+        return [(chat_id, int(message_id)) for message_id in params.get("message_ids", [])]
+    reply = params.get("reply_parameters")
+    if isinstance(reply, dict) and "message_id" in reply:
+        return [(chat_id, int(reply["message_id"]))]
+    if "reply_to_message_id" in params:
+        return [(chat_id, int(params["reply_to_message_id"]))]
+    return []
+
+
+def percentiles(values: List[float]) -> str:
+    if not values:
+        return "нет данных"
+    ordered = sorted(values)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))] * 1000
+    return (f"p50 {pick(50):.0f} мс, p95 {pick(95):.0f} мс, p99 {pick(99):.0f} мс, "
+            f"макс {ordered[-1] * 1000:.0f} мс ({len(ordered)})")
+
+
+def report(server: FakeTelegramServer, scenario: Scenario, started: float, finished: float) -> None:
+    served = len(server.served_at)
+    queued = len(server.queued_at)
+    print(f"Обновлений: поставлено {queued}, забрано ботом {served}, "
+          f"{served / (finished - started):.0f} обн/с, макс. очередь {scenario.max_backlog}")
+
+    delivery = [server.served_at[update_id] - server.queued_at[update_id] for update_id in server.served_at]
+    print(f"Выдача в getUpdates: {percentiles(delivery)}")
+
+    responded: Dict[int, float] = {}
+    for call in server.calls:
+        for key in response_target(call.method, call.params):
+            update_id = scenario.messages.get(key)
+            if update_id is not None and update_id not in responded:
+                responded[update_id] = call.at - server.queued_at[update_id]
+    print(f"Ответ на обновление: {percentiles(list(responded.values()))}")
+
+    print(f"Ответов 429: {server.floods}")
+    for method, count in server.by_method.most_common():
+        print(f"  {method}: {count}")
+
+
+async def wait_drained(server: FakeTelegramServer, quiet: float, limit: float = 120.0) -> None:
+    """Ждёт, пока бот заберёт все обновления и перестанет вызывать API"""
+    deadline = time.monotonic() + limit
+    while time.monotonic() < deadline:
+        last_call = server.calls[-1].at if server.calls else 0.0
+        if server.backlog == 0 and time.monotonic() - last_call >= quiet:
+            return
+        await asyncio.sleep(0.2)
+
+
+async def main() -> None:
+    args = parse_args()
+    server = FakeTelegramServer(
+        latency=args.latency, jitter=args.jitter, flood_rate=args.flood_rate,
+        retry_after=args.retry_after, admins=(ADMIN_USER_ID,), seed=args.seed,
+    )
+    await server.start(port=args.port)
+
+    workdir = tempfile.mkdtemp(prefix="load_test_")
+    env = dict(os.environ)
+    env.pop("WEBHOOK_URL", None)
+    env.update(
+        TELEGRAM_API_URL=f"http://127.0.0.1:{args.port}",
+        BOT_TOKEN=f"{BOT_USER['id']}:LOADTEST",
+        DATABASE_URL=f"sqlite+aiosqlite:///{workdir}/load.db",
+        METRICS_PORT="0",
+    )
+    process = await asyncio.create_subprocess_exec(sys.executable, "bot.py", env=env)
+    try:
+        await asyncio.wait_for(server.polling.wait(), timeout=60)
+        scenario = Scenario(server, args)
+        started = await scenario.run()
+        await wait_drained(server, args.drain_quiet)
+        finished = max(server.served_at.values(), default=time.monotonic())
+        report(server, scenario, started, finished)
+    finally:
+        if process.returncode is None:
+            # SIGINT, как при остановке с клавиатуры: бот сохраняет счётчики и закрывает сессию
+            process.send_signal(signal.SIGINT)
+            try:
+                await asyncio.wait_for(process.wait(), timeout=30)
+            except asyncio.TimeoutError:
+                process.kill()
+        await server.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,11 +1,30 @@
 import asyncio
 from aiogram import Bot, Dispatcher
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.session.base import BaseSession
+from aiogram.client.telegram import TelegramAPIServer
 from aiogram.fsm.storage.memory import MemoryStorage
-from handlers import admin_commands, moderation, personal_commands, user_commands
+from handlers import admin_commands, channel_posts, moderation, personal_commands, user_commands
 from database.database import init_db
 from utils.logger import BotLogger
 from config import get_settings
+from middlewares.chat_gate import chat_gate
+from middlewares.error_handler import error_handler
+from middlewares.message_stats import message_stats
+from middlewares.metrics import api_metrics, handler_metrics, update_metrics
+from middlewares.profiler import profiler
+from middlewares.request_scheduler import OutgoingRequestScheduler, request_scheduler
 from middlewares.spam_filter import spam_filter
+from middlewares.user_tracking import user_tracker
+from utils.leaderboard import leaderboard
+from utils.message_counter import message_counter
+from utils.metrics import metrics_server
+from utils.error_notifier import error_notifier
+from utils.runtime_stats import runtime_monitor
+from utils.scheduler import scheduler
+from utils.user_directory import user_directory
+from utils.warning_sweeper import warning_sweeper
+from utils.webhook import concurrency_limiter, run_webhook
 
 # Инициализируем логгер
 logger = BotLogger.setup()
@@ -13,33 +32,124 @@ logger = BotLogger.setup()
 # Получаем настройки
 settings = get_settings()
 
+def create_session() -> AiohttpSession:
+    """Сессия Bot API; TELEGRAM_API_URL направляет запросы на свой Bot API server или нагрузочный стенд"""
+    if settings.TELEGRAM_API_URL:
+        return AiohttpSession(api=TelegramAPIServer.from_base(settings.TELEGRAM_API_URL))
+    return AiohttpSession()
+
+def setup_session(session: BaseSession, scheduler: OutgoingRequestScheduler = request_scheduler) -> None:
+    """Подключает middleware исходящих запросов (бенчмарки передают планировщик со своими лимитами)"""
+    # Все исходящие запросы проходят через лимиты Telegram и повтор после 429
+    session.middleware(scheduler)
+    # Регистрируется после планировщика: замеряется сам запрос, без ожидания в очереди
+    session.middleware(api_metrics)
+
 # Инициализация бота и диспетчера
-bot = Bot(token=settings.BOT_TOKEN)
+bot = Bot(token=settings.BOT_TOKEN, session=create_session())
+setup_session(bot.session)
 dp = Dispatcher(storage=MemoryStorage())
 
-async def main():
+def setup_dispatcher(dp: Dispatcher) -> None:
+    """Подключает маршруты и middleware (вызывается один раз: роутер нельзя подключить дважды)"""
     # Подключение маршрутов для различных команд
+    # Копии постов канала должны обрабатываться раньше фильтров остальных роутеров
+    dp.include_router(channel_posts.router)
     dp.include_router(user_commands.router)
     dp.include_router(admin_commands.router)
     dp.include_router(moderation.router)
     dp.include_router(personal_commands.router)  # Перемещаем в конец
     
+    # В режиме webhook ожидание свободного слота не должно входить во время обработки
+    if settings.WEBHOOK_URL:
+        dp.update.outer_middleware(concurrency_limiter)
+    # Обновления из посторонних чатов отбрасываются раньше всех остальных middleware
+    dp.update.outer_middleware(chat_gate)
+    # Ошибки обработчиков и middleware ниже попадают в лог и в периодическую сводку для админов
+    dp.update.outer_middleware(error_handler)
+
+    # Показатели: число и время обработки обновлений, время каждого обработчика
+    dp.update.outer_middleware(update_metrics)
+    for event_name, observer in dp.observers.items():
+        if event_name not in ("update", "error"):
+            observer.middleware(handler_metrics)
+            observer.middleware(profiler.tracker)
+
+    # Имена запоминаются до спам-фильтра, чтобы попадали и отброшенные им сообщения
+    dp.message.outer_middleware(user_tracker)
     dp.message.outer_middleware(spam_filter)
+    # Подсчёт сообщений для статистики: один раз на сообщение, независимо от роутеров
+    dp.message.outer_middleware(message_stats)
+    # Медленные обновления любого типа: лог с разбивкой ожиданий и периодическая сводка
+    dp.update.outer_middleware(profiler)
+
+
+async def start_services(bot: Bot) -> None:
+    """Фоновые задачи бота; база данных уже должна быть инициализирована"""
+    # Замеры отставания цикла событий и загрузки CPU для /ping
+    runtime_monitor.start()
+    # Сводки ошибок в sharechat
+    error_notifier.start(bot)
+    # Фоновая запись счётчиков сообщений
+    message_counter.start()
+    # Топ активности в памяти: прогрев из базы и периодическая сверка
+    await leaderboard.start()
+    # Фоновая запись справочника имён пользователей
+    user_directory.start()
+    # Фоновая очистка трекера частоты сообщений
+    spam_filter.start()
+    profiler.start(bot)
+    # Отложенные действия (удаление предупреждений), включая оставшиеся с прошлого запуска
+    await scheduler.start(bot)
+    # Снятие давних предупреждений
+    warning_sweeper.start()
+
+
+async def stop_services() -> None:
+    """Останавливает фоновые задачи и сохраняет накопленные счётчики"""
+    spam_filter.stop()
+    profiler.stop()
+    runtime_monitor.stop()
+    warning_sweeper.stop()
+    leaderboard.stop()
+    await scheduler.stop()
+    await message_counter.stop()
+    await user_directory.stop()
+    # Последняя сводка ошибок, пока сессия бота ещё открыта
+    await error_notifier.stop()
+
+
+async def main():
+    setup_dispatcher(dp)
 
     # Инициализация базы данных
     await init_db()
 
+    # Локальный HTTP-сервер с /metrics
+    await metrics_server.start()
+    await start_services(bot)
+
     try:
         logger.info("Bot started successfully")
         print("Bot started successfully")
-        await dp.start_polling(bot)
+        if settings.WEBHOOK_URL:
+            await run_webhook(dp, bot)
+        else:
+            # Telegram не отдаёт getUpdates, пока установлен webhook от прошлого запуска
+            await bot.delete_webhook()
+            await dp.start_polling(bot)
     except Exception as e:
         logger.error(f"Error during bot execution: {e}", exc_info=True)
         print(f"Error during bot execution: {e}")
     finally:
+        # Сохраняем накопленные счётчики перед выходом
+        await stop_services()
+        await metrics_server.stop()
         logger.info("Bot stopped")
         print("Bot stopped")
         await bot.session.close()
+        # Дописываем в файл всё, что осталось в очереди логгера
+        BotLogger.shutdown()
 
 if __name__ == "__main__":
     try:
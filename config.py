@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List, Optional
+from typing import Dict, List, Optional, Set
 from functools import lru_cache
 import json
 
@@ -9,18 +9,35 @@ class Settings(BaseSettings):
     CHAT_ID: int
     CHANNEL_ID: int
     SHARECHAT_ID: int
+    # Адрес Bot API (свой telegram-bot-api или нагрузочный стенд), по умолчанию api.telegram.org
+    TELEGRAM_API_URL: Optional[str] = None
     
     # Настройки базы данных
     DATABASE_URL: str
+    DB_CREATE_ALL: bool = True  # создавать недостающие таблицы при запуске
+    DB_POOL_SIZE: int = 5  # постоянных соединений в пуле
+    DB_MAX_OVERFLOW: int = 10  # дополнительных соединений сверх пула при нагрузке
+    DB_POOL_TIMEOUT: int = 30  # секунды ожидания свободного соединения
+    DB_POOL_RECYCLE: int = 1800  # секунды жизни соединения PostgreSQL
+    DB_POOL_PRE_PING: bool = True  # проверять соединение PostgreSQL перед выдачей из пула
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 500  # подготовленных запросов на соединение asyncpg
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT: int = 5000  # миллисекунды ожидания блокировки
+    SQLITE_MMAP_SIZE: int = 268435456  # байт файла базы, читаемых через mmap
     
     # Настройки модерации
     WARN_LIMIT: int = 3
+    # Давность предупреждений
+    WARNING_DECAY_DAYS: int = 30  # дней без новых предупреждений до снятия, 0 - не снимать
+    WARNING_DECAY_MODE: str = "decrement"  # decrement - снимать по одному, expire - удалять все сразу
+    WARNING_SWEEP_INTERVAL: int = 3600  # секунды между проходами очистки
+    WARNING_SWEEP_BATCH_SIZE: int = 1000  # строк в одном UPDATE/DELETE
     FORBIDDEN_WORDS: List[str] = [
         "хохол", 
         "гитлер", 
         "сталин",
         "нацист", "фашист", "националист",
-        "ХОХОЛ", "Хохол", "хОхОл",
         "путлер", "пу", "диктатор",
         "террорист", "экстремист",
         
@@ -60,9 +77,16 @@ class Settings(BaseSettings):
         "чмо", "чмошник", "чмырь",
         "шалава", "шлюха", "шлюшка"
     ]
+    # Размер LRU-кэша вердиктов по нормализованному тексту
+    FORBIDDEN_WORDS_CACHE_SIZE: int = 2048
+    # Как часто (в проверках) писать в лог статистику фильтра, 0 - не писать
+    FORBIDDEN_WORDS_STATS_EVERY: int = 1000
     
     # Настройки администрирования
     ADMIN_IDS: str = ""  # Теперь это строка
+    # Чаты, обновления из которых обрабатываются (CHAT_ID, CHANNEL_ID и SHARECHAT_ID входят всегда)
+    ALLOWED_CHAT_IDS: List[int] = []
+    ALLOW_PRIVATE_CHATS: bool = True  # личные чаты с ботом (команды владельца)
     
     # Дополнительные настройки
     MESSAGE_DELETION_DELAY: int = 5  # секунды
@@ -72,6 +96,77 @@ class Settings(BaseSettings):
     SPAM_TIME_WINDOW: int = 10  # секунды
     SPAM_MESSAGE_LIMIT: int = 5  # сообщений
     SPAM_WARN_DELETION_DELAY: int = 5  # секунды
+    SPAM_MAX_TRACKED_USERS: int = 50000  # пользователей в памяти, самые давние вытесняются
+    SPAM_SWEEP_INTERVAL: int = 60  # секунды между очистками неактивных пользователей
+    
+    # Комментарий с правилами к постам канала
+    RULES_COMMENT_WAIT_TIMEOUT: int = 60  # секунды ожидания копии поста в чате
+    RULES_COMMENT_POLL_ATTEMPTS: int = 4  # попыток запасного опроса закрепа (2, 4, 8, 16 с)
+    
+    # Кэш статусов участников чата
+    MEMBER_CACHE_TTL: int = 60  # секунды
+    MEMBER_CACHE_SIZE: int = 10000  # записей (чат, пользователь)
+    
+    # Отложенная запись статистики сообщений
+    STATS_FLUSH_INTERVAL: float = 5.0  # секунды
+    STATS_FLUSH_MAX_PENDING: int = 500  # строк (пар чат/пользователь) в буфере
+    
+    # Топ активности в памяти
+    LEADERBOARD_SIZE: int = 50  # участников в поддерживаемом топе каждого чата
+    LEADERBOARD_CHECK_INTERVAL: int = 3600  # секунды между сверками с таблицей user_stats
+    
+    # Справочник имён пользователей для топов и списков
+    USER_DIRECTORY_STALE_HOURS: int = 24  # через сколько часов имя перезапрашивается через API
+    USER_DIRECTORY_REFRESH_CONCURRENCY: int = 5  # одновременных запросов при обновлении
+    USER_DIRECTORY_CACHE_SIZE: int = 50000  # пользователей в памяти для отсечения лишних записей
+    
+    # Прореживание частых записей в логе (предупреждения, ошибки и модерация сохраняются всегда)
+    LOG_SAMPLING_ENABLED: bool = True
+    LOG_SAMPLE_RATES: Dict[str, float] = {  # "модуль.функция" -> доля сохраняемых записей
+        "personal_commands.handle_messages": 0.01,
+    }
+    LOG_RATE_LIMIT: float = 5  # записей в секунду с одного места вызова, 0 - без ограничения
+    LOG_RATE_BURST: int = 50  # записей подряд с одного места вызова без ограничения
+    LOG_KEEP_MODULES: List[str] = ["moderation", "spam_filter", "admin_commands"]
+    
+    # Ограничение исходящих запросов к Bot API
+    API_GLOBAL_RATE: float = 30  # сообщений в секунду на весь бот
+    API_GROUP_RATE: float = 20  # сообщений в минуту в одну группу
+    API_PRIVATE_RATE: float = 1  # сообщений в секунду в один личный чат
+    API_CHAT_BURST: int = 3  # сообщений подряд в один чат без ожидания
+    API_MAX_RETRIES: int = 3  # повторов после ответа 429
+    API_MAX_QUEUE: int = 1000  # ожидающих отправки сообщений, сверх - отклоняются (модерация - нет), 0 - без ограничения
+    API_STATS_EVERY: int = 1000  # как часто (в запросах) писать статистику очереди в лог, 0 - не писать
+    
+    # Показатели в формате Prometheus
+    METRICS_HOST: str = "127.0.0.1"
+    METRICS_PORT: int = 9100  # порт для /metrics, 0 - не запускать сервер
+    
+    # Задержки для /ping
+    RUNTIME_LAG_INTERVAL: float = 0.5  # секунд между замерами отставания цикла событий, 0 - не замерять
+    RUNTIME_WINDOW_SIZE: int = 1000  # последних замеров в окне перцентилей
+    RUNTIME_CPU_INTERVAL: float = 10  # как часто обновлять загрузку CPU, секунд
+    
+    # Сводки ошибок в SHARECHAT_ID
+    ERROR_NOTIFY_WINDOW: int = 60  # секунд накопления ошибок перед отправкой сводки
+    ERROR_NOTIFY_MAX_GROUPS: int = 20  # разных ошибок (тип и место в коде) в одной сводке
+    ERROR_NOTIFY_MAX_MESSAGE: int = 200  # символов текста ошибки и контекста
+    
+    # Профилирование медленных обработчиков
+    PROFILER_SLOW_THRESHOLD: float = 1.0  # секунд на обновление, дольше - предупреждение в лог
+    PROFILER_DIGEST_INTERVAL: int = 3600  # как часто отправлять сводку в SHARECHAT_ID, 0 - не отправлять
+    PROFILER_DIGEST_TOP: int = 5  # обработчиков в сводке
+    PROFILER_MAX_CAPTURE: int = 300  # максимальная длительность /cprofile, секунд
+    
+    # Режим webhook (если WEBHOOK_URL не задан, бот работает через long polling)
+    WEBHOOK_URL: Optional[str] = None  # внешний адрес, например https://bot.example.com
+    WEBHOOK_PATH: str = "/webhook"
+    WEBHOOK_HEALTH_PATH: str = "/health"
+    WEBHOOK_HOST: str = "0.0.0.0"
+    WEBHOOK_PORT: int = 8080
+    WEBHOOK_SECRET: Optional[str] = None  # сверяется с заголовком X-Telegram-Bot-Api-Secret-Token
+    WEBHOOK_MAX_CONCURRENT_UPDATES: int = 100  # обновлений в обработке одновременно
+    WEBHOOK_MAX_WAITING_UPDATES: int = 1000  # обновлений в очереди сверх этого отклоняются с 503
     
     # Добавить новые настройки в класс Settings:
     OWNER_ID: int
@@ -87,6 +182,11 @@ class Settings(BaseSettings):
             return []
         return [int(x.strip()) for x in self.ADMIN_IDS.split(',')]
 
+    @property
+    def allowed_chat_ids(self) -> Set[int]:
+        """Чаты, обновления из которых проходят дальше первой ступени обработки"""
+        return {self.CHAT_ID, self.CHANNEL_ID, self.SHARECHAT_ID, *self.ALLOWED_CHAT_IDS}
+
 @lru_cache()
 def get_settings() -> Settings:
     """
@@ -1,15 +1,90 @@
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from typing import Dict, Optional
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from config import get_settings
+from utils.metrics import instrument_engine, registry
 from .base import Base
 from .models import *
-import os
-from dotenv import load_dotenv
+from .migrations import run_migrations
 
-load_dotenv()
+settings = get_settings()
 
-DATABASE_URL = os.getenv('DATABASE_URL')
+DATABASE_URL = settings.DATABASE_URL
 
-engine = create_async_engine(DATABASE_URL, echo=False)
+
+def _sqlite_pragmas() -> list:
+    return [
+        f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}",
+        f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}",
+        f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT}",
+        f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}",
+    ]
+
+
+def build_engine(url: str) -> AsyncEngine:
+    """Создаёт движок с настройками пула и подключения из Settings"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    options = {"echo": False}
+
+    if backend == "sqlite":
+        if parsed.database not in (None, "", ":memory:"):
+            # По умолчанию aiosqlite открывает новое соединение (и поток) на каждую сессию
+            options.update(
+                poolclass=AsyncAdaptedQueuePool,
+                pool_size=settings.DB_POOL_SIZE,
+                max_overflow=settings.DB_MAX_OVERFLOW,
+                pool_timeout=settings.DB_POOL_TIMEOUT,
+            )
+    else:
+        options.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+        )
+        if parsed.get_driver_name() == "asyncpg":
+            options["connect_args"] = {
+                "prepared_statement_cache_size": settings.DB_PREPARED_STATEMENT_CACHE_SIZE,
+            }
+
+    new_engine = create_async_engine(url, **options)
+
+    if backend == "sqlite":
+        @event.listens_for(new_engine.sync_engine, "connect")
+        def _set_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for pragma in _sqlite_pragmas():
+                cursor.execute(pragma)
+            cursor.close()
+
+    return new_engine
+
+
+def pool_usage(db_engine: AsyncEngine) -> Optional[Dict[str, int]]:
+    """Занятые соединения и размер пула (без переполнения); None для NullPool и StaticPool"""
+    pool = db_engine.sync_engine.pool
+    if not isinstance(pool, QueuePool):
+        return None
+    return {
+        "checked_out": pool.checkedout(),
+        "size": pool.size(),
+    }
+
+
+engine = build_engine(DATABASE_URL)
+# Время SQL-запросов попадает в /metrics
+instrument_engine(engine)
+
+registry.gauge_callback(
+    "bot_db_pool_connections", "Database pool connections: checked out and pool size",
+    lambda: {(state,): value for state, value in (pool_usage(engine) or {}).items()},
+    ["state"],
+)
 
 AsyncSessionLocal = sessionmaker(
     bind=engine,
@@ -18,6 +93,9 @@ AsyncSessionLocal = sessionmaker(
 )
 
 async def init_db():
-    
+
     async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
\ No newline at end of file
+        # В рабочей базе схема уже есть: create_all можно отключить, миграции выполняются всегда
+        if settings.DB_CREATE_ALL:
+            await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(run_migrations)
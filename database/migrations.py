@@ -0,0 +1,80 @@
+from sqlalchemy import BigInteger, inspect, text
+from sqlalchemy.engine import Connection
+from utils.logger import BotLogger
+
+logger = BotLogger.get_logger()
+
+
+def _index_names(conn: Connection, table: str) -> set:
+    return {index["name"] for index in inspect(conn).get_indexes(table)}
+
+
+def _add_warning_unique_index(conn: Connection) -> None:
+    """
+    Уникальный индекс warnings(chat_id, user_id) для upsert.
+    Перед созданием схлопывает дубликаты, которые могли появиться из-за гонок
+    при старой схеме select-then-insert: остаётся последняя запись с максимальным счётчиком.
+    """
+    if "unique_warning_chat_user" in _index_names(conn, "warnings"):
+        return
+
+    conn.execute(text(
+        "UPDATE warnings SET warning_count = ("
+        " SELECT MAX(w.warning_count) FROM warnings w"
+        " WHERE w.chat_id = warnings.chat_id AND w.user_id = warnings.user_id"
+        ") WHERE id IN ("
+        " SELECT MAX(id) FROM warnings GROUP BY chat_id, user_id HAVING COUNT(*) > 1"
+        ")"
+    ))
+    result = conn.execute(text(
+        "DELETE FROM warnings WHERE id NOT IN ("
+        " SELECT MAX(id) FROM warnings GROUP BY chat_id, user_id"
+        ")"
+    ))
+    conn.execute(text(
+        "CREATE UNIQUE INDEX unique_warning_chat_user ON warnings (chat_id, user_id)"
+    ))
+    # Старый неуникальный индекс по тем же колонкам больше не нужен
+    conn.execute(text("DROP INDEX IF EXISTS idx_chat_user"))
+    logger.info(f"Migration: unique index on warnings created, {result.rowcount} duplicate rows merged")
+
+
+def _widen_warning_ids(conn: Connection) -> None:
+    """
+    chat_id и user_id в warnings - BIGINT: id супергрупп (-100...) и новых пользователей
+    не помещаются в INTEGER. В SQLite INTEGER и так 64-битный, менять нечего.
+    """
+    if conn.dialect.name != "postgresql":
+        return
+
+    columns = {column["name"]: column["type"] for column in inspect(conn).get_columns("warnings")}
+    narrow = [name for name in ("chat_id", "user_id") if not isinstance(columns[name], BigInteger)]
+    if not narrow:
+        return
+
+    conn.execute(text(
+        "ALTER TABLE warnings " + ", ".join(f"ALTER COLUMN {name} TYPE BIGINT" for name in narrow)
+    ))
+    logger.info(f"Migration: warnings.{', warnings.'.join(narrow)} widened to BIGINT")
+
+
+def _add_warning_last_warning_index(conn: Connection) -> None:
+    """Индекс по last_warning для выборки устаревших предупреждений"""
+    if "ix_warnings_last_warning" in _index_names(conn, "warnings"):
+        return
+
+    conn.execute(text("CREATE INDEX ix_warnings_last_warning ON warnings (last_warning)"))
+    logger.info("Migration: index on warnings.last_warning created")
+
+
+# Миграции выполняются по порядку при каждом старте и должны быть идемпотентными
+MIGRATIONS = [
+    _add_warning_unique_index,
+    _widen_warning_ids,
+    _add_warning_last_warning_index,
+]
+
+
+def run_migrations(conn: Connection) -> None:
+    for migration in MIGRATIONS:
+        migration(conn)
@@ -6,14 +6,15 @@ class Warning(Base):
     __tablename__ = 'warnings'
 
     id = Column(Integer, primary_key=True, index=True)
-    chat_id = Column(Integer, index=True)
-    user_id = Column(Integer, index=True)
+    chat_id = Column(BigInteger, index=True)
+    user_id = Column(BigInteger, index=True)
     warning_count = Column(Integer, default=0)
-    last_warning = Column(DateTime, default=datetime.utcnow)
+    # Время последнего предупреждения или последнего снятия одного из них по давности
+    last_warning = Column(DateTime, default=datetime.utcnow, index=True)
 
-    # Добавляем составной индекс
+    # Уникальный составной индекс нужен для INSERT ... ON CONFLICT
     __table_args__ = (
-        Index('idx_chat_user', 'chat_id', 'user_id'),
+        Index('unique_warning_chat_user', 'chat_id', 'user_id', unique=True),
     )
 
     def __repr__(self):
@@ -30,4 +31,26 @@ class UserStats(Base):
 
     __table_args__ = (
         UniqueConstraint('user_id', 'chat_id', name='unique_user_chat'),
-    )
\ No newline at end of file
+    )
+class PendingDeletion(Base):
+    __tablename__ = 'pending_deletions'
+
+    id = Column(Integer, primary_key=True)
+    chat_id = Column(BigInteger, nullable=False)
+    message_id = Column(BigInteger, nullable=False)
+    delete_at = Column(DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<PendingDeletion(chat_id={self.chat_id}, message_id={self.message_id}, delete_at={self.delete_at})>"
+
+class TelegramUser(Base):
+    __tablename__ = 'users'
+
+    # id пользователя в Telegram
+    id = Column(BigInteger, primary_key=True, autoincrement=False)
+    username = Column(String, nullable=True)
+    full_name = Column(String, nullable=False, default="")
+    updated_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f"<TelegramUser(id={self.id}, username={self.username}, full_name={self.full_name})>"
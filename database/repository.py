@@ -0,0 +1,208 @@
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional, Sequence, Tuple
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from .models import TelegramUser, UserStats, Warning
+
+# Строка буфера счётчика сообщений: (chat_id, user_id, прирост, дата последнего сообщения)
+MessageCountRow = Tuple[int, int, int, datetime]
+# Строка справочника пользователей: (id, username, полное имя, время обновления)
+UserRow = Tuple[int, Optional[str], str, datetime]
+
+# SQLite ограничивает число параметров в одном запросе, поэтому пишем пачками
+UPSERT_CHUNK_SIZE = 500
+
+_DIALECT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+def dialect_insert(session: AsyncSession, model):
+    """Возвращает INSERT с поддержкой ON CONFLICT для диалекта текущего подключения"""
+    dialect = session.bind.dialect.name
+    try:
+        return _DIALECT_INSERTS[dialect](model)
+    except KeyError:
+        raise NotImplementedError(f"Upsert is not supported for dialect {dialect}")
+
+
+async def _execute_returning(session: AsyncSession, stmt, column, *where) -> Optional[int]:
+    """
+    Выполняет INSERT/UPDATE и возвращает новое значение колонки.
+    В PostgreSQL это один запрос с RETURNING. SQLAlchemy 1.4 не компилирует
+    RETURNING для SQLite, поэтому там значение читается в той же транзакции:
+    после записи SQLite держит блокировку, и значение не может измениться до commit.
+    """
+    if session.bind.dialect.name == "postgresql":
+        result = await session.execute(stmt.returning(column))
+        return result.scalar_one_or_none()
+
+    result = await session.execute(stmt)
+    if result.rowcount == 0:
+        return None
+    result = await session.execute(select(column).where(*where))
+    return result.scalar_one_or_none()
+
+
+async def add_warning(session: AsyncSession, chat_id: int, user_id: int) -> int:
+    """Атомарно добавляет предупреждение и возвращает их новое количество"""
+    now = datetime.now(timezone.utc)
+    stmt = dialect_insert(session, Warning).values(
+        chat_id=chat_id,
+        user_id=user_id,
+        warning_count=1,
+        last_warning=now,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Warning.chat_id, Warning.user_id],
+        set_={
+            "warning_count": Warning.warning_count + 1,
+            "last_warning": stmt.excluded.last_warning,
+        },
+    )
+    return await _execute_returning(
+        session, stmt, Warning.warning_count,
+        Warning.chat_id == chat_id, Warning.user_id == user_id,
+    )
+
+
+async def remove_warning(session: AsyncSession, chat_id: int, user_id: int) -> Optional[int]:
+    """Атомарно снимает одно предупреждение. Возвращает остаток или None, если снимать нечего"""
+    stmt = (
+        update(Warning)
+        .where(Warning.chat_id == chat_id, Warning.user_id == user_id, Warning.warning_count > 0)
+        .values(warning_count=Warning.warning_count - 1)
+    )
+    return await _execute_returning(
+        session, stmt, Warning.warning_count,
+        Warning.chat_id == chat_id, Warning.user_id == user_id,
+    )
+
+
+async def reset_warnings(session: AsyncSession, chat_id: int, user_id: int) -> None:
+    """Удаляет запись предупреждений пользователя"""
+    await session.execute(
+        delete(Warning).where(Warning.chat_id == chat_id, Warning.user_id == user_id)
+    )
+
+
+def _stale_warning_ids(cutoff: datetime, limit: int):
+    # Пачка id, а не вся выборка: каждая пачка - короткая транзакция без долгих блокировок.
+    # Без ORDER BY: порядок не важен, а сортировка по id заставила бы читать всю таблицу вместо индекса
+    return select(Warning.id).where(Warning.last_warning < cutoff).limit(limit)
+
+
+async def expire_warnings(session: AsyncSession, cutoff: datetime, limit: int) -> int:
+    """Удаляет до limit записей без новых предупреждений с cutoff. Возвращает число удалённых"""
+    result = await session.execute(
+        delete(Warning)
+        .where(Warning.id.in_(_stale_warning_ids(cutoff, limit)))
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+async def decay_warnings(session: AsyncSession, cutoff: datetime, now: datetime, limit: int) -> int:
+    """
+    Снимает по одному предупреждению с до limit записей без новых предупреждений с cutoff
+    и отсчитывает следующий срок от now. Возвращает число обновлённых записей
+    """
+    result = await session.execute(
+        update(Warning)
+        .where(Warning.id.in_(_stale_warning_ids(cutoff, limit)))
+        .values(warning_count=Warning.warning_count - 1, last_warning=now)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+async def delete_empty_warnings(session: AsyncSession, limit: int) -> int:
+    """Удаляет до limit записей, где предупреждений не осталось. Возвращает число удалённых"""
+    ids = select(Warning.id).where(Warning.warning_count <= 0).limit(limit)
+    result = await session.execute(
+        delete(Warning).where(Warning.id.in_(ids)).execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+async def bulk_add_message_counts(session: AsyncSession, rows: Iterable[MessageCountRow]) -> None:
+    """Прибавляет накопленные счётчики сообщений одним upsert-запросом на пачку строк"""
+    rows: List[MessageCountRow] = list(rows)
+    for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+        chunk = rows[start:start + UPSERT_CHUNK_SIZE]
+        stmt = dialect_insert(session, UserStats).values([
+            {
+                "chat_id": chat_id,
+                "user_id": user_id,
+                "message_count": delta,
+                "last_message_date": last_date,
+            }
+            for chat_id, user_id, delta, last_date in chunk
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[UserStats.user_id, UserStats.chat_id],
+            set_={
+                "message_count": UserStats.message_count + stmt.excluded.message_count,
+                "last_message_date": stmt.excluded.last_message_date,
+            },
+        )
+        await session.execute(stmt)
+
+
+async def bulk_upsert_users(session: AsyncSession, rows: Iterable[UserRow]) -> None:
+    """Записывает имена пользователей в справочник пачками upsert-запросов"""
+    rows: List[UserRow] = list(rows)
+    for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+        chunk = rows[start:start + UPSERT_CHUNK_SIZE]
+        stmt = dialect_insert(session, TelegramUser).values([
+            {
+                "id": user_id,
+                "username": username,
+                "full_name": full_name,
+                "updated_at": updated_at,
+            }
+            for user_id, username, full_name, updated_at in chunk
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[TelegramUser.id],
+            set_={
+                "username": stmt.excluded.username,
+                "full_name": stmt.excluded.full_name,
+                "updated_at": stmt.excluded.updated_at,
+            },
+        )
+        await session.execute(stmt)
+
+
+async def get_users(session: AsyncSession, user_ids: Iterable[int]) -> Sequence[TelegramUser]:
+    """Записи справочника по списку id"""
+    result = await session.execute(select(TelegramUser).where(TelegramUser.id.in_(list(user_ids))))
+    return result.scalars().all()
+
+
+async def get_top_users(
+    session: AsyncSession, chat_id: int, limit: int
+) -> Sequence[Tuple[UserStats, Optional[TelegramUser]]]:
+    """Самые активные участники чата вместе с записью справочника (если она есть)"""
+    result = await session.execute(
+        select(UserStats, TelegramUser)
+        .outerjoin(TelegramUser, TelegramUser.id == UserStats.user_id)
+        .where(UserStats.chat_id == chat_id)
+        .order_by(UserStats.message_count.desc())
+        .limit(limit)
+    )
+    return result.all()
+
+
+async def get_warned_users(
+    session: AsyncSession, chat_id: int
+) -> Sequence[Tuple[Warning, Optional[TelegramUser]]]:
+    """Участники чата с активными предупреждениями вместе с записью справочника"""
+    result = await session.execute(
+        select(Warning, TelegramUser)
+        .outerjoin(TelegramUser, TelegramUser.id == Warning.user_id)
+        .where(Warning.chat_id == chat_id, Warning.warning_count > 0)
+    )
+    return result.all()
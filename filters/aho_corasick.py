@@ -0,0 +1,94 @@
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class AhoCorasick:
+    """
+    Автомат Ахо-Корасик для поиска множества слов за один проход по тексту.
+
+    Автомат строится один раз и разворачивается в детерминированную таблицу
+    переходов (суффиксные ссылки подставляются заранее), поэтому обработка
+    каждого символа текста — один поиск в словаре.
+    """
+
+    def __init__(self, words: Iterable[str]):
+        # Сохраняем порядок и убираем дубликаты (в том числе отличающиеся только регистром)
+        self.words: Tuple[str, ...] = tuple(dict.fromkeys(w.lower() for w in words if w))
+
+        self._delta: List[Dict[str, int]] = [{}]
+        self._out: List[Tuple[str, ...]] = [()]
+
+        for word in self.words:
+            self._add(word)
+        self._build()
+
+    def _add(self, word: str) -> None:
+        state = 0
+        for char in word:
+            next_state = self._delta[state].get(char)
+            if next_state is None:
+                next_state = len(self._delta)
+                self._delta[state][char] = next_state
+                self._delta.append({})
+                self._out.append(())
+            state = next_state
+        self._out[state] += (word,)
+
+    def _build(self) -> None:
+        """Вычисляет суффиксные ссылки обходом в ширину и достраивает переходы"""
+        fail = [0] * len(self._delta)
+        queue = deque(self._delta[0].values())
+        while queue:
+            state = queue.popleft()
+            fail_state = fail[state]
+            # Наследуем совпадения суффиксного состояния
+            self._out[state] += self._out[fail_state]
+            own = self._delta[state]
+            for char, next_state in list(own.items()):
+                fail[next_state] = self._delta[fail_state].get(char, 0)
+                queue.append(next_state)
+            # Переходы, которых нет у состояния, берём у суффиксного (он уже достроен)
+            for char, next_state in self._delta[fail_state].items():
+                own.setdefault(char, next_state)
+
+        # Связанные методы get экономят поиск атрибута на каждом символе
+        self._step = [transitions.get for transitions in self._delta]
+
+    def find_all(self, text: str) -> List[Tuple[int, str]]:
+        """Возвращает все совпадения в виде списка (позиция начала, слово)"""
+        step = self._step
+        out = self._out
+        matches = []
+        state = 0
+        for index, char in enumerate(text):
+            state = step[state](char, 0)
+            if out[state]:
+                for word in out[state]:
+                    matches.append((index - len(word) + 1, word))
+        return matches
+
+    def find_first(self, text: str) -> Optional[Tuple[int, str]]:
+        """Возвращает первое найденное совпадение или None"""
+        step = self._step
+        out = self._out
+        state = 0
+        for index, char in enumerate(text):
+            state = step[state](char, 0)
+            if out[state]:
+                word = out[state][0]
+                return index - len(word) + 1, word
+        return None
+
+    def __contains__(self, text: str) -> bool:
+        # Отдельный цикл без enumerate: для вердикта позиция не нужна
+        step = self._step
+        out = self._out
+        state = 0
+        for char in text:
+            state = step[state](char, 0)
+            if out[state]:
+                return True
+        return False
+
+    def __len__(self) -> int:
+        return len(self.words)
@@ -1,11 +1,103 @@
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple, Union
 from aiogram.filters import BaseFilter
 from aiogram.types import Message
+from cachetools import LRUCache
 from config import get_settings
+from filters.aho_corasick import AhoCorasick
+from filters.text_normalizer import text_normalizer
+from utils.logger import BotLogger
+from utils.metrics import filter_verdicts_total
 
+logger = BotLogger.get_logger()
 settings = get_settings()
 
+Matches = Tuple[Tuple[int, str], ...]
+
+
+class ForbiddenWordChecker:
+    """
+    Проверка текста на запрещённые слова: нормализация, автомат Ахо-Корасик
+    и LRU-кэш вердиктов по нормализованному тексту (волны пересланного спама
+    решаются без повторного сканирования).
+    """
+
+    def __init__(self, cache_size: int):
+        self._automaton: Optional[AhoCorasick] = None
+        self._words_key: Tuple[str, ...] = ()
+        # Нормализованная форма слова -> слово из конфига
+        self._originals: Dict[str, str] = {}
+        self._cache: LRUCache = LRUCache(maxsize=cache_size)
+
+        self.checks = 0
+        self.cache_hits = 0
+        self.total_time = 0.0
+
+        self._get_automaton(settings.FORBIDDEN_WORDS)
+
+    def _get_automaton(self, words: Iterable[str]) -> AhoCorasick:
+        """Пересобирает автомат и сбрасывает кэш только если список слов изменился"""
+        key = tuple(words)
+        if self._automaton is None or key != self._words_key:
+            self._originals = {}
+            for word in key:
+                self._originals.setdefault(text_normalizer.normalize(word), word)
+            self._automaton = AhoCorasick(self._originals)
+            self._words_key = key
+            self._cache.clear()
+        return self._automaton
+
+    def check(self, text: str) -> Matches:
+        """Возвращает найденные слова (из конфига) и их позиции в нормализованном тексте"""
+        start = time.perf_counter()
+        automaton = self._get_automaton(settings.FORBIDDEN_WORDS)
+        normalized = text_normalizer.normalize(text)
+
+        matches = self._cache.get(normalized)
+        if matches is not None:
+            self.cache_hits += 1
+        else:
+            # Большинство сообщений чистые: сначала дешёвый вердикт, позиции ищем только при совпадении
+            matches = ()
+            if normalized in automaton:
+                matches = tuple(
+                    (position, self._originals[word])
+                    for position, word in automaton.find_all(normalized)
+                )
+            self._cache[normalized] = matches
+
+        self.checks += 1
+        self.total_time += time.perf_counter() - start
+        if settings.FORBIDDEN_WORDS_STATS_EVERY and self.checks % settings.FORBIDDEN_WORDS_STATS_EVERY == 0:
+            stats = self.get_stats()
+            logger.info(
+                f"Forbidden words filter: {stats['checks']} checks, "
+                f"cache hit rate {stats['cache_hit_rate']:.1%}, "
+                f"{stats['avg_cost_us']:.1f} us/message"
+            )
+        return matches
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика кэша и средняя стоимость проверки одного сообщения"""
+        return {
+            "checks": self.checks,
+            "cache_hits": self.cache_hits,
+            "cache_size": len(self._cache),
+            "cache_hit_rate": self.cache_hits / self.checks if self.checks else 0.0,
+            "avg_cost_us": self.total_time / self.checks * 1e6 if self.checks else 0.0,
+        }
+
+
+# Общий экземпляр, таблицы и автомат строятся при старте
+forbidden_word_checker = ForbiddenWordChecker(cache_size=settings.FORBIDDEN_WORDS_CACHE_SIZE)
+
+
 class ContainsForbiddenWord(BaseFilter):
-    async def __call__(self, message: Message) -> bool:
+    async def __call__(self, message: Message) -> Union[bool, Dict[str, Any]]:
         if message.text:
-            return any(word in message.text.lower() for word in settings.FORBIDDEN_WORDS)
+            matches = forbidden_word_checker.check(message.text)
+            filter_verdicts_total.inc("forbidden_words", "match" if matches else "clean")
+            if matches:
+                # Найденные слова и их позиции передаются в хендлер
+                return {"forbidden_matches": list(matches)}
         return False
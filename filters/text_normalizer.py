@@ -0,0 +1,86 @@
+import re
+from typing import Dict
+
+# Невидимые символы, которыми разбивают слова: zero-width, word joiner, BOM, мягкий перенос
+_INVISIBLE = "\u200b\u200c\u200d\u200e\u200f\u2060\u2061\u2062\u2063\u2064\ufeff\u00ad\u180e"
+
+# Латинские и греческие буквы, совпадающие по начертанию с кириллицей.
+# Сознательно только однозначные пары: b/k/m/t и т.п. дали бы ложные срабатывания
+# ("bet" -> "вет" совпадало бы с "ответ").
+_HOMOGLYPHS: Dict[str, str] = {
+    "a": "а", "e": "е", "o": "о", "p": "р", "c": "с", "x": "х", "y": "у",
+    "α": "а", "ε": "е", "ο": "о", "ρ": "р", "χ": "х", "υ": "у",
+    "ё": "е",
+}
+
+# Leetspeak: цифры и символы, которыми заменяют буквы. Заменяются только в словах,
+# где есть хотя бы две буквы ("п0рн", "ст@вки"): иначе "6к подписчиков" стало бы "бк"
+_LEET: Dict[str, str] = {
+    "0": "о", "@": "а", "3": "з", "4": "ч", "6": "б", "$": "s",
+}
+_LEET_CHARS = re.compile("[" + re.escape("".join(_LEET)) + "]")
+_LETTER = re.compile(r"[^\W\d_]")
+
+# "!" и "|" читаются как 1 только между символами слова ("w!n", "1|ve"), а не как
+# знак препинания: "Привет! вин" не должно склеиваться в "1 вин"
+_INNER_BAR = re.compile(r"(?<=\w)[!|](?=\w)")
+
+# i и l сводятся к 1 только в словах, где уже есть цифры ("1win", "w1nl1ne"):
+# иначе обычный текст ("Did I win?" -> "1 w1n") совпадал бы с запрещёнными словами
+_DIGIT = re.compile(r"\d")
+_I_L = re.compile("[il]")
+
+# Слова, в которых возможен leetspeak
+_LEET_WORD = re.compile(r"(?<!\S)\S*[\d@$!|]\S*")
+
+# Разрядка: "к а з и н о", "к.а.з.и.н.о", "к-а-з-и-н-о" (минимум три одиночных символа подряд)
+_SPACED_LETTERS = re.compile(r"(?<!\w)(?:\w[\s.\-_*]+){2,}\w(?!\w)")
+_SEPARATORS = re.compile(r"[\s.\-_*]+")
+
+
+def _join_spaced(match: re.Match) -> str:
+    return _SEPARATORS.sub("", match.group())
+
+
+def _leet_char(match: re.Match) -> str:
+    return _LEET[match.group()]
+
+
+def _decode_leet(match: re.Match) -> str:
+    word = _INNER_BAR.sub("1", match.group())
+    if len(_LETTER.findall(word)) >= 2:
+        word = _LEET_CHARS.sub(_leet_char, word)
+    if _DIGIT.search(word):
+        word = _I_L.sub("1", word)
+    return word
+
+
+class TextNormalizer:
+    """
+    Приводит текст к единой форме перед поиском запрещённых слов:
+    регистр, гомоглифы, leetspeak, невидимые символы и разрядка.
+
+    Leetspeak заменяется с учётом слова, в котором стоит символ, остальное -
+    посимвольно. Таблица замен и регулярные выражения собираются один раз при создании.
+    Замены выполняются через класс символов, а не str.translate: для
+    не-ASCII текста translate работает посимвольно и в разы медленнее.
+    """
+
+    def __init__(self):
+        self._table: Dict[str, str] = {char: "" for char in _INVISIBLE}
+        self._table.update(_HOMOGLYPHS)
+        self._pattern = re.compile("[" + re.escape("".join(self._table)) + "]")
+        self._lookup = self._table.__getitem__
+
+    def _replace(self, match: re.Match) -> str:
+        return self._lookup(match.group())
+
+    def normalize(self, text: str) -> str:
+        text = self._pattern.sub(self._replace, text.lower())
+        text = _SPACED_LETTERS.sub(_join_spaced, text)
+        # Leetspeak разбирается по словам и после склейки разрядки: "1 w i n" -> "1win" -> "1w1n"
+        return _LEET_WORD.sub(_decode_leet, text)
+
+
+# Общий экземпляр нормализатора
+text_normalizer = TextNormalizer()
@@ -1,3 +1,4 @@
 from . import admin_commands
+from . import channel_posts
 from . import moderation
 from . import personal_commands
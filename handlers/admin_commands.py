@@ -1,21 +1,21 @@
 import os
-from aiogram import Router, Bot, F
+from aiogram import Router, Bot
 from aiogram.types import Message, ChatMemberAdministrator, ChatPermissions, ChatMemberOwner, ChatMemberBanned
 from aiogram.filters import Command, CommandObject, BaseFilter
 from aiogram.exceptions import TelegramBadRequest
 from dotenv import load_dotenv
 from datetime import datetime, timedelta, timezone
-from sqlalchemy.future import select
 from database.database import AsyncSessionLocal
-from database.models import Warning, UserStats
+from database.repository import add_warning, get_warned_users, remove_warning
 from datetime import datetime
 from config import get_settings
 from utils.logger import BotLogger
 from typing import Tuple, Optional
-from sqlalchemy import select
-from sqlalchemy import func
-from functools import wraps
+from utils.chat_access import allowed_chat_only
 from utils.command_logging import log_command
+from utils.member_cache import member_cache
+from utils.leaderboard import leaderboard
+from utils.user_directory import user_directory
 
 # Загружаем переменные окружения из файла .env
 load_dotenv()
@@ -26,19 +26,6 @@ router = Router()
 logger = BotLogger.get_logger()
 settings = get_settings()
 
-def allowed_chat_only():
-    def decorator(func):
-        @wraps(func)
-        async def wrapper(message: Message, *args, **kwargs):
-            if message.chat.id != settings.CHAT_ID:
-                logger.warning(
-                    f"Попытка использования команды в неразрешенном чате: {message.chat.id}"
-                )
-                return
-            return await func(message, *args, **kwargs)
-        return wrapper
-    return decorator
-
 class IsAdmin(BaseFilter):
     async def __call__(self, message: Message) -> bool:
         # Проверяем список админов из конфига
@@ -48,11 +35,10 @@ class IsAdmin(BaseFilter):
         # Проверяем сообщение от имени канала/чата
         if message.sender_chat:
             try:
-                # Получаем информацию о владельце канала/чата
-                chat_info = await message.bot.get_chat(message.sender_chat.id)
-                if chat_info.type in ['channel', 'supergroup']:
+                # Тип отправителя уже есть в сообщении, запрашивать чат не нужно
+                if message.sender_chat.type in ['channel', 'supergroup']:
                     # Проверяем, является ли отправитель владельцем канала/чата
-                    admins = await message.bot.get_chat_administrators(message.chat.id)
+                    admins = await member_cache.get_administrators(message.bot, message.chat.id)
                     for admin in admins:
                         if isinstance(admin, ChatMemberOwner):
                             return True
@@ -62,7 +48,7 @@ class IsAdmin(BaseFilter):
             
         # Проверяем обычные права в чате
         try:
-            chat_member = await message.chat.get_member(message.from_user.id)
+            chat_member = await member_cache.get_member(message.bot, message.chat.id, message.from_user.id)
             return isinstance(chat_member, (ChatMemberOwner, ChatMemberAdministrator))
         except Exception as e:
             logger.error(f"Error checking admin rights: {e}")
@@ -79,7 +65,7 @@ async def check_admin_rights(message: Message) -> Tuple[bool, Optional[str]]:
         return False, "У вас недостаточно прав!"
     
     try:
-        admin_member = await message.bot.get_chat_member(message.chat.id, message.from_user.id)
+        admin_member = await member_cache.get_member(message.bot, message.chat.id, message.from_user.id)
         if isinstance(admin_member, (ChatMemberOwner, ChatMemberAdministrator)):
             return True, None
         return False, "У вас недостаточно прав!"
@@ -90,7 +76,7 @@ async def check_admin_rights(message: Message) -> Tuple[bool, Optional[str]]:
 async def check_bot_rights(message: Message) -> Tuple[bool, Optional[str]]:
     """Проверка прав бота"""
     try:
-        bot_member = await message.bot.get_chat_member(message.chat.id, message.bot.id)
+        bot_member = await member_cache.get_member(message.bot, message.chat.id, message.bot.id)
         if isinstance(bot_member, ChatMemberAdministrator) and bot_member.can_restrict_members:
             return True, None
         return False, "У меня недостаточно прав для управления участниками."
@@ -127,7 +113,7 @@ async def ban_user(message: Message):
             await message.reply("Админов банишь? Ай-ай-ай 😈")
             return
 
-        target_member = await message.bot.get_chat_member(chat_id, user_id)
+        target_member = await member_cache.get_member(message.bot, chat_id, user_id)
         if isinstance(target_member, (ChatMemberOwner, ChatMemberAdministrator)):
             await message.reply("Невозможно забанить администратора.")
             return
@@ -138,6 +124,7 @@ async def ban_user(message: Message):
             user_id=user_id,
             revoke_messages=True
         )
+        member_cache.invalidate(chat_id, user_id)
 
         await message.reply(
             f"Пользователь {message.reply_to_message.from_user.full_name} "
@@ -180,6 +167,7 @@ async def unban_user(message: Message):
             user_id=user_id,
             only_if_banned=True
         )
+        member_cache.invalidate(chat_id, user_id)
 
         await message.reply(
             f"Пользователь {message.reply_to_message.from_user.full_name} "
@@ -228,7 +216,7 @@ async def kick_user(message: Message):
             return
 
         # Проверяем права цели
-        target_member = await message.bot.get_chat_member(chat_id, user_id)
+        target_member = await member_cache.get_member(message.bot, chat_id, user_id)
         if isinstance(target_member, (ChatMemberOwner, ChatMemberAdministrator)):
             await message.reply("Невозможно кикнуть администратора.")
             return
@@ -246,6 +234,7 @@ async def kick_user(message: Message):
             user_id=user_id,
             only_if_banned=True
         )
+        member_cache.invalidate(chat_id, user_id)
 
         await message.reply(f"Пользователь {user_name} был удален из чата.")
         logger.info(f"User {user_id} was kicked from chat {chat_id}")
@@ -284,29 +273,19 @@ async def warn_user(message: Message):
             await message.reply("Админов предупреждаешь? Ай-ай-ай 😈")
             return
 
-        target_member = await message.bot.get_chat_member(chat_id, user_id)
+        target_member = await member_cache.get_member(message.bot, chat_id, user_id)
         if isinstance(target_member, (ChatMemberOwner, ChatMemberAdministrator)):
             await message.reply("Невозможно выдать предупреждение администратору.")
             return
 
-        # Получаем или создаем запись предупреждений
+        # Атомарно добавляем предупреждение и получаем новое количество
         async with AsyncSessionLocal() as session:
-            stmt = select(Warning).where(Warning.chat_id == chat_id, Warning.user_id == user_id)
-            result = await session.execute(stmt)
-            warning = result.scalars().first()
-
-            if not warning:
-                warning = Warning(chat_id=chat_id, user_id=user_id, warning_count=1, last_warning=datetime.now(timezone.utc))
-                session.add(warning)
-            else:
-                warning.warning_count += 1
-                warning.last_warning = datetime.now(timezone.utc)
-
-            await session.commit()
+            async with session.begin():
+                warning_count = await add_warning(session, chat_id, user_id)
 
         await message.reply(
             f"Пользователю {message.reply_to_message.from_user.full_name} "
-            f"выдано предупреждение. Всего предупреждений: {warning.warning_count}"
+            f"выдано предупреждение. Всего предупреждений: {warning_count}"
         )
         logger.info(f"Warning issued to user {user_id} in chat {chat_id}")
 
@@ -356,20 +335,16 @@ async def remove_warn(message: Message, command: CommandObject):
             return
 
         async with AsyncSessionLocal() as session:
-            stmt = select(Warning).where(Warning.chat_id == chat_id, Warning.user_id == user_id)
-            result = await session.execute(stmt)
-            warning = result.scalars().first()
-
-            if not warning or warning.warning_count == 0:
-                await message.reply(f"У пользователя нет активных предупреждений.")
-                return
+            async with session.begin():
+                warning_count = await remove_warning(session, chat_id, user_id)
 
-            warning.warning_count -= 1
-            await session.commit()
+        if warning_count is None:
+            await message.reply(f"У пользователя нет активных предупреждений.")
+            return
 
         await message.reply(
             f"С пользователя {user_name} снято предупреждение. "
-            f"Осталось предупреждений: {warning.warning_count}"
+            f"Осталось предупреждений: {warning_count}"
         )
         logger.info(f"Warning removed from user {user_id} in chat {chat_id}")
 
@@ -392,28 +367,30 @@ async def list_warns(message: Message):
 
     try:
         async with AsyncSessionLocal() as session:
-            stmt = select(Warning).where(Warning.chat_id == chat_id, Warning.warning_count > 0)
-            result = await session.execute(stmt)
-            warnings = result.scalars().all()
-
-            if not warnings:
-                await message.reply("В этом чате нет пользователей с предупреждениями.")
-                return
-
-            warn_list = []
-            for warning in warnings:
-                try:
-                    member = await message.chat.get_member(warning.user_id)
-                    user = member.user
-                    user_name = f"@{user.username}" if user.username else user.full_name
-                except Exception:
-                    user_name = f"Пользователь {warning.user_id}"
-                
-                warn_list.append(f"{user_name} (ID: {warning.user_id}): {warning.warning_count} предупреждение(ий)")
-
-            warn_list_str = "\n".join(warn_list)
-            await message.reply(f"Список предупреждений:\n{warn_list_str}")
-            logger.info(f"Warnings list requested in chat {chat_id}")
+            rows = await get_warned_users(session, chat_id)
+
+        if not rows:
+            await message.reply("В этом чате нет пользователей с предупреждениями.")
+            return
+
+        # Имена берём из справочника, API дергаем только для отсутствующих и устаревших
+        users = await user_directory.resolve(
+            message.bot, chat_id, [(warning.user_id, user) for warning, user in rows]
+        )
+
+        warn_list = []
+        for warning, _ in rows:
+            user = users.get(warning.user_id)
+            if user is None:
+                user_name = f"Пользователь {warning.user_id}"
+            else:
+                user_name = f"@{user.username}" if user.username else user.full_name
+
+            warn_list.append(f"{user_name} (ID: {warning.user_id}): {warning.warning_count} предупреждение(ий)")
+
+        warn_list_str = "\n".join(warn_list)
+        await message.reply(f"Список предупреждений:\n{warn_list_str}")
+        logger.info(f"Warnings list requested in chat {chat_id}")
 
     except Exception as e:
         error_msg = f"Ошибка при получении списка предупреждений: {str(e)}"
@@ -467,7 +444,7 @@ async def mute_user(message: Message, command: CommandObject):
             return
 
         # Проверяем права цели
-        target_member = await message.bot.get_chat_member(chat_id, user_id)
+        target_member = await member_cache.get_member(message.bot, chat_id, user_id)
         if isinstance(target_member, (ChatMemberOwner, ChatMemberAdministrator)):
             await message.reply("Невозможно замутить администратора.")
             return
@@ -486,6 +463,7 @@ async def mute_user(message: Message, command: CommandObject):
             ),
             until_date=until_date
         )
+        member_cache.invalidate(chat_id, user_id)
 
         await message.reply(f"Пользователь {user_name} замучен на {duration} минут.")
         logger.info(f"User {user_id} was muted in chat {chat_id} for {duration} minutes")
@@ -530,7 +508,7 @@ async def unmute_user(message: Message):
             await message.reply("Админы не могут быть замучены 😎")
             return
 
-        target_member = await message.bot.get_chat_member(chat_id, user_id)
+        target_member = await member_cache.get_member(message.bot, chat_id, user_id)
         if isinstance(target_member, (ChatMemberOwner, ChatMemberAdministrator)):
             await message.reply("Администраторы не могут быть замучены.")
             return
@@ -545,6 +523,7 @@ async def unmute_user(message: Message):
                 can_add_web_page_previews=True
             )
         )
+        member_cache.invalidate(chat_id, user_id)
 
         await message.reply(f"С пользователя {user_name} снят мут.")
         logger.info(f"User {user_id} was unmuted in chat {chat_id}")
@@ -685,18 +664,8 @@ async def user_info(message: Message):
         # Получаем информацию о пользователе в чате
         member = await message.chat.get_member(user.id)
         
-        # Получаем статистику пользователя из базы данных
-        async with AsyncSessionLocal() as session:
-            async with session.begin():  # Явно начинаем транзакцию
-                stats = await session.execute(
-                    select(UserStats)
-                    .where(
-                        UserStats.user_id == user.id,
-                        UserStats.chat_id == message.chat.id
-                    )
-                )
-                user_stats = stats.scalar_one_or_none()
-                messages_count = user_stats.message_count if user_stats else 0
+        # Счётчик из топа в памяти: включает ещё не записанные в базу сообщения
+        messages_count = await leaderboard.count(message.chat.id, user.id) or 0
         
         # Формируем сообщение с информацией
         info = [
@@ -748,27 +717,17 @@ async def chat_stats(message: Message):
         admins = await message.bot.get_chat_administrators(chat.id)
         members_count = await message.bot.get_chat_member_count(chat.id)
 
-        # Получаем статистику сообщений из базы данных
-        async with AsyncSessionLocal() as session:
-            logger.info("Querying database for message statistics")
+        # Итог и топ поддерживаются в памяти и не требуют запросов к user_stats
+        total_messages = await leaderboard.total(chat.id)
+        logger.info(f"Total messages in chat: {total_messages}")
 
-            # Общее количество сообщений в чате
-            total_messages_query = await session.execute(
-                select(func.coalesce(func.sum(UserStats.message_count), 0))
-                .where(UserStats.chat_id == chat.id)
-            )
-            total_messages = total_messages_query.scalar()
-            logger.info(f"Total messages in chat: {total_messages}")
-
-            # Топ 5 самых активных пользователей
-            top_users_query = await session.execute(
-                select(UserStats)
-                .where(UserStats.chat_id == chat.id)
-                .order_by(UserStats.message_count.desc())
-                .limit(5)
-            )
-            top_users = top_users_query.scalars().all()
-            logger.info(f"Found {len(top_users)} top users")
+        # Топ 5 самых активных пользователей вместе с именами из справочника
+        top_users = await leaderboard.top(chat.id, limit=5)
+        logger.info(f"Found {len(top_users)} top users")
+
+        users = await user_directory.get_users(
+            message.bot, chat.id, [user_id for user_id, _ in top_users]
+        )
 
         # Формируем статистику
         stats = [
@@ -794,14 +753,12 @@ async def chat_stats(message: Message):
                 "",
                 "🏆 *Топ 5 активных участников:*"
             ])
-            for i, user_stat in enumerate(top_users, 1):
-                try:
-                    member = await chat.get_member(user_stat.user_id)
-                    user_name = member.user.full_name
-                    stats.append(f"{i}. {user_name}: {user_stat.message_count} сообщ.")
-                except Exception as e:
-                    logger.error(f"Error getting member info: {e}")
-                    stats.append(f"{i}. ID {user_stat.user_id}: {user_stat.message_count} сообщ.")
+            for i, (user_id, message_count) in enumerate(top_users, 1):
+                user = users.get(user_id)
+                if user is not None:
+                    stats.append(f"{i}. {user.full_name}: {message_count} сообщ.")
+                else:
+                    stats.append(f"{i}. ID {user_id}: {message_count} сообщ.")
 
         # Добавляем описание чата если оно есть
         if chat.description:
@@ -890,6 +847,7 @@ async def temp_ban(message: Message, command: CommandObject):
             user_id=user_id,
             until_date=until_date
         )
+        member_cache.invalidate(message.chat.id, user_id)
         await message.reply(
             f"Пользователь {user_name} забанен на {time_input}.\n"
             f"Бан истечет: {until_date.strftime('%d.%m.%Y %H:%M:%S')} UTC"
@@ -901,40 +859,3 @@ async def temp_ban(message: Message, command: CommandObject):
     except Exception as e:
         await message.reply(f"Неизвестная ошибка: {str(e)}")
         logger.error(f"Неизвестная ошибка при бане пользователя {user_id} в чате {message.chat.id}: {str(e)}")
-
-
-@router.message(F.text)
-async def count_messages(message: Message):
-    await log_command(message)
-    """Подсчитывает сообщения пользователей только в определенном чате"""
-    # Проверяем, что сообщение из нужного чата
-    if message.chat.id != settings.CHAT_ID:
-        return
-        
-    try:
-        async with AsyncSessionLocal() as session:
-            async with session.begin():
-                stmt = select(UserStats).where(
-                    UserStats.user_id == message.from_user.id,
-                    UserStats.chat_id == message.chat.id
-                ).with_for_update()
-                
-                result = await session.execute(stmt)
-                user_stats = result.scalar_one_or_none()
-                
-                if not user_stats:
-                    user_stats = UserStats(
-                        user_id=message.from_user.id,
-                        chat_id=message.chat.id,
-                        message_count=1,
-                        last_message_date=datetime.now(timezone.utc)
-                    )
-                    session.add(user_stats)
-                else:
-                    user_stats.message_count += 1
-                    user_stats.last_message_date = datetime.now(timezone.utc)
-                
-                await session.commit()
-            
-    except Exception as e:
-        logger.error(f"Error counting message: {e}")
\ No newline at end of file
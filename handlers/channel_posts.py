@@ -0,0 +1,123 @@
+import asyncio
+from typing import Any, Dict, Optional, Union
+from aiogram import Bot, Router
+from aiogram.filters import BaseFilter
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup, Message, MessageOriginChannel
+from cachetools import TTLCache
+from config import get_settings
+from utils.logger import BotLogger
+
+logger = BotLogger.get_logger()
+settings = get_settings()
+
+router = Router()
+
+# id поста в канале -> future, который ждёт id его копии в чате обсуждения
+_waiters: Dict[int, asyncio.Future] = {}
+# Копии, пришедшие раньше самого поста: id поста -> id копии в чате
+_early_copies: TTLCache = TTLCache(maxsize=256, ttl=settings.RULES_COMMENT_WAIT_TIMEOUT)
+
+
+def _channel_post_id(message: Optional[Message]) -> Optional[int]:
+    """id поста нашего канала, копией которого является сообщение"""
+    origin = getattr(message, "forward_origin", None)
+    if isinstance(origin, MessageOriginChannel) and origin.chat.id == settings.CHANNEL_ID:
+        return origin.message_id
+    return None
+
+
+class IsChannelPostCopy(BaseFilter):
+    """
+    Автоматически пересланная копия поста канала в чате обсуждения
+    или служебное сообщение о её закреплении.
+    """
+
+    async def __call__(self, message: Message) -> Union[bool, Dict[str, Any]]:
+        if message.chat.id != settings.CHAT_ID:
+            return False
+
+        if message.is_automatic_forward:
+            source = message
+        elif message.pinned_message:
+            source = message.pinned_message
+        else:
+            return False
+
+        post_id = _channel_post_id(source)
+        if post_id is None:
+            return False
+        return {"channel_post_id": post_id, "copy_message_id": source.message_id}
+
+
+@router.message(IsChannelPostCopy())
+async def handle_channel_post_copy(message: Message, channel_post_id: int, copy_message_id: int):
+    """Передаёт id копии поста обработчику, который ждёт её для комментария"""
+    waiter = _waiters.get(channel_post_id)
+    if waiter is not None:
+        if not waiter.done():
+            waiter.set_result(copy_message_id)
+    elif channel_post_id not in _early_copies:
+        _early_copies[channel_post_id] = copy_message_id
+
+
+async def _poll_pinned_copy(bot: Bot, post_id: int) -> Optional[int]:
+    """Запасной вариант: ищем копию поста среди закреплённых с экспоненциальной задержкой"""
+    delay = 2
+    for attempt in range(1, settings.RULES_COMMENT_POLL_ATTEMPTS + 1):
+        chat = await bot.get_chat(settings.CHAT_ID)
+        if _channel_post_id(chat.pinned_message) == post_id:
+            return chat.pinned_message.message_id
+
+        logger.info(f"Попытка {attempt}: закреплённая копия поста {post_id} ещё не найдена")
+        await asyncio.sleep(delay)
+        delay *= 2
+    return None
+
+
+@router.channel_post()
+async def handle_channel_post(message: Message):
+    channel_id = settings.CHANNEL_ID
+    message_id = message.message_id
+    logger.info(f"Получено новое сообщение в канале {channel_id}: {message_id}")
+
+    if message.chat.id != channel_id:
+        return
+
+    try:
+        # Копия могла прийти раньше самого поста
+        copy_id = _early_copies.pop(message_id, None)
+
+        if copy_id is None:
+            waiter = asyncio.get_running_loop().create_future()
+            _waiters[message_id] = waiter
+            try:
+                copy_id = await asyncio.wait_for(waiter, timeout=settings.RULES_COMMENT_WAIT_TIMEOUT)
+            except asyncio.TimeoutError:
+                logger.warning(f"Копия поста {message_id} не пришла за {settings.RULES_COMMENT_WAIT_TIMEOUT} с, проверяем закреп")
+                copy_id = await _poll_pinned_copy(message.bot, message_id)
+            finally:
+                _waiters.pop(message_id, None)
+
+        if copy_id is None:
+            logger.error("Превышено максимальное количество попыток")
+            return
+
+        keyboard = InlineKeyboardMarkup(inline_keyboard=[
+            [InlineKeyboardButton(text="Правила", callback_data='chat_rules')]
+        ])
+
+        await message.bot.send_message(
+            chat_id=settings.CHAT_ID,
+            text=(
+                "⬇️ Прежде чем писать, ознакомься с правилами! ⬇️"
+            ),
+            parse_mode="Markdown",
+            disable_web_page_preview=True,
+            reply_to_message_id=copy_id,
+            reply_markup=keyboard
+        )
+        logger.info(f"✅ Комментарий отправлен к закрепленному сообщению в супергруппе")
+
+    except Exception as e:
+        error_msg = f"❌ Ошибка при отправке комментария: {str(e)}"
+        logger.error(error_msg)
@@ -1,14 +1,13 @@
 from aiogram import Router
 from aiogram.types import Message
 from filters.bad_word_filters import ContainsForbiddenWord
-from sqlalchemy.future import select
-from sqlalchemy.exc import NoResultFound
+from handlers.admin_commands import IsAdmin
 from database.database import AsyncSessionLocal
-from database.models import Warning
-from datetime import datetime, timezone
+from database.repository import add_warning, reset_warnings
 from utils.logger import BotLogger
+from utils.member_cache import member_cache
+from utils.scheduler import scheduler
 from middlewares.spam_filter import SpamFilter
-import asyncio
 from config import get_settings
 
 router = Router()
@@ -21,46 +20,36 @@ WARN_LIMIT = 3  # Лимит предупреждений
 # Добавляем в начало файла
 spam_filter = SpamFilter()
 
-@router.message(ContainsForbiddenWord())
-async def handle_forbidden_words(message: Message):
-    logger.info(f"Deleted message with forbidden words from user {message.from_user.id} in chat {message.chat.id}")
+# Администраторы не модерируются; права проверяются только для сообщений с совпадениями
+@router.message(ContainsForbiddenWord(), ~IsAdmin())
+async def handle_forbidden_words(message: Message, forbidden_matches: list):
+    found_words = ", ".join(sorted({word for _, word in forbidden_matches}))
+    logger.info(
+        f"Deleted message with forbidden words ({found_words}) "
+        f"from user {message.from_user.id} in chat {message.chat.id}"
+    )
     await message.delete()
     chat_id = message.chat.id
     user_id = message.from_user.id
 
     async with AsyncSessionLocal() as session:
-        stmt = select(Warning).where(Warning.chat_id == chat_id, Warning.user_id == user_id)
-        result = await session.execute(stmt)
-        warning = result.scalars().first()
+        async with session.begin():
+            warning_count = await add_warning(session, chat_id, user_id)
 
-        if warning:
-            current_warnings = warning.warning_count
-            warning.warning_count += 1
-            warning.last_warning = datetime.now(timezone.utc)
-        else:
-            warning = Warning(
-                chat_id=chat_id,
-                user_id=user_id,
-                warning_count=1,
-                last_warning=datetime.now(timezone.utc)
-            )
-            session.add(warning)
-            current_warnings = 1
-
-        await session.commit()
-
-        if warning.warning_count >= WARN_LIMIT:
-            try:
-                await message.chat.ban(user_id)
-                await message.answer(f"Пользователь {message.from_user.full_name} был исключен из чата за превышение лимита предупреждений ({WARN_LIMIT}).")
-                await message.chat.unban(user_id)
-                # Сброс предупреждений после исключения
-                await session.delete(warning)
-                await session.commit()
-            except Exception as e:
-                await message.answer(f"Не удалось исключить пользователя: {e}")
-        else:
-            await message.answer(f"Сообщение с запрещёнными словами было удалено. Предупреждение {warning.warning_count}/{WARN_LIMIT}.")  
+    if warning_count >= WARN_LIMIT:
+        try:
+            await message.chat.ban(user_id)
+            await message.answer(f"Пользователь {message.from_user.full_name} был исключен из чата за превышение лимита предупреждений ({WARN_LIMIT}).")
+            await message.chat.unban(user_id)
+            member_cache.invalidate(chat_id, user_id)
+            # Сброс предупреждений после исключения
+            async with AsyncSessionLocal() as session:
+                async with session.begin():
+                    await reset_warnings(session, chat_id, user_id)
+        except Exception as e:
+            await message.answer(f"Не удалось исключить пользователя: {e}")
+    else:
+        await message.answer(f"Сообщение с запрещёнными словами было удалено. Предупреждение {warning_count}/{WARN_LIMIT}.")  
 
 # @router.message(spam_filter)
 async def handle_spam(message: Message, spam_type: str, time_window: float = None):
@@ -83,9 +72,8 @@ async def handle_spam(message: Message, spam_type: str, time_window: float = Non
             f"👤 Пользователь: {message.from_user.mention_html()}"
         )
         
-        # Удаляем предупреждение через некоторое время
-        await asyncio.sleep(settings.MESSAGE_DELETION_DELAY)
-        await warn_msg.delete()
+        # Удаляем предупреждение через некоторое время, не задерживая обработку
+        await scheduler.delete_later(warn_msg.chat.id, warn_msg.message_id, settings.MESSAGE_DELETION_DELAY)
         
         logger.info(
             f"Spam detected from user {message.from_user.id}, "
@@ -1,13 +1,17 @@
+from utils.content_store import about_store
+from utils.error_notifier import error_notifier
 from utils.logger import BotLogger
+from utils.member_cache import member_cache
+from utils.profiling import capture_cprofile, is_capturing
+import asyncio
+import time
 from aiogram import Router, Bot, F
-from aiogram.types import Message, ChatMemberUpdated
-from aiogram.filters import Command
+from aiogram.types import BufferedInputFile, Message, ChatMemberUpdated
+from aiogram.filters import Command, CommandObject
 from config import get_settings
 from aiogram.types import CallbackQuery
-from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-import asyncio
 
 
 # Настройка логирования и конфигурации
@@ -26,6 +30,9 @@ async def handle_bot_status_update(update: ChatMemberUpdated, bot: Bot) -> None:
     Обработчик изменений статуса бота в чате.
     Логирует изменения и выполняет необходимые действия.
     """
+    # Права бота изменились: сбрасываем закэшированный статус
+    member_cache.set_member(update.chat.id, update.new_chat_member)
+
     try:
         logger.info(
             f"Bot status updated in chat {update.chat.id}. "
@@ -43,6 +50,9 @@ async def handle_user_update(update: ChatMemberUpdated, bot: Bot) -> None:
     """
     Обработчик для приветствия новых участников чата.
     """
+    # Любое изменение статуса участника обновляет кэш (вход, выход, повышение, ограничения)
+    member_cache.set_member(update.chat.id, update.new_chat_member)
+
     try:
         # Проверяем, что это новый участник
         if update.old_chat_member.status != update.new_chat_member.status:
@@ -99,10 +109,8 @@ async def process_about_text(message: Message, state: FSMContext):
         return
 
     try:
-        # Здесь можно добавить сохранение текста в базу данных или файл
-        # Для примера сохраним в файл
-        with open('data/about_text.txt', 'w', encoding='utf-8') as f:
-            f.write(message.text)
+        # Атомарная запись в файл, кэш /about обновляется сразу
+        await about_store.write(message.text)
 
         await message.answer("✅ Информация о боте успешно обновлена!")
         await state.clear()
@@ -120,10 +128,8 @@ async def view_about_command(message: Message):
 
     try:
         # Чтение текущего текста
-        try:
-            with open('data/about_text.txt', 'r', encoding='utf-8') as f:
-                about_text = f.read()
-        except FileNotFoundError:
+        about_text = await about_store.read()
+        if about_text is None:
             about_text = "Информация о боте ещё не настроена."
 
         await message.answer(
@@ -134,6 +140,50 @@ async def view_about_command(message: Message):
     except Exception as e:
         logger.error(f"Ошибка при чтении информации о боте: {e}")
         await message.answer("❌ Произошла ошибка при чтении информации.")
+
+# Ссылки на фоновые задачи профилирования, чтобы их не собрал сборщик мусора
+_capture_tasks = set()
+
+async def _send_cprofile(bot: Bot, chat_id: int, seconds: int) -> None:
+    try:
+        report, raw = await capture_cprofile(seconds)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        await bot.send_document(
+            chat_id,
+            BufferedInputFile(report.encode("utf-8"), filename=f"cprofile-{stamp}.txt"),
+            caption=f"📊 Профиль за {seconds} с (по суммарному времени)"
+        )
+        await bot.send_document(
+            chat_id,
+            BufferedInputFile(raw, filename=f"cprofile-{stamp}.prof"),
+            caption="Для pstats или snakeviz"
+        )
+    except Exception as e:
+        logger.error(f"Ошибка при снятии профиля: {e}", exc_info=True)
+        await bot.send_message(chat_id, "❌ Не удалось снять профиль.")
+
+@router.message(Command("cprofile"))
+async def cprofile_command(message: Message, command: CommandObject, bot: Bot):
+    """Снимает профиль cProfile за N секунд и присылает его владельцу"""
+    if message.chat.type != "private" or message.from_user.id != settings.OWNER_ID:
+        return
+
+    try:
+        seconds = int(command.args) if command.args else 30
+    except ValueError:
+        await message.answer("Использование: /cprofile [секунд]")
+        return
+    seconds = max(1, min(seconds, settings.PROFILER_MAX_CAPTURE))
+
+    if is_capturing():
+        await message.answer("Профиль уже снимается, дождитесь результата.")
+        return
+
+    # Запись идёт в фоне, иначе сам обработчик попал бы в медленные
+    task = asyncio.create_task(_send_cprofile(bot, message.chat.id, seconds))
+    _capture_tasks.add(task)
+    task.add_done_callback(_capture_tasks.discard)
+    await message.answer(f"⏱ Профилирование запущено на {seconds} с.")
         
 @router.message()
 async def handle_messages(message: Message) -> None:
@@ -163,76 +213,9 @@ async def handle_messages(message: Message) -> None:
 
     except Exception as e:
         logger.error(f"Ошибка при обработке сообщения: {e}", exc_info=True)
-        try:
-            await message.bot.send_message(
-                chat_id=settings.SHARECHAT_ID,
-                text=f"❗️ Ошибка при обработке сообщения:\n{str(e)}"
-            )
-        except Exception as api_error:
-            logger.error(f"Не удалось отправить уведомление об ошибке: {api_error}")
+        error_notifier.report(e, f"сообщение в чате {message.chat.id}")
             
 
-@router.channel_post()
-async def handle_channel_post(message: Message):
-    channel_id = settings.CHANNEL_ID
-    message_id = message.message_id
-    logger.info(f"Получено новое сообщение в канале {channel_id}: {message_id}")
-
-    try:
-        # Сначала ждем подольше, чтобы сообщение точно успело закрепиться
-        await asyncio.sleep(10)
-        
-        # Максимальное количество попыток
-        max_attempts = 12  # Увеличили количество попыток
-        attempt = 0
-        
-        while attempt < max_attempts:
-            # Получаем информацию о чате и закрепленном сообщении
-            chat = await message.bot.get_chat(settings.CHAT_ID)
-            
-            if not chat.pinned_message:
-                logger.error("Закрепленное сообщение не найдено")
-                await asyncio.sleep(5)
-                attempt += 1
-                continue
-            
-            pinned = chat.pinned_message
-            
-            # Проверяем, что это нужное сообщение из канала
-            if (pinned.forward_from_chat and 
-                pinned.forward_from_chat.id == channel_id and 
-                pinned.forward_from_message_id == message_id):
-                
-                
-                keyboard = InlineKeyboardMarkup(inline_keyboard=[
-                    [InlineKeyboardButton(text="Правила", callback_data='chat_rules')]
-                ])
-                
-                await message.bot.send_message(
-                    chat_id=settings.CHAT_ID,
-                    text=(
-                        "⬇️ Прежде чем писать, ознакомься с правилами! ⬇️"
-                    ),
-                    parse_mode="Markdown",
-                    disable_web_page_preview=True,
-                    reply_to_message_id=pinned.message_id,
-                    reply_markup=keyboard
-                )
-                logger.info(f"✅ Комментарий отправлен к закрепленному сообщению в супергруппе")
-                return
-            else:
-                logger.info(f"Попытка {attempt}: Ждем нужное сообщение (текущее: {pinned.forward_from_message_id}, ожидаем: {message_id})")
-            
-            await asyncio.sleep(5)
-            attempt += 1
-        
-        logger.error("Превышено максимальное количество попыток")
-            
-    except Exception as e:
-        error_msg = f"❌ Ошибка при отправке комментария: {str(e)}"
-        logger.error(error_msg)
-            
-            
 @router.callback_query(F.data == 'chat_rules')
 async def chat_rules(callback: CallbackQuery):
     rules_text = (
@@ -3,34 +3,23 @@ from aiogram.types import Message
 from aiogram.filters import Command
 from utils.logger import BotLogger
 from config import get_settings
-import time
-import psutil
+import asyncio
 import platform
 from datetime import datetime
-from sqlalchemy import select, func
-from database.models import UserStats
-from database.database import AsyncSessionLocal
+from database.database import engine, pool_usage
 import html
+from utils.chat_access import allowed_chat_only
 from utils.command_logging import log_command
+from utils.content_store import about_store
+from utils.member_cache import member_cache
+from utils.leaderboard import leaderboard
+from utils.user_directory import user_directory
+from utils.runtime_stats import RollingWindow, runtime_monitor
+from middlewares.request_scheduler import request_scheduler
 router = Router()
 logger = BotLogger.get_logger()
 settings = get_settings()
 
-from functools import wraps
-
-def allowed_chat_only():
-    def decorator(func):
-        @wraps(func)
-        async def wrapper(message: Message, *args, **kwargs):
-            if message.chat.id != settings.CHAT_ID:
-                logger.warning(
-                    f"Попытка использования команды в неразрешенном чате: {message.chat.id}"
-                )
-                return
-            return await func(message, *args, **kwargs)
-        return wrapper
-    return decorator
-
 @router.message(Command("report"))
 @allowed_chat_only()
 async def report_user(message: Message, bot: Bot):
@@ -58,7 +47,7 @@ async def report_user(message: Message, bot: Bot):
 
         # Проверка на админа из конфига и на админа чата
         try:
-            chat_member = await bot.get_chat_member(message.chat.id, reported_user.id)
+            chat_member = await member_cache.get_member(bot, message.chat.id, reported_user.id)
             is_admin = (
                 reported_user.id in settings.admin_ids_list or 
                 chat_member.status in ['administrator', 'creator']
@@ -118,11 +107,9 @@ async def about_bot(message: Message):
     try:
         logger.info(f"Команда /about вызвана пользователем {message.from_user.id}")
         
-        # Пытаемся прочитать кастомный текст
-        try:
-            with open('data/about_text.txt', 'r', encoding='utf-8') as f:
-                about_text = f.read()
-        except FileNotFoundError:
+        # Пытаемся прочитать кастомный текст (из кэша, файл перечитывается только при изменении)
+        about_text = await about_store.read()
+        if about_text is None:
             # Используем текст по умолчанию, если файл не найден
             bot_version = "1.0.0"
             about_text = (
@@ -380,69 +367,73 @@ async def help_command(message: Message):
         logger.error(f"{error_msg}: {str(e)}", exc_info=True)
         await message.reply(f"{error_msg}. Пожалуйста, попробуйте позже.")
 
+def _format_percentiles(window: RollingWindow, scale: float, unit: str) -> str:
+    values = window.percentiles()
+    if values is None:
+        return "нет данных"
+    return " / ".join(f"{value * scale:.1f}" for value in values) + f" {unit}"
+
 @router.message(Command("ping"))
 @allowed_chat_only()
 async def ping_command(message: Message):
     await log_command(message)
     """
-    Проверяет работоспособность бота и показывает системную информацию.
+    Показывает задержки из скользящих окон монитора и системную информацию.
+    Ничего не замеряет заново, поэтому отвечает одним сообщением.
     """
     try:
         logger.info(f"Команда /ping вызвана пользователем {message.from_user.id}")
-        
-        # Замеряем время ответа
-        start = time.perf_counter()
-        ping_msg = await message.reply("🔄 Проверка соединения...")
-        end = time.perf_counter()
-        
-        # Получаем информацию о системе
-        process = psutil.Process()
+
+        process = runtime_monitor.process
         memory_usage = process.memory_info().rss / 1024 / 1024
-        cpu_usage = psutil.cpu_percent()
-        
+        cpu_usage = runtime_monitor.cpu_percent
+
         # Форматируем время работы бота
         start_time = datetime.fromtimestamp(process.create_time())
         uptime = datetime.now() - start_time
         hours, remainder = divmod(int(uptime.total_seconds()), 3600)
         minutes, seconds = divmod(remainder, 60)
-        
+
+        pool = pool_usage(engine)
+        pool_text = (
+            f"{pool['checked_out']} из {pool['size']} (+{settings.DB_MAX_OVERFLOW})"
+            if pool is not None else "без пула"
+        )
+
         status_text = (
             "🏓 Понг!\n\n"
-            f"⏱ Задержка: <code>{(end - start) * 1000:.1f} мс</code>\n"
-            f"🔌 Соединение: <code>Стабильное</code>\n"
             f"⌛️ Аптайм: <code>{hours:02d}:{minutes:02d}:{seconds:02d}</code>\n\n"
+            "⏱ Задержки (p50 / p95 / p99):\n"
+            f"🔁 Цикл событий: <code>{_format_percentiles(runtime_monitor.loop_lag, 1000, 'мс')}</code>\n"
+            f"📨 Доставка обновлений: <code>{_format_percentiles(runtime_monitor.delivery_delay, 1, 'с')}</code>\n"
+            f"🌐 Bot API: <code>{_format_percentiles(runtime_monitor.api_latency, 1000, 'мс')}</code>\n\n"
+            "⚙️ Нагрузка:\n"
+            f"📋 Задач asyncio: <code>{len(asyncio.all_tasks())}</code>\n"
+            f"📤 Запросов в очереди к API: <code>{request_scheduler.waiting}</code>\n"
+            f"🗄 Соединений с БД: <code>{pool_text}</code>\n\n"
             "📊 Системная информация:\n"
             f"💾 RAM: <code>{memory_usage:.1f} MB</code>\n"
-            f"💻 CPU: <code>{cpu_usage}%</code>\n"
+            f"💻 CPU: <code>{f'{cpu_usage:.1f}%' if cpu_usage is not None else 'нет данных'}</code>\n"
             f"🖥 OS: <code>{platform.system()}</code>\n"
             f"🐍 Python: <code>{platform.python_version()}</code>"
         )
-        
-        await ping_msg.edit_text(
+
+        await message.reply(
             status_text,
             parse_mode="HTML",
             disable_web_page_preview=True
         )
-        
+
         logger.info(
             f"Ping выполнен успешно. "
-            f"Задержка: {(end - start) * 1000:.1f}мс, "
             f"RAM: {memory_usage:.1f}MB, "
             f"CPU: {cpu_usage}%"
         )
-        
+
     except Exception as e:
         error_msg = "Ошибка при проверке соединения"
         logger.error(f"{error_msg}: {str(e)}", exc_info=True)
-        
-        if 'ping_msg' in locals():
-            await ping_msg.edit_text(
-                f"❌ {error_msg}\n"
-                f"⚠️ Причина: {str(e)}",
-                parse_mode="HTML"
-            )
-        else:
-            await message.reply(f"❌ {error_msg}")
+        await message.reply(f"❌ {error_msg}")
 
 @router.message(Command("top"))
 @allowed_chat_only()
@@ -454,48 +445,44 @@ async def show_top_users(message: Message):
     try:
         logger.info(f"Команда /top вызвана пользователем {message.from_user.id}")
         
-        async with AsyncSessionLocal() as session:
-            query = (
-                select(UserStats)
-                .where(UserStats.chat_id == message.chat.id)
-                .order_by(UserStats.message_count.desc())
-                .limit(10)
-            )
-            result = await session.execute(query)
-            top_users = result.scalars().all()
-            
-            if not top_users:
-                await message.reply("📊 Статистика сообщений пока не собрана.")
-                return
-            
-            # Формируем сообщение с топом
-            top_text = ["<b>📊 Топ 10 активных участников:</b>\n"]
-            
-            for i, user_stat in enumerate(top_users, 1):
-                try:
-                    member = await message.chat.get_member(user_stat.user_id)
-                    user = member.user
-                    username = user.username if user.username else user.full_name
-                    
-                    medal = {1: "🥇", 2: "🥈", 3: "🥉"}.get(i, "•")
-                    msg_count = format_number(user_stat.message_count)
-                    
-                    top_text.append(
-                        f"{medal} {i}. <a href='tg://user?id={user.id}'>{username}</a>"
-                        f"\n└ Сообщений: <code>{msg_count}</code>"
-                    )
-                    
-                except Exception as e:
-                    logger.error(f"Ошибка при получении информации о пользователе {user_stat.user_id}: {e}")
-                    continue
-            
-            await message.reply(
-                "\n".join(top_text),
-                parse_mode="HTML",
-                disable_web_page_preview=True
+        # Топ поддерживается в памяти и не требует запроса к user_stats
+        top_users = await leaderboard.top(message.chat.id, limit=10)
+
+        if not top_users:
+            await message.reply("📊 Статистика сообщений пока не собрана.")
+            return
+
+        # Имена берём из справочника, API дергаем только для отсутствующих и устаревших
+        users = await user_directory.get_users(
+            message.bot, message.chat.id, [user_id for user_id, _ in top_users]
+        )
+
+        # Формируем сообщение с топом
+        top_text = ["<b>📊 Топ 10 активных участников:</b>\n"]
+
+        for i, (user_id, message_count) in enumerate(top_users, 1):
+            user = users.get(user_id)
+            if user is None:
+                logger.error(f"Не удалось получить информацию о пользователе {user_id}")
+                continue
+
+            username = user.username if user.username else user.full_name
+
+            medal = {1: "🥇", 2: "🥈", 3: "🥉"}.get(i, "•")
+            msg_count = format_number(message_count)
+
+            top_text.append(
+                f"{medal} {i}. <a href='tg://user?id={user.id}'>{username}</a>"
+                f"\n└ Сообщений: <code>{msg_count}</code>"
             )
-            
-            logger.info(f"Топ пользователей успешно отправлен в чат {message.chat.id}")
+
+        await message.reply(
+            "\n".join(top_text),
+            parse_mode="HTML",
+            disable_web_page_preview=True
+        )
+
+        logger.info(f"Топ пользователей успешно отправлен в чат {message.chat.id}")
             
     except Exception as e:
         error_msg = "Произошла ошибка при получении топа пользователей"
@@ -523,50 +510,44 @@ async def profile_command(message: Message):
         
         target_user = message.reply_to_message.from_user if message.reply_to_message else message.from_user
         
-        async with AsyncSessionLocal() as session:
-            query = select(UserStats).where(
-                UserStats.user_id == target_user.id,
-                UserStats.chat_id == message.chat.id
-            )
-            result = await session.execute(query)
-            user_stats = result.scalar_one_or_none()
-            
-            chat_member = await message.chat.get_member(target_user.id)
-            
-            status_emoji = {
-                'creator': '👑 Владелец',
-                'administrator': '⭐️ Администратор',
-                'member': '👤 Участник',
-                'restricted': '⚠️ Ограничен',
-                'left': '🚶‍♂️ Покинул чат',
-                'banned': '🚫 Заблокирован'
-            }.get(chat_member.status, '❓ Неизвестно')
-            
-            profile_text = [
-                "<b>👤 Профиль пользователя:</b>",
-                f"• Имя: {html.escape(target_user.full_name)}",
-                f"• ID: <code>{target_user.id}</code>",
-                f"• Статус: {status_emoji}",
-                f"• Юзернейм: {f'@{target_user.username}' if target_user.username else 'отсутствует'}"
-            ]
-            
-            if user_stats:
-                messages = format_number(user_stats.message_count)
-                profile_text.extend([
-                    "",
-                    "<b>Статистика в чате:</b>",
-                    f"• Сообщений: <code>{messages}</code>"
-                ])
-            else:
-                profile_text.append("\n<b>Статистика:</b> данные отсутствуют")
-            
-            await message.reply(
-                "\n".join(profile_text),
-                parse_mode='HTML'
-            )
-            
-            logger.info(f"Профиль успешно отправлен для пользователя {target_user.id}")
-            
+        # Счётчик из топа в памяти: включает ещё не записанные в базу сообщения
+        message_count = await leaderboard.count(message.chat.id, target_user.id)
+        chat_member = await message.chat.get_member(target_user.id)
+        
+        status_emoji = {
+            'creator': '👑 Владелец',
+            'administrator': '⭐️ Администратор',
+            'member': '👤 Участник',
+            'restricted': '⚠️ Ограничен',
+            'left': '🚶‍♂️ Покинул чат',
+            'banned': '🚫 Заблокирован'
+        }.get(chat_member.status, '❓ Неизвестно')
+        
+        profile_text = [
+            "<b>👤 Профиль пользователя:</b>",
+            f"• Имя: {html.escape(target_user.full_name)}",
+            f"• ID: <code>{target_user.id}</code>",
+            f"• Статус: {status_emoji}",
+            f"• Юзернейм: {f'@{target_user.username}' if target_user.username else 'отсутствует'}"
+        ]
+        
+        if message_count is not None:
+            messages = format_number(message_count)
+            profile_text.extend([
+                "",
+                "<b>Статистика в чате:</b>",
+                f"• Сообщений: <code>{messages}</code>"
+            ])
+        else:
+            profile_text.append("\n<b>Статистика:</b> данные отсутствуют")
+        
+        await message.reply(
+            "\n".join(profile_text),
+            parse_mode='HTML'
+        )
+        
+        logger.info(f"Профиль успешно отправлен для пользователя {target_user.id}")
+        
     except Exception as e:
         error_msg = "Произошла ошибка при получении информации о профиле"
         logger.error(f"{error_msg}: {str(e)}", exc_info=True)
@@ -1,3 +1,10 @@
+from .chat_gate import chat_gate
+from .error_handler import error_handler
+from .message_stats import message_stats
+from .metrics import api_metrics, handler_metrics, update_metrics
+from .profiler import profiler
+from .request_scheduler import request_scheduler
 from .spam_filter import spam_filter
+from .user_tracking import user_tracker
 
-__all__ = ['spam_filter'] 
\ No newline at end of file
+__all__ = ['chat_gate', 'error_handler', 'message_stats', 'api_metrics', 'handler_metrics', 'update_metrics', 'profiler', 'request_scheduler', 'spam_filter', 'user_tracker']
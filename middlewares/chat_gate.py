@@ -0,0 +1,54 @@
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.event.bases import UNHANDLED
+from aiogram.types import Chat, Update
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Set
+from config import get_settings
+from utils.logger import BotLogger
+from utils.metrics import updates_dropped_total
+
+logger = BotLogger.get_logger()
+settings = get_settings()
+
+# Сколько посторонних чатов запоминать, чтобы писать о каждом в лог один раз
+MAX_REPORTED_CHATS = 1000
+
+
+class ChatAllowlistGate(BaseMiddleware):
+    """
+    Первая ступень обработки обновлений: всё из чатов вне списка отбрасывается
+    до спам-фильтра, фильтров роутеров, запросов к API и базе. Обновления без чата
+    (например, опросы) и, если разрешено, личные чаты проходят дальше.
+    """
+
+    def __init__(self, allowed: Iterable[int], allow_private: bool):
+        self.allowed = frozenset(allowed)
+        self.allow_private = allow_private
+        self.dropped = 0
+        self._reported: Set[int] = set()
+        super().__init__()
+
+    def is_allowed(self, chat: Optional[Chat]) -> bool:
+        if chat is None or chat.id in self.allowed:
+            return True
+        return self.allow_private and chat.type == "private"
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any]
+    ) -> Any:
+        # event_chat уже определён встроенным middleware aiogram, который стоит раньше
+        chat = data.get("event_chat")
+        if self.is_allowed(chat):
+            return await handler(event, data)
+
+        self.dropped += 1
+        updates_dropped_total.inc(event.event_type)
+        if chat.id not in self._reported and len(self._reported) < MAX_REPORTED_CHATS:
+            self._reported.add(chat.id)
+            logger.info(f"Ignoring updates from chat {chat.id} ({chat.type}) outside the allowlist")
+        return UNHANDLED
+
+
+chat_gate = ChatAllowlistGate(settings.allowed_chat_ids, settings.ALLOW_PRIVATE_CHATS)
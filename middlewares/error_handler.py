@@ -1,6 +1,7 @@
 from aiogram import BaseMiddleware
-from aiogram.types import TelegramObject
+from aiogram.types import Update
 from typing import Any, Awaitable, Callable
+from utils.error_notifier import error_notifier
 from utils.logger import BotLogger
 
 logger = BotLogger.get_logger()
@@ -8,22 +9,23 @@ logger = BotLogger.get_logger()
 class ErrorHandlerMiddleware(BaseMiddleware):
     async def __call__(
         self,
-        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
-        event: TelegramObject,
+        handler: Callable[[Update, dict[str, Any]], Awaitable[Any]],
+        event: Update,
         data: dict[str, Any]
     ) -> Any:
         try:
             return await handler(event, data)
         except Exception as e:
             logger.error(f"Ошибка при обработке события: {e}", exc_info=True)
-            # Отправляем уведомление администраторам в sharechat
-            from config import get_settings
-            settings = get_settings()
-            try:
-                await event.bot.send_message(
-                    chat_id=settings.SHARECHAT_ID,
-                    text=f"❗️ Произошла ошибка в боте:\n{str(e)}\n\nСобытие: {event}"
-                )
-            except Exception as notify_error:
-                logger.error(f"Не удалось отправить уведомление об ошибке: {notify_error}")
-            return None 
\ No newline at end of file
+            # Администраторы получат её в общей сводке в sharechat, а не отдельным сообщением
+            chat = data.get("event_chat")
+            user = data.get("event_from_user")
+            error_notifier.report(
+                e,
+                f"{event.event_type} #{event.update_id}"
+                f"{f', чат {chat.id}' if chat else ''}{f', пользователь {user.id}' if user else ''}"
+            )
+            return None
+
+
+error_handler = ErrorHandlerMiddleware()
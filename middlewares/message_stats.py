@@ -0,0 +1,51 @@
+from aiogram import BaseMiddleware
+from aiogram.types import Message
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Protocol
+from config import get_settings
+from utils.leaderboard import leaderboard
+from utils.message_counter import message_counter
+
+settings = get_settings()
+
+
+class StatsSink(Protocol):
+    """Получатель учтённых сообщений: счётчики в базе, топ в памяти и т.п."""
+
+    def add(self, chat_id: int, user_id: int) -> None:
+        ...
+
+
+class MessageStatsMiddleware(BaseMiddleware):
+    """
+    Учитывает текстовые сообщения чата chat_id ровно один раз, до роутеров и их фильтров,
+    без запросов к API: результат не зависит от того, какой обработчик заберёт сообщение.
+    """
+
+    def __init__(self, chat_id: int, sinks: Iterable[StatsSink] = ()):
+        self.chat_id = chat_id
+        self.sinks: List[StatsSink] = list(sinks)
+        super().__init__()
+
+    def add_sink(self, sink: StatsSink) -> None:
+        self.sinks.append(sink)
+
+    async def __call__(
+        self,
+        handler: Callable[[Message, Dict[str, Any]], Awaitable[Any]],
+        event: Message,
+        data: Dict[str, Any]
+    ) -> Any:
+        # Сообщения от имени каналов и анонимных админов не относятся к участникам
+        if (
+            event.chat.id == self.chat_id
+            and event.text
+            and event.from_user is not None
+            and event.sender_chat is None
+        ):
+            for sink in self.sinks:
+                sink.add(event.chat.id, event.from_user.id)
+        return await handler(event, data)
+
+
+# Счётчик копится в памяти и пишется в базу пачками в фоне, топ обновляется сразу
+message_stats = MessageStatsMiddleware(settings.CHAT_ID, [message_counter, leaderboard])
@@ -0,0 +1,96 @@
+import time
+from typing import Any, Awaitable, Callable, Dict
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.dispatcher.event.handler import HandlerObject
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import Response, TelegramType
+from aiogram.types import TelegramObject, Update
+from utils.metrics import (
+    api_errors_total,
+    api_request_duration,
+    handler_duration,
+    handler_errors_total,
+    update_duration,
+    updates_total,
+)
+from utils.profiling import record_await
+from utils.runtime_stats import runtime_monitor
+
+
+def handler_name(handler: HandlerObject) -> str:
+    """Имя обработчика для метрик и логов: модуль.функция"""
+    callback = handler.callback
+    module = getattr(callback, "__module__", "") or ""
+    return f"{module.rsplit('.', 1)[-1]}.{getattr(callback, '__name__', type(callback).__name__)}"
+
+
+class UpdateMetricsMiddleware(BaseMiddleware):
+    """Число обновлений и полное время их обработки по типу обновления, задержка доставки сообщений"""
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any]
+    ) -> Any:
+        update_type = event.event_type
+        updates_total.inc(update_type)
+        message = event.message or event.channel_post
+        if message is not None:
+            runtime_monitor.observe_delivery(message.date.timestamp())
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            update_duration.observe(time.perf_counter() - started, update_type)
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """Время выполнения и ошибки каждого обработчика (внутренний middleware)"""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        name = handler_name(data["handler"])
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception as e:
+            handler_errors_total.inc(name, type(e).__name__)
+            raise
+        finally:
+            handler_duration.observe(time.perf_counter() - started, name)
+
+
+class ApiMetricsMiddleware(BaseRequestMiddleware):
+    """Задержка и ошибки запросов к Bot API (без ожидания в очереди планировщика)"""
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        name = method.__api_method__
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception as e:
+            api_errors_total.inc(name, type(e).__name__)
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            api_request_duration.observe(elapsed, name)
+            record_await("api", elapsed)
+            # getUpdates висит до таймаута long polling и исказил бы перцентили
+            if name != "getUpdates":
+                runtime_monitor.api_latency.add(elapsed)
+
+
+update_metrics = UpdateMetricsMiddleware()
+handler_metrics = HandlerMetricsMiddleware()
+api_metrics = ApiMetricsMiddleware()
@@ -0,0 +1,125 @@
+import asyncio
+import html
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from aiogram import BaseMiddleware, Bot
+from aiogram.types import TelegramObject, Update
+from config import get_settings
+from middlewares.metrics import handler_name
+from utils.logger import BotLogger
+from utils.profiling import UpdateProfile, current_profile
+
+logger = BotLogger.get_logger()
+settings = get_settings()
+
+
+class HandlerTracker(BaseMiddleware):
+    """Внутренний middleware: записывает в профиль обновления, какой обработчик сработал"""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        profile = current_profile.get()
+        if profile is not None:
+            profile.handler = handler_name(data["handler"])
+        return await handler(event, data)
+
+
+class SlowHandlerProfiler(BaseMiddleware):
+    """
+    Замеряет обработку каждого обновления и пишет в лог медленные (дольше threshold)
+    с именем обработчика и разбивкой ожиданий: запросы к API, очередь лимитов API,
+    база данных и остальное (код обработчика и прочие await). Раз в digest_interval
+    секунд в SHARECHAT_ID уходит сводка самых медленных обработчиков.
+    """
+
+    def __init__(self, threshold: float, digest_interval: float, digest_top: int):
+        self.threshold = threshold
+        self.digest_interval = digest_interval
+        self.digest_top = digest_top
+        self.tracker = HandlerTracker()
+        # обработчик -> [вызовов, медленных, суммарное время, максимум] за текущий период
+        self._window: Dict[str, List[float]] = {}
+        self._task: Optional[asyncio.Task] = None
+        super().__init__()
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any]
+    ) -> Any:
+        profile = UpdateProfile(event.event_type)
+        token = current_profile.set(profile)
+        try:
+            return await handler(event, data)
+        finally:
+            current_profile.reset(token)
+            self._record(profile, time.perf_counter() - profile.started)
+
+    def _record(self, profile: UpdateProfile, elapsed: float) -> None:
+        name = profile.handler or f"<{profile.update_type}: no handler>"
+        stats = self._window.get(name)
+        if stats is None:
+            stats = self._window[name] = [0, 0, 0.0, 0.0]
+        stats[0] += 1
+        stats[2] += elapsed
+        stats[3] = max(stats[3], elapsed)
+        if elapsed < self.threshold:
+            return
+
+        stats[1] += 1
+        awaited = sum(profile.awaits.values())
+        breakdown = ", ".join(f"{kind} {seconds:.3f}s" for kind, seconds in sorted(profile.awaits.items()))
+        logger.warning(
+            f"Slow {profile.update_type} update in {name}: {elapsed:.3f}s "
+            f"({breakdown + ', ' if breakdown else ''}other {max(elapsed - awaited, 0):.3f}s)"
+        )
+
+    def digest(self) -> Optional[str]:
+        """Сводка за период по обработчикам с медленными вызовами; None, если их не было"""
+        slow = [(name, stats) for name, stats in self._window.items() if stats[1]]
+        if not slow:
+            return None
+
+        slow.sort(key=lambda item: item[1][3], reverse=True)
+        lines = [f"🐢 <b>Медленные обработчики (дольше {self.threshold:g} с)</b>\n"]
+        for i, (name, (calls, slow_calls, total, longest)) in enumerate(slow[:self.digest_top], 1):
+            lines.append(
+                f"{i}. <code>{html.escape(name)}</code>: {int(slow_calls)} из {int(calls)}, "
+                f"макс {longest:.2f} с, сред {total / calls:.2f} с"
+            )
+        return "\n".join(lines)
+
+    async def _run(self, bot: Bot) -> None:
+        while True:
+            await asyncio.sleep(self.digest_interval)
+            text = self.digest()
+            self._window = {}
+            if text is None:
+                continue
+            try:
+                await bot.send_message(settings.SHARECHAT_ID, text, parse_mode="HTML")
+            except Exception as e:
+                logger.error(f"Failed to send slow handlers digest: {e}")
+
+    def start(self, bot: Bot) -> None:
+        """Запускает периодическую отправку сводки"""
+        if self._task is None and self.digest_interval > 0:
+            self._task = asyncio.create_task(self._run(bot))
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+# Общий экземпляр профилировщика
+profiler = SlowHandlerProfiler(
+    threshold=settings.PROFILER_SLOW_THRESHOLD,
+    digest_interval=settings.PROFILER_DIGEST_INTERVAL,
+    digest_top=settings.PROFILER_DIGEST_TOP,
+)
@@ -0,0 +1,315 @@
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import (
+    BanChatMember,
+    BanChatSenderChat,
+    CopyMessage,
+    CopyMessages,
+    DeleteMessage,
+    DeleteMessages,
+    EditMessageCaption,
+    EditMessageLiveLocation,
+    EditMessageMedia,
+    EditMessageReplyMarkup,
+    EditMessageText,
+    ForwardMessage,
+    ForwardMessages,
+    RestrictChatMember,
+    SendAnimation,
+    SendAudio,
+    SendContact,
+    SendDice,
+    SendDocument,
+    SendGame,
+    SendInvoice,
+    SendLocation,
+    SendMediaGroup,
+    SendMessage,
+    SendPaidMedia,
+    SendPhoto,
+    SendPoll,
+    SendSticker,
+    SendVenue,
+    SendVideo,
+    SendVideoNote,
+    SendVoice,
+    StopMessageLiveLocation,
+    StopPoll,
+    TelegramMethod,
+    UnbanChatMember,
+)
+from aiogram.methods.base import Response, TelegramType
+from cachetools import LRUCache
+from config import get_settings
+from utils.logger import BotLogger
+from utils.metrics import registry
+from utils.profiling import record_await
+
+logger = BotLogger.get_logger()
+settings = get_settings()
+
+# Модерация обслуживается раньше косметических ответов и не тратит лимит сообщений чата
+PRIORITY_MODERATION = 0
+PRIORITY_MESSAGE = 1
+
+MODERATION_METHODS = (
+    BanChatMember,
+    BanChatSenderChat,
+    DeleteMessage,
+    DeleteMessages,
+    RestrictChatMember,
+    UnbanChatMember,
+)
+# Методы, которые отправляют или редактируют сообщения в чате. Явный список, а не префикс:
+# SendChatAction, EditForumTopic, EditChatInviteLink и т.п. лимит сообщений чата не тратят
+MESSAGE_METHODS = (
+    SendMessage, SendPhoto, SendAudio, SendDocument, SendVideo, SendAnimation,
+    SendVoice, SendVideoNote, SendMediaGroup, SendLocation, SendVenue, SendContact,
+    SendPoll, SendDice, SendSticker, SendInvoice, SendGame, SendPaidMedia,
+    CopyMessage, CopyMessages, ForwardMessage, ForwardMessages,
+    EditMessageText, EditMessageCaption, EditMessageMedia, EditMessageReplyMarkup,
+    EditMessageLiveLocation, StopMessageLiveLocation, StopPoll,
+)
+
+
+class RequestQueueFull(Exception):
+    """Очередь исходящих сообщений переполнена, запрос отклонён без отправки"""
+
+
+class TokenBucket:
+    """
+    Ведро токенов с резервированием: баланс может уйти в минус,
+    тогда reserve() возвращает, сколько ждать своей очереди.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Сколько ждать до появления свободного токена"""
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def reserve(self, now: float) -> float:
+        """Занимает токен и возвращает задержку до момента, когда им можно воспользоваться"""
+        self._refill(now)
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def pause(self, seconds: float, now: float) -> None:
+        """Не выдавать токены ближайшие seconds секунд (ответ 429 с retry_after)"""
+        self._refill(now)
+        self.tokens = min(self.tokens, 0) - seconds * self.rate
+
+
+class OutgoingRequestScheduler(BaseRequestMiddleware):
+    """
+    Middleware сессии бота, через которое проходят все запросы к Bot API.
+
+    Отправка и редактирование сообщений ограничиваются ведром токенов
+    своего чата (группы и личные чаты с разными лимитами), затем все
+    ограничиваемые запросы проходят через общее ведро бота. В общей очереди
+    модерация (бан, мут, удаление) обслуживается раньше обычных сообщений.
+    На 429 запрос повторяется после retry_after, а ведро чата (или общее)
+    ставится на паузу, чтобы остальные запросы не получили ту же ошибку.
+    Прочие методы (getUpdates, getChatMember и т.п.) проходят без ограничений.
+    Ожидающих сообщений не больше max_queue: сверх этого отправка сразу
+    отклоняется с RequestQueueFull, модерация в очередь проходит всегда.
+    """
+
+    def __init__(
+        self,
+        global_rate: float,
+        group_rate: float,
+        private_rate: float,
+        burst: int,
+        max_retries: int,
+        max_queue: int = 0,
+        stats_every: int = 0,
+    ):
+        self.global_bucket = TokenBucket(rate=global_rate, capacity=global_rate)
+        self.group_rate = group_rate
+        self.private_rate = private_rate
+        self.burst = burst
+        self.max_retries = max_retries
+        self.max_queue = max_queue
+        self.stats_every = stats_every
+        self._chat_buckets: LRUCache = LRUCache(maxsize=10000)
+
+        # Ожидающие общего токена: (приоритет, порядковый номер, future)
+        self._queue: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._dispatcher: Optional[asyncio.Task] = None
+
+        self.waiting = 0
+        # Ожидающие по приоритетам: [модерация, сообщения]
+        self.waiting_by_priority = [0, 0]
+        self.rejected = 0
+        self.requests = 0
+        self.delayed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.flood_errors = 0
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            # Положительные id - личные чаты, отрицательные - группы и каналы
+            rate = self.private_rate if chat_id > 0 else self.group_rate
+            bucket = self._chat_buckets[chat_id] = TokenBucket(rate=rate, capacity=self.burst)
+        return bucket
+
+    @staticmethod
+    def _classify(method: TelegramMethod) -> Tuple[Optional[int], Optional[int]]:
+        """Приоритет запроса и чат, лимит которого он тратит; (None, None) - без ограничений"""
+        if isinstance(method, MODERATION_METHODS):
+            return PRIORITY_MODERATION, None
+        if isinstance(method, MESSAGE_METHODS):
+            chat_id = getattr(method, "chat_id", None)
+            # Инлайн-сообщения и каналы по username лимитом чата не ограничиваем
+            return PRIORITY_MESSAGE, chat_id if isinstance(chat_id, int) else None
+        return None, None
+
+    async def _acquire_global(self, priority: int) -> None:
+        if not self._queue and self.global_bucket.delay(time.monotonic()) == 0:
+            self.global_bucket.reserve(time.monotonic())
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (priority, next(self._sequence), waiter))
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        await waiter
+
+    async def _dispatch(self) -> None:
+        """Выдаёт общие токены ожидающим в порядке приоритета"""
+        while self._queue:
+            delay = self.global_bucket.delay(time.monotonic())
+            if delay > 0:
+                # Очередь разбираем после сна: за это время могла прийти модерация
+                await asyncio.sleep(delay)
+                continue
+            _, _, waiter = heapq.heappop(self._queue)
+            if waiter.done():
+                continue
+            self.global_bucket.reserve(time.monotonic())
+            waiter.set_result(None)
+
+    async def _acquire(self, priority: int, chat_id: Optional[int]) -> None:
+        started = time.monotonic()
+        self.waiting += 1
+        self.waiting_by_priority[priority] += 1
+        try:
+            if chat_id is not None:
+                delay = self._chat_bucket(chat_id).reserve(started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            await self._acquire_global(priority)
+        finally:
+            self.waiting -= 1
+            self.waiting_by_priority[priority] -= 1
+            # Учитываем и ожидание, прерванное отменой обработки обновления
+            waited = time.monotonic() - started
+            if waited > 0.001:
+                self.delayed += 1
+                self.total_wait += waited
+                self.max_wait = max(self.max_wait, waited)
+                record_await("api_wait", waited)
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        priority, chat_id = self._classify(method)
+        if priority is None:
+            return await make_request(bot, method)
+
+        if (
+            self.max_queue
+            and priority == PRIORITY_MESSAGE
+            and self.waiting_by_priority[PRIORITY_MESSAGE] >= self.max_queue
+        ):
+            self.rejected += 1
+            raise RequestQueueFull(
+                f"{type(method).__name__} rejected: {self.max_queue} outgoing messages already waiting"
+            )
+
+        self.requests += 1
+        if self.stats_every and self.requests % self.stats_every == 0:
+            logger.info(f"Outgoing request scheduler stats: {self.get_stats()}")
+
+        attempt = 0
+        while True:
+            await self._acquire(priority, chat_id)
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                self.flood_errors += 1
+                attempt += 1
+                logger.warning(
+                    f"Flood control on {type(method).__name__} in chat {chat_id}: "
+                    f"retry after {e.retry_after} s (attempt {attempt}/{self.max_retries})"
+                )
+                if attempt > self.max_retries:
+                    raise
+                bucket = self._chat_bucket(chat_id) if chat_id is not None else self.global_bucket
+                bucket.pause(e.retry_after, time.monotonic())
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "queue_depth": self.waiting,
+            "rejected": self.rejected,
+            "delayed": self.delayed,
+            "avg_wait": self.total_wait / self.delayed if self.delayed else 0.0,
+            "max_wait": self.max_wait,
+            "flood_errors": self.flood_errors,
+        }
+
+
+# Общий экземпляр планировщика запросов
+request_scheduler = OutgoingRequestScheduler(
+    global_rate=settings.API_GLOBAL_RATE,
+    group_rate=settings.API_GROUP_RATE / 60,
+    private_rate=settings.API_PRIVATE_RATE,
+    burst=settings.API_CHAT_BURST,
+    max_retries=settings.API_MAX_RETRIES,
+    max_queue=settings.API_MAX_QUEUE,
+    stats_every=settings.API_STATS_EVERY,
+)
+
+registry.gauge_callback(
+    "bot_api_queue_depth", "Outgoing requests waiting for a rate-limit token, by priority",
+    lambda: {
+        ("moderation",): request_scheduler.waiting_by_priority[PRIORITY_MODERATION],
+        ("message",): request_scheduler.waiting_by_priority[PRIORITY_MESSAGE],
+    },
+    ["priority"],
+)
+registry.gauge_callback(
+    "bot_api_requests_rejected_total", "Outgoing messages rejected because the queue was full",
+    lambda: {(): request_scheduler.rejected}, type_name="counter",
+)
+registry.gauge_callback(
+    "bot_api_queue_wait_seconds_max", "Longest time an outgoing request waited for a token",
+    lambda: {(): request_scheduler.max_wait},
+)
+registry.gauge_callback(
+    "bot_api_flood_errors_total", "429 responses received from Telegram",
+    lambda: {(): request_scheduler.flood_errors}, type_name="counter",
+)
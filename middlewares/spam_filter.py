@@ -1,19 +1,46 @@
 from aiogram import BaseMiddleware
 from aiogram.types import Message, Update
-from typing import Any, Awaitable, Callable, Dict
-from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, Optional
 import time
 from config import get_settings
 import asyncio
 from utils.logger import BotLogger
+from utils.member_cache import member_cache
+from utils.metrics import filter_verdicts_total
+from utils.rate_tracker import RateTracker, sweep_periodically
+from utils.scheduler import scheduler
 
 logger = BotLogger.get_logger()
 settings = get_settings()
 
 class SpamFilter(BaseMiddleware):
     def __init__(self):
-        self.user_messages = defaultdict(list)
+        # Частота сообщений пользователей в скользящем окне
+        self.user_messages = RateTracker(
+            window=settings.SPAM_TIME_WINDOW,
+            limit=settings.SPAM_MESSAGE_LIMIT,
+            max_keys=settings.SPAM_MAX_TRACKED_USERS
+        )
+        # Предупреждения за спам за последнюю минуту
+        self.user_warnings = RateTracker(
+            window=60,
+            limit=1,
+            max_keys=settings.SPAM_MAX_TRACKED_USERS
+        )
+        self._sweeper: Optional[asyncio.Task] = None
         super().__init__()  # Добавляем вызов конструктора родительского класса
+
+    def start(self) -> None:
+        """Запускает фоновую очистку неактивных пользователей"""
+        if self._sweeper is None:
+            self._sweeper = asyncio.create_task(
+                sweep_periodically([self.user_messages, self.user_warnings], settings.SPAM_SWEEP_INTERVAL)
+            )
+
+    def stop(self) -> None:
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            self._sweeper = None
         
     async def __call__(
         self,
@@ -34,7 +61,7 @@ class SpamFilter(BaseMiddleware):
             return await handler(event, data)
             
         try:
-            member = await event.chat.get_member(event.from_user.id)
+            member = await member_cache.get_member(event.bot, event.chat.id, event.from_user.id)
             if member.status in ['administrator', 'creator']:
                 return await handler(event, data)
         except Exception as e:
@@ -44,28 +71,15 @@ class SpamFilter(BaseMiddleware):
         current_time = time.time()
         user_id = event.from_user.id
         
-        # Очищаем старые сообщения
-        self.user_messages[user_id] = [
-            msg_time for msg_time in self.user_messages[user_id]
-            if current_time - msg_time < settings.SPAM_TIME_WINDOW
-        ]
-        
-        # Добавляем новое сообщение
-        self.user_messages[user_id].append(current_time)
-        
-        # Проверяем на спам
-        if len(self.user_messages[user_id]) > settings.SPAM_MESSAGE_LIMIT:
+        # Добавляем новое сообщение в окно и проверяем на спам
+        if self.user_messages.hit(user_id) > settings.SPAM_MESSAGE_LIMIT:
+            filter_verdicts_total.inc("spam_filter", "spam")
             try:
                 # Удаляем сообщение
                 await event.delete()
                 
                 # Если это повторный спам в течение минуты
-                recent_warns = [
-                    t for t in self.user_messages.get(f"warn_{user_id}", [])
-                    if current_time - t < 60  # 60 секунд = 1 минута
-                ]
-                
-                if recent_warns:
+                if self.user_warnings.count(user_id):
                     # Мутим пользователя на 10 минут
                     until_date = current_time + 600  # 600 секунд = 10 минут
                     await event.chat.restrict(
@@ -73,6 +87,7 @@ class SpamFilter(BaseMiddleware):
                         permissions={"can_send_messages": False},
                         until_date=until_date
                     )
+                    member_cache.invalidate(event.chat.id, user_id)
                     await event.answer(
                         f"🚫 Пользователь получает мут на 10 минут за повторный спам!"
                     )
@@ -82,18 +97,20 @@ class SpamFilter(BaseMiddleware):
                         "⚠️ Пожалуйста, не отправляйте сообщения слишком часто!"
                     )
                     # Сохраняем время предупреждения
-                    self.user_messages.setdefault(f"warn_{user_id}", []).append(current_time)
+                    self.user_warnings.hit(user_id)
                     
-                    # Удаляем предупреждение через некоторое время
-                    await asyncio.sleep(settings.SPAM_WARN_DELETION_DELAY)
-                    await warn_msg.delete()
+                    # Удаляем предупреждение через некоторое время, не задерживая обработку
+                    await scheduler.delete_later(
+                        warn_msg.chat.id, warn_msg.message_id, settings.SPAM_WARN_DELETION_DELAY
+                    )
                 
                 return None
                 
             except Exception as e:
                 logger.error(f"Ошибка при обработке спама: {e}")
                 return await handler(event, data)
-                
+
+        filter_verdicts_total.inc("spam_filter", "allowed")
         return await handler(event, data)
 
 # Создаем экземпляр фильтра
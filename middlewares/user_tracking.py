@@ -0,0 +1,20 @@
+from aiogram import BaseMiddleware
+from aiogram.types import Message
+from typing import Any, Awaitable, Callable, Dict
+from utils.user_directory import user_directory
+
+
+class UserTrackingMiddleware(BaseMiddleware):
+    """Обновляет справочник имён по отправителям проходящих сообщений"""
+
+    async def __call__(
+        self,
+        handler: Callable[[Message, Dict[str, Any]], Awaitable[Any]],
+        event: Message,
+        data: Dict[str, Any]
+    ) -> Any:
+        user_directory.observe(event.from_user)
+        return await handler(event, data)
+
+
+user_tracker = UserTrackingMiddleware()
@@ -0,0 +1,12 @@
+import os
+import sys
+
+# Обязательные настройки для импорта модулей бота без .env
+os.environ.setdefault("BOT_TOKEN", "42:TEST")
+os.environ.setdefault("CHAT_ID", "-1001")
+os.environ.setdefault("CHANNEL_ID", "-1002")
+os.environ.setdefault("SHARECHAT_ID", "-1003")
+os.environ.setdefault("OWNER_ID", "1")
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,42 @@
+import logging
+
+from utils.logger import SamplingFilter
+
+
+def make_record(level: int, module: str = "personal_commands", func: str = "handle_messages") -> logging.LogRecord:
+    record = logging.LogRecord("telegram_bot", level, f"{module}.py", 1, "message", None, None, func=func)
+    record.module = module
+    return record
+
+
+def make_filter(**overrides) -> SamplingFilter:
+    options = dict(
+        sample_rates={"personal_commands.handle_messages": 0.01},
+        rate=0,
+        burst=50,
+        keep_modules=["moderation"],
+    )
+    options.update(overrides)
+    return SamplingFilter(**options)
+
+
+def test_info_from_sampled_site_is_sampled():
+    sampling = make_filter()
+    kept = sum(sampling.filter(make_record(logging.INFO)) for _ in range(200))
+    assert kept == 2
+
+
+def test_error_from_sampled_site_is_always_kept():
+    sampling = make_filter()
+    assert all(sampling.filter(make_record(logging.ERROR)) for _ in range(200))
+
+
+def test_warning_from_muted_site_is_kept():
+    sampling = make_filter(sample_rates={"personal_commands.handle_messages": 0})
+    assert not sampling.filter(make_record(logging.INFO))
+    assert sampling.filter(make_record(logging.WARNING))
+
+
+def test_keep_modules_bypass_rate_limit():
+    sampling = make_filter(rate=1, burst=1)
+    assert all(sampling.filter(make_record(logging.INFO, "moderation", "handle_forbidden_words")) for _ in range(10))
@@ -0,0 +1,43 @@
+import pytest
+
+from filters.bad_word_filters import forbidden_word_checker
+from filters.text_normalizer import text_normalizer
+
+
+@pytest.mark.parametrize("text", [
+    "Did I win?",
+    "I win every time",
+    "I will win",
+    "Hello, I like it",
+    "Let it live",
+])
+def test_plain_english_is_clean(text):
+    assert forbidden_word_checker.check(text) == ()
+
+
+@pytest.mark.parametrize("text", [
+    "Привет! вин…",
+    "да! вина не моя",
+    "Супер! винтаж",
+    "Рад! Винил купил",
+    "Great! winner",
+    "6к подписчиков",
+    "за 3 дня",
+])
+def test_punctuation_and_numbers_are_clean(text):
+    assert forbidden_word_checker.check(text) == ()
+
+
+@pytest.mark.parametrize("text", ["1win", "1w1n", "1wln", "1 w i n", "1 win", "1w!n", "к@зин0", "ст@вки"])
+def test_leet_variants_match(text):
+    assert forbidden_word_checker.check(text)
+
+
+def test_i_and_l_fold_only_next_to_digits():
+    assert text_normalizer.normalize("I win") == "i win"
+    assert text_normalizer.normalize("1win") == "1w1n"
+
+
+def test_leet_digits_need_letters_around():
+    assert text_normalizer.normalize("6к") == "6к"
+    assert text_normalizer.normalize("п0рт") == "порт"
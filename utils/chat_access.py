@@ -0,0 +1,21 @@
+from functools import wraps
+from aiogram.types import Message
+from config import get_settings
+from utils.logger import BotLogger
+
+logger = BotLogger.get_logger()
+settings = get_settings()
+
+def allowed_chat_only():
+    """Команда работает только в основном чате (CHAT_ID)"""
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(message: Message, *args, **kwargs):
+            if message.chat.id != settings.CHAT_ID:
+                logger.warning(
+                    f"Попытка использования команды в неразрешенном чате: {message.chat.id}"
+                )
+                return
+            return await func(message, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -4,5 +4,9 @@ from utils.logger import BotLogger
 logger = BotLogger.get_logger()
 
 async def log_command(message: Message):
-    logger.info(f"Command {message.text} used by user {message.from_user.id} in chat {message.chat.id}")
+    # stacklevel=2: в записи указывается обработчик команды, по нему же работает прореживание
+    logger.info(
+        f"Command {message.text} used by user {message.from_user.id} in chat {message.chat.id}",
+        stacklevel=2
+    )
 
@@ -0,0 +1,87 @@
+import asyncio
+import os
+import time
+from typing import Optional
+import aiofiles
+import aiofiles.os
+
+
+class TextFileStore:
+    """
+    Текстовый файл с кэшем в памяти и асинхронным доступом через aiofiles.
+
+    Кэш сбрасывается при записи через store и при изменении mtime файла
+    (например, если его отредактировали вручную); mtime проверяется не чаще
+    раза в check_interval секунд. Запись атомарная: текст пишется во временный
+    файл рядом с целевым и подменяет его через os.replace, поэтому читатель
+    никогда не видит файл наполовину записанным.
+    """
+
+    def __init__(self, path: str, check_interval: float = 5.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._text: Optional[str] = None
+        self._mtime: Optional[float] = None
+        self._checked_at = 0.0
+        self._loaded = False
+        self._lock = asyncio.Lock()
+
+    async def _current_mtime(self) -> Optional[float]:
+        try:
+            return (await aiofiles.os.stat(self.path)).st_mtime
+        except FileNotFoundError:
+            return None
+
+    async def read(self) -> Optional[str]:
+        """Текст файла или None, если файла нет"""
+        now = time.monotonic()
+        if self._loaded and now - self._checked_at < self.check_interval:
+            return self._text
+
+        async with self._lock:
+            mtime = await self._current_mtime()
+            self._checked_at = time.monotonic()
+            if self._loaded and mtime == self._mtime:
+                return self._text
+
+            if mtime is None:
+                text = None
+            else:
+                try:
+                    async with aiofiles.open(self.path, 'r', encoding='utf-8') as f:
+                        text = await f.read()
+                except FileNotFoundError:
+                    text, mtime = None, None
+
+            self._text, self._mtime, self._loaded = text, mtime, True
+            return text
+
+    async def write(self, text: str) -> None:
+        """Атомарно заменяет содержимое файла"""
+        directory = os.path.dirname(self.path) or '.'
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+
+        async with self._lock:
+            await aiofiles.os.makedirs(directory, exist_ok=True)
+            try:
+                async with aiofiles.open(temp_path, 'w', encoding='utf-8') as f:
+                    await f.write(text)
+                    await f.flush()
+                    # Данные должны оказаться на диске до подмены файла
+                    await asyncio.get_running_loop().run_in_executor(None, os.fsync, f.fileno())
+                await aiofiles.os.replace(temp_path, self.path)
+            except BaseException:
+                try:
+                    await aiofiles.os.remove(temp_path)
+                except FileNotFoundError:
+                    pass
+                raise
+
+            self._text = text
+            self._mtime = await self._current_mtime()
+            self._checked_at = time.monotonic()
+            self._loaded = True
+
+
+# Текст для команды /about
+about_store = TextFileStore('data/about_text.txt')
@@ -0,0 +1,149 @@
+import asyncio
+import html
+import os
+import traceback
+from typing import Dict, Optional, Tuple
+from aiogram import Bot
+from config import get_settings
+from utils.logger import BotLogger
+
+logger = BotLogger.get_logger()
+settings = get_settings()
+
+# Корень проекта: по нему в трассировке ищется место ошибки в нашем коде
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Предел длины сообщения Telegram - 4096 символов, оставляем запас на разметку
+MAX_SUMMARY_LENGTH = 4000
+
+Fingerprint = Tuple[str, str]
+
+
+def _location(error: BaseException) -> str:
+    """Самый глубокий кадр трассировки из кода проекта (или последний, если такого нет)"""
+    frames = traceback.extract_tb(error.__traceback__)
+    if not frames:
+        return "unknown"
+    ours = [
+        frame for frame in frames
+        if frame.filename.startswith(PROJECT_ROOT) and "site-packages" not in frame.filename
+    ]
+    frame = (ours or frames)[-1]
+    path = os.path.relpath(frame.filename, PROJECT_ROOT) if frame.filename.startswith(PROJECT_ROOT) \
+        else os.path.basename(frame.filename)
+    return f"{frame.name} ({path}:{frame.lineno})"
+
+
+def _truncate(text: str, limit: int) -> str:
+    # Переводы строк схлопываются: тексты ошибок SQLAlchemy и т.п. бывают многострочными
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+class ErrorGroup:
+    """Ошибки с одним отпечатком за текущее окно"""
+
+    __slots__ = ("count", "message", "context")
+
+    def __init__(self, message: str, context: str):
+        self.count = 0
+        # Текст и контекст первой ошибки группы - как пример
+        self.message = message
+        self.context = context
+
+
+class ErrorNotifier:
+    """
+    Собирает ошибки обработки и раз в window секунд отправляет в SHARECHAT_ID
+    одну сводку вида «42× OperationalError in count_messages». Ошибки группируются
+    по типу и месту в коде, тексты обрезаются, отправка идёт из одной фоновой задачи,
+    поэтому лавина ошибок (например, при недоступной базе) не упирается в лимиты Telegram.
+    """
+
+    def __init__(self, window: float, max_groups: int, max_message: int):
+        self.window = window
+        self.max_groups = max_groups
+        self.max_message = max_message
+        self._groups: Dict[Fingerprint, ErrorGroup] = {}
+        # Ошибки, не поместившиеся в max_groups отпечатков
+        self._overflow = 0
+        self._bot: Optional[Bot] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def report(self, error: BaseException, context: str = "") -> None:
+        """Учитывает ошибку; не блокирует и не обращается к сети"""
+        key = (type(error).__name__, _location(error))
+        group = self._groups.get(key)
+        if group is None:
+            if len(self._groups) >= self.max_groups:
+                self._overflow += 1
+                return
+            group = self._groups[key] = ErrorGroup(
+                _truncate(str(error), self.max_message), _truncate(context, self.max_message)
+            )
+        group.count += 1
+
+    def summary(self) -> Optional[str]:
+        """Текст сводки за окно; None, если ошибок не было"""
+        if not self._groups and not self._overflow:
+            return None
+
+        groups = sorted(self._groups.items(), key=lambda item: item[1].count, reverse=True)
+        total = sum(group.count for _, group in groups) + self._overflow
+        text = f"❗️ <b>Ошибки в боте за {self.window:g} с: {total}</b>\n"
+        # Сводка собирается целыми блоками групп, чтобы обрезка не разорвала HTML-теги
+        omitted = self._overflow
+        for index, ((error_type, location), group) in enumerate(groups):
+            lines = [f"<b>{group.count}×</b> {html.escape(error_type)} in <code>{html.escape(location)}</code>"]
+            if group.message:
+                lines.append(f"<i>{html.escape(group.message)}</i>")
+            if group.context:
+                lines.append(html.escape(group.context))
+            block = "\n" + "\n".join(lines)
+            if len(text) + len(block) > MAX_SUMMARY_LENGTH:
+                omitted += sum(group.count for _, group in groups[index:])
+                break
+            text += block
+        if omitted:
+            text += f"\n\n…и ещё {omitted} ошибок других видов"
+        return text
+
+    async def flush(self) -> None:
+        text = self.summary()
+        self._groups = {}
+        self._overflow = 0
+        if text is None or self._bot is None:
+            return
+        try:
+            await self._bot.send_message(settings.SHARECHAT_ID, text, parse_mode="HTML")
+        except Exception as e:
+            logger.error(f"Не удалось отправить сводку ошибок: {e}")
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.window)
+            await self.flush()
+
+    def start(self, bot: Bot) -> None:
+        """Запускает периодическую отправку сводок"""
+        self._bot = bot
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Останавливает отправку и отправляет то, что накопилось"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+# Общий сборщик ошибок
+error_notifier = ErrorNotifier(
+    window=settings.ERROR_NOTIFY_WINDOW,
+    max_groups=settings.ERROR_NOTIFY_MAX_GROUPS,
+    max_message=settings.ERROR_NOTIFY_MAX_MESSAGE,
+)
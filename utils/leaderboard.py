@@ -0,0 +1,234 @@
+import asyncio
+import heapq
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import func, select
+from database.database import AsyncSessionLocal
+from database.models import UserStats
+from database.repository import get_top_users
+from config import get_settings
+from utils.logger import BotLogger
+from utils.message_counter import message_counter
+
+logger = BotLogger.get_logger()
+settings = get_settings()
+
+
+class ChatLeaderboard:
+    """
+    Счётчики сообщений одного чата с поддерживаемым топом.
+
+    В топе держится не больше capacity участников. Счётчики только растут,
+    поэтому любой участник вне топа набрал не больше минимума топа: при
+    обновлении достаточно сравнить его с минимумом из кучи, это O(log capacity).
+    Устаревшие записи кучи пропускаются лениво и периодически вычищаются.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.counts: Dict[int, int] = {}
+        self.total = 0
+        self._top: Dict[int, int] = {}
+        # (счётчик, user_id) участников топа; запись актуальна, если совпадает с _top
+        self._heap: List[Tuple[int, int]] = []
+
+    def _min(self) -> Tuple[int, int]:
+        heap = self._heap
+        while heap[0][0] != self._top.get(heap[0][1]):
+            heapq.heappop(heap)
+        return heap[0]
+
+    def _push(self, user_id: int, count: int) -> None:
+        self._top[user_id] = count
+        heapq.heappush(self._heap, (count, user_id))
+        if len(self._heap) > 4 * self.capacity:
+            self._heap = [(count, user_id) for user_id, count in self._top.items()]
+            heapq.heapify(self._heap)
+
+    def add(self, user_id: int, delta: int = 1) -> None:
+        count = self.counts.get(user_id, 0) + delta
+        self.counts[user_id] = count
+        self.total += delta
+
+        if user_id in self._top or len(self._top) < self.capacity:
+            self._push(user_id, count)
+            return
+
+        min_count, min_user_id = self._min()
+        if count > min_count:
+            heapq.heappop(self._heap)
+            del self._top[min_user_id]
+            self._push(user_id, count)
+
+    def top(self, limit: int) -> List[Tuple[int, int]]:
+        """Первые limit участников как (user_id, счётчик)"""
+        return heapq.nlargest(limit, self._top.items(), key=lambda item: (item[1], -item[0]))
+
+
+class Leaderboard:
+    """
+    Топы активности по чатам в памяти, чтобы /top и /stats не сканировали user_stats.
+
+    При запуске прогревается из таблицы, дальше обновляется вместе со счётчиком
+    сообщений. В памяти всегда таблица плюс ещё не записанный буфер MessageCounter,
+    и периодическая сверка проверяет именно это: при расхождении чат перезагружается
+    из базы. Пока прогрев не удался, запросы обслуживаются из базы как раньше.
+    """
+
+    def __init__(self, capacity: int, check_interval: float):
+        self.capacity = capacity
+        self.check_interval = check_interval
+        self._chats: Dict[int, ChatLeaderboard] = {}
+        self.ready = False
+        self._task: Optional[asyncio.Task] = None
+
+    def add(self, chat_id: int, user_id: int, delta: int = 1) -> None:
+        if not self.ready:
+            return
+        board = self._chats.get(chat_id)
+        if board is None:
+            board = self._chats[chat_id] = ChatLeaderboard(self.capacity)
+        board.add(user_id, delta)
+
+    async def top(self, chat_id: int, limit: int) -> List[Tuple[int, int]]:
+        """Самые активные участники чата как (user_id, число сообщений)"""
+        if self.ready:
+            board = self._chats.get(chat_id)
+            return board.top(limit) if board else []
+
+        async with AsyncSessionLocal() as session:
+            rows = await get_top_users(session, chat_id, limit)
+        return [(user_stat.user_id, user_stat.message_count) for user_stat, _ in rows]
+
+    async def total(self, chat_id: int) -> int:
+        """Всего сообщений в чате"""
+        if self.ready:
+            board = self._chats.get(chat_id)
+            return board.total if board else 0
+
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                select(func.coalesce(func.sum(UserStats.message_count), 0))
+                .where(UserStats.chat_id == chat_id)
+            )
+        return result.scalar()
+
+    async def count(self, chat_id: int, user_id: int) -> Optional[int]:
+        """Сообщений участника в чате с учётом незаписанного буфера; None, если он ещё не писал"""
+        if self.ready:
+            board = self._chats.get(chat_id)
+            return board.counts.get(user_id) if board else None
+
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                select(UserStats.message_count).where(
+                    UserStats.chat_id == chat_id,
+                    UserStats.user_id == user_id,
+                )
+            )
+            stored = result.scalar_one_or_none()
+        pending = message_counter.pending_for(chat_id, user_id)
+        if stored is None and not pending:
+            return None
+        return (stored or 0) + pending
+
+    async def _load_chat(self, session, chat_id: int) -> ChatLeaderboard:
+        board = ChatLeaderboard(self.capacity)
+        result = await session.stream(
+            select(UserStats.user_id, UserStats.message_count).where(UserStats.chat_id == chat_id)
+        )
+        async for user_id, count in result:
+            board.add(user_id, count or 0)
+        return board
+
+    async def warm(self) -> None:
+        """Загружает счётчики всех чатов из базы"""
+        async with message_counter.hold():
+            async with AsyncSessionLocal() as session:
+                result = await session.execute(select(UserStats.chat_id).distinct())
+                chats = {chat_id: await self._load_chat(session, chat_id) for chat_id in result.scalars()}
+            # Добавляем то, что уже посчитано, но ещё не записано
+            for chat_id, pending in message_counter.pending_by_chat().items():
+                board = chats.setdefault(chat_id, ChatLeaderboard(self.capacity))
+                for user_id, delta in pending.items():
+                    board.add(user_id, delta)
+            self._chats = chats
+            self.ready = True
+        logger.info(f"Leaderboard warmed up for {len(chats)} chats")
+
+    async def check(self) -> int:
+        """Сверяет итоги и топ каждого чата с таблицей, возвращает число перезагруженных чатов"""
+        await message_counter.flush()
+        reloaded = 0
+        async with message_counter.hold():
+            async with AsyncSessionLocal() as session:
+                result = await session.execute(
+                    select(UserStats.chat_id, func.coalesce(func.sum(UserStats.message_count), 0))
+                    .group_by(UserStats.chat_id)
+                )
+                totals = dict(result.all())
+
+                for chat_id in set(totals) | set(self._chats):
+                    board = self._chats.get(chat_id)
+                    top_ids = [user_id for user_id, _ in board.top(self.capacity)] if board else []
+                    result = await session.execute(
+                        select(UserStats.user_id, UserStats.message_count).where(
+                            UserStats.chat_id == chat_id,
+                            UserStats.user_id.in_(top_ids),
+                        )
+                    )
+                    stored = dict(result.all())
+
+                    # Таблица не меняется, пока держим блокировку записи, а буфер
+                    # и счётчики в памяти читаем вместе, без await между ними
+                    pending = message_counter.pending_by_chat().get(chat_id, {})
+                    consistent = (
+                        board is not None
+                        and board.total == totals.get(chat_id, 0) + sum(pending.values())
+                        and all(
+                            board.counts.get(user_id, 0) == stored.get(user_id, 0) + pending.get(user_id, 0)
+                            for user_id in top_ids
+                        )
+                    )
+                    if consistent:
+                        continue
+
+                    logger.warning(f"Leaderboard of chat {chat_id} diverged from user_stats, reloading")
+                    board = await self._load_chat(session, chat_id)
+                    for user_id, delta in message_counter.pending_by_chat().get(chat_id, {}).items():
+                        board.add(user_id, delta)
+                    self._chats[chat_id] = board
+                    reloaded += 1
+        return reloaded
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.check_interval)
+            try:
+                if self.ready:
+                    await self.check()
+                else:
+                    await self.warm()
+            except Exception as e:
+                logger.error(f"Leaderboard consistency check failed: {e}")
+
+    async def start(self) -> None:
+        """Прогревает топы и запускает периодическую сверку"""
+        if self._task is not None:
+            return
+        try:
+            await self.warm()
+        except Exception as e:
+            logger.error(f"Failed to warm up leaderboard, serving from database: {e}")
+        self._task = asyncio.create_task(self._run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+# Общий экземпляр топа
+leaderboard = Leaderboard(
+    capacity=settings.LEADERBOARD_SIZE,
+    check_interval=settings.LEADERBOARD_CHECK_INTERVAL,
+)
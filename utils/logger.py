@@ -1,10 +1,128 @@
+import atexit
 import logging
 import os
-from logging.handlers import RotatingFileHandler
-from typing import Optional
+import queue
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, Iterable, List, Optional
+from config import get_settings
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    Кладёт записи в ограниченную очередь, не блокируя event loop.
+    Если очередь переполнена, запись отбрасывается и учитывается;
+    число потерянных записей попадает в лог при первой успешной постановке.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._unreported = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            self._unreported += 1
+            return
+
+        if self._unreported:
+            notice = logging.LogRecord(
+                record.name, logging.WARNING, __file__, 0,
+                f"Log queue overflow: {self._unreported} records dropped", None, None
+            )
+            try:
+                self.queue.put_nowait(notice)
+                self._unreported = 0
+            except queue.Full:
+                pass
+
+
+class BlockingSentinelListener(QueueListener):
+    """QueueListener, который дожидается места в очереди для сигнала остановки"""
+
+    def enqueue_sentinel(self) -> None:
+        self.queue.put(self._sentinel)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Прореживает частые записи по месту вызова (модуль.функция).
+
+    Для мест из sample_rates сохраняется только указанная доля записей.
+    Остальные записи уровня INFO и ниже ограничиваются ведром токенов на место
+    вызова: rate записей в секунду с запасом burst. Предупреждения, ошибки и
+    записи из модулей модерации (keep_modules) не отбрасываются никогда, в том
+    числе с мест вызова с заданной долей. К следующей сохранённой записи
+    добавляется число пропущенных.
+    """
+
+    def __init__(self, sample_rates: Dict[str, float], rate: float, burst: int, keep_modules: Iterable[str]):
+        super().__init__()
+        # место вызова -> сохранять каждую N-ю запись
+        self.sample_every = {site: max(1, round(1 / share)) for site, share in sample_rates.items() if share > 0}
+        self.muted = {site for site, share in sample_rates.items() if share <= 0}
+        self.rate = rate
+        self.burst = burst
+        self.keep_modules = set(keep_modules)
+        # место вызова -> [токены, время обновления]
+        self._buckets: Dict[str, List[float]] = {}
+        self._seen: Dict[str, int] = {}
+        self._suppressed: Dict[str, int] = {}
+        self.total_suppressed = 0
+
+    def _allow(self, site: str, record: logging.LogRecord) -> bool:
+        # Проверяется до доли места вызова: ошибки из прореживаемого обработчика тоже нужны
+        if record.levelno >= logging.WARNING or record.module in self.keep_modules:
+            return True
+        if site in self.muted:
+            return False
+
+        every = self.sample_every.get(site)
+        if every is not None:
+            seen = self._seen.get(site, 0)
+            self._seen[site] = seen + 1
+            if seen % every:
+                return False
+
+        if self.rate <= 0:
+            return True
+        now = time.monotonic()
+        bucket = self._buckets.get(site)
+        if bucket is None:
+            bucket = self._buckets[site] = [self.burst, now]
+        tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+        bucket[1] = now
+        if tokens < 1:
+            bucket[0] = tokens
+            return False
+        bucket[0] = tokens - 1
+        return True
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        site = f"{record.module}.{record.funcName}"
+        if not self._allow(site, record):
+            self._suppressed[site] = self._suppressed.get(site, 0) + 1
+            self.total_suppressed += 1
+            return False
+
+        suppressed = self._suppressed.pop(site, 0)
+        if suppressed:
+            record.msg = f"{record.getMessage()} [{suppressed} similar messages suppressed]"
+            record.args = None
+        return True
+
 
 class BotLogger:
     _instance: Optional[logging.Logger] = None
+    _queue_handler: Optional[DroppingQueueHandler] = None
+    _listener: Optional[QueueListener] = None
+    _sampling_filter: Optional[SamplingFilter] = None
+
+    # Записей в очереди на запись в файл; при переполнении новые отбрасываются
+    QUEUE_SIZE = 10000
 
     @staticmethod
     def setup() -> logging.Logger:
@@ -35,14 +153,68 @@ class BotLogger:
         file_handler.setFormatter(formatter)
         file_handler.setLevel(logging.INFO)
 
-        # Добавляем только файловый обработчик к логгеру
-        logger.addHandler(file_handler)
+        # Запись в файл и ротация идут в отдельном потоке, а не в event loop:
+        # логгер только кладёт записи в очередь
+        log_queue: queue.Queue = queue.Queue(maxsize=BotLogger.QUEUE_SIZE)
+        queue_handler = DroppingQueueHandler(log_queue)
+        # Фильтр стоит до очереди: отброшенные записи даже не форматируются
+        sampling_filter = BotLogger._create_sampling_filter()
+        if sampling_filter is not None:
+            queue_handler.addFilter(sampling_filter)
+        listener = BlockingSentinelListener(log_queue, file_handler, respect_handler_level=True)
+        listener.start()
+
+        logger.addHandler(queue_handler)
 
+        BotLogger._queue_handler = queue_handler
+        BotLogger._sampling_filter = sampling_filter
+        BotLogger._listener = listener
         BotLogger._instance = logger
+        # Дописываем очередь, даже если shutdown() не был вызван явно
+        atexit.register(BotLogger.shutdown)
         return logger
 
+    @staticmethod
+    def _create_sampling_filter() -> Optional[SamplingFilter]:
+        settings = get_settings()
+        if not settings.LOG_SAMPLING_ENABLED:
+            return None
+        return SamplingFilter(
+            sample_rates=settings.LOG_SAMPLE_RATES,
+            rate=settings.LOG_RATE_LIMIT,
+            burst=settings.LOG_RATE_BURST,
+            keep_modules=settings.LOG_KEEP_MODULES,
+        )
+
     @staticmethod
     def get_logger() -> logging.Logger:
         if BotLogger._instance is None:
             return BotLogger.setup()
-        return BotLogger._instance
\ No newline at end of file
+        return BotLogger._instance
+
+    @staticmethod
+    def shutdown() -> None:
+        """
+        Дописывает оставшиеся в очереди записи и останавливает поток записи.
+        Записи после остановки пишутся в файл напрямую.
+        """
+        listener = BotLogger._listener
+        if listener is None:
+            return
+        BotLogger._listener = None
+        listener.stop()
+
+        logger = BotLogger._instance
+        logger.removeHandler(BotLogger._queue_handler)
+        for handler in listener.handlers:
+            logger.addHandler(handler)
+
+    @staticmethod
+    def get_stats() -> Dict[str, int]:
+        handler = BotLogger._queue_handler
+        sampling_filter = BotLogger._sampling_filter
+        return {
+            "queued": handler.queue.qsize() if handler else 0,
+            "dropped": handler.dropped if handler else 0,
+            "suppressed": sampling_filter.total_suppressed if sampling_filter else 0,
+        }
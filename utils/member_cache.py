@@ -0,0 +1,102 @@
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+from aiogram import Bot
+from aiogram.types import ChatMember
+from cachetools import TTLCache
+from config import get_settings
+from utils.metrics import registry
+
+settings = get_settings()
+
+
+class MemberCache:
+    """
+    Кэш статусов участников чата с TTL, общий для спам-фильтра и проверок прав.
+    Одновременные запросы одного и того же участника объединяются в один вызов API.
+    Записи сбрасываются по обновлениям chat_member/my_chat_member и после
+    собственных действий бота (бан, мут, разбан).
+    """
+
+    def __init__(self, ttl: float, maxsize: int):
+        self._members: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._admins: TTLCache = TTLCache(maxsize=1024, ttl=ttl)
+        self._inflight: Dict[Tuple[int, int], asyncio.Future] = {}
+
+        self.hits = 0
+        self.misses = 0
+
+    async def get_member(self, bot: Bot, chat_id: int, user_id: int) -> ChatMember:
+        key = (chat_id, user_id)
+        member = self._members.get(key)
+        if member is not None:
+            self.hits += 1
+            return member
+
+        self.misses += 1
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(bot.get_chat_member(chat_id, user_id))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done, key=key: self._on_loaded(key, done))
+        # shield: отмена одного ожидающего не должна отменять запрос для остальных
+        return await asyncio.shield(task)
+
+    def _on_loaded(self, key: Tuple[int, int], task: asyncio.Future) -> None:
+        # Забираем исключение в любом случае, иначе asyncio предупредит о необработанной ошибке
+        failed = task.cancelled() or task.exception() is not None
+        # Если запись сбросили, пока запрос был в полёте, результат уже устарел
+        if self._inflight.get(key) is not task:
+            return
+        del self._inflight[key]
+        if not failed:
+            self._members[key] = task.result()
+
+    async def get_administrators(self, bot: Bot, chat_id: int) -> List[ChatMember]:
+        admins = self._admins.get(chat_id)
+        if admins is not None:
+            self.hits += 1
+            return admins
+
+        self.misses += 1
+        admins = await bot.get_chat_administrators(chat_id)
+        self._admins[chat_id] = admins
+        return admins
+
+    def set_member(self, chat_id: int, member: ChatMember) -> None:
+        """Обновляет запись по свежему статусу из обновления chat_member"""
+        key = (chat_id, member.user.id)
+        self._inflight.pop(key, None)
+        self._members[key] = member
+        self._admins.pop(chat_id, None)
+
+    def invalidate(self, chat_id: int, user_id: Optional[int] = None) -> None:
+        """Сбрасывает запись участника (или весь чат, если user_id не указан)"""
+        if user_id is None:
+            for key in [key for key in self._members if key[0] == chat_id]:
+                self._members.pop(key, None)
+            for key in [key for key in self._inflight if key[0] == chat_id]:
+                self._inflight.pop(key, None)
+        else:
+            self._members.pop((chat_id, user_id), None)
+            self._inflight.pop((chat_id, user_id), None)
+        # Изменение статуса участника может изменить и список администраторов
+        self._admins.pop(chat_id, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": len(self._members),
+        }
+
+
+# Общий экземпляр кэша
+member_cache = MemberCache(ttl=settings.MEMBER_CACHE_TTL, maxsize=settings.MEMBER_CACHE_SIZE)
+
+registry.gauge_callback(
+    "bot_member_cache_requests_total", "Chat member cache lookups, by result",
+    lambda: {("hit",): member_cache.hits, ("miss",): member_cache.misses},
+    ["result"], type_name="counter",
+)
@@ -0,0 +1,129 @@
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from database.database import AsyncSessionLocal
+from database.repository import bulk_add_message_counts
+from config import get_settings
+from utils.logger import BotLogger
+from utils.metrics import registry
+
+logger = BotLogger.get_logger()
+settings = get_settings()
+
+
+class MessageCounter:
+    """
+    Отложенная запись счётчиков сообщений.
+    Прирост по (chat_id, user_id) копится в памяти и сбрасывается в базу
+    одним upsert раз в flush_interval секунд или при накоплении max_pending строк.
+    """
+
+    def __init__(self, flush_interval: float, max_pending: int):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        # (chat_id, user_id) -> [прирост, дата последнего сообщения]
+        self._pending: Dict[Tuple[int, int], List] = {}
+        self._flush_needed = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def add(self, chat_id: int, user_id: int, date: Optional[datetime] = None) -> None:
+        """Учитывает одно сообщение, без обращения к базе"""
+        date = date or datetime.now(timezone.utc)
+        entry = self._pending.get((chat_id, user_id))
+        if entry is None:
+            self._pending[(chat_id, user_id)] = [1, date]
+            if len(self._pending) >= self.max_pending:
+                self._flush_needed.set()
+        else:
+            entry[0] += 1
+            entry[1] = date
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def pending_for(self, chat_id: int, user_id: int) -> int:
+        """Ещё не записанный прирост одного участника"""
+        entry = self._pending.get((chat_id, user_id))
+        return entry[0] if entry else 0
+
+    def pending_by_chat(self) -> Dict[int, Dict[int, int]]:
+        """Ещё не записанный прирост: chat_id -> {user_id: прирост}"""
+        by_chat: Dict[int, Dict[int, int]] = {}
+        for (chat_id, user_id), (delta, _) in self._pending.items():
+            by_chat.setdefault(chat_id, {})[user_id] = delta
+        return by_chat
+
+    @asynccontextmanager
+    async def hold(self) -> AsyncIterator[None]:
+        """Не даёт записывать буфер в базу, пока выполняется блок (для сверки с таблицей)"""
+        async with self._flush_lock:
+            yield
+
+    async def flush(self) -> int:
+        """Записывает накопленные счётчики в базу, возвращает число записанных строк"""
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+
+            batch, self._pending = self._pending, {}
+            rows = [
+                (chat_id, user_id, delta, last_date)
+                for (chat_id, user_id), (delta, last_date) in batch.items()
+            ]
+            try:
+                async with AsyncSessionLocal() as session:
+                    async with session.begin():
+                        await bulk_add_message_counts(session, rows)
+            except Exception as e:
+                logger.error(f"Error flushing message counters ({len(rows)} rows): {e}")
+                # Возвращаем несохранённый прирост в буфер, чтобы не потерять сообщения
+                for key, (delta, last_date) in batch.items():
+                    entry = self._pending.get(key)
+                    if entry is None:
+                        self._pending[key] = [delta, last_date]
+                    else:
+                        entry[0] += delta
+                return 0
+
+            return len(rows)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_needed.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_needed.clear()
+            # shield: отмена задачи при остановке не должна прерывать запись на середине
+            await asyncio.shield(self.flush())
+
+    def start(self) -> None:
+        """Запускает фоновую задачу периодической записи"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Останавливает фоновую задачу и записывает остаток буфера"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+# Общий экземпляр счётчика
+message_counter = MessageCounter(
+    flush_interval=settings.STATS_FLUSH_INTERVAL,
+    max_pending=settings.STATS_FLUSH_MAX_PENDING,
+)
+
+registry.gauge_callback(
+    "bot_message_counter_pending", "User/chat pairs with message counts not yet written to the database",
+    lambda: {(): message_counter.pending},
+)
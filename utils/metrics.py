@@ -0,0 +1,237 @@
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from aiohttp import web
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from config import get_settings
+from utils.logger import BotLogger
+from utils.profiling import record_await
+
+logger = BotLogger.get_logger()
+settings = get_settings()
+
+# Границы корзин гистограмм задержек, секунды
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    """Монотонный счётчик с метками"""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Histogram:
+    """Гистограмма с фиксированными корзинами; корзины суммируются только при выводе"""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # метки -> [счётчики корзин (последняя - +Inf), сумма, количество]
+        self._series: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def samples(self) -> Iterable[str]:
+        for labels, (counts, total, count) in self._series.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = 'le="%s"' % bound
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+            le = 'le="+Inf"'
+            yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {count}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}"
+
+
+class GaugeCallback:
+    """
+    Показатель, значения которого вычисляются при выводе (размеры очередей, кэшей).
+    Для счётчиков, которые компонент уже ведёт сам, указывается type_name="counter".
+    """
+
+    def __init__(self, name: str, documentation: str, callback: Callable[[], Dict[LabelValues, float]],
+                 labelnames: Sequence[str] = (), type_name: str = "gauge"):
+        self.name = name
+        self.type_name = type_name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in self.callback().items():
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class MetricsRegistry:
+    """Набор показателей бота и их вывод в текстовом формате Prometheus"""
+
+    def __init__(self):
+        self._metrics: List = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge_callback(self, name: str, documentation: str, callback: Callable[[], Dict[LabelValues, float]],
+                       labelnames: Sequence[str] = (), type_name: str = "gauge") -> GaugeCallback:
+        return self.register(GaugeCallback(name, documentation, callback, labelnames, type_name))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            try:
+                lines.extend(metric.samples())
+            except Exception as e:
+                # Ошибка в одном показателе не должна ломать весь вывод
+                logger.error(f"Failed to collect metric {metric.name}: {e}")
+        return "\n".join(lines) + "\n"
+
+
+# Общий реестр и показатели бота
+registry = MetricsRegistry()
+
+updates_total = registry.counter(
+    "bot_updates_total", "Updates received, by update type", ["type"]
+)
+update_duration = registry.histogram(
+    "bot_update_duration_seconds", "Full update processing time, by update type", ["type"]
+)
+updates_dropped_total = registry.counter(
+    "bot_updates_dropped_total", "Updates from chats outside the allowlist, dropped before processing", ["type"]
+)
+updates_rejected_total = registry.counter(
+    "bot_updates_rejected_total", "Webhook updates answered with 503 because the processing queue was full"
+)
+handler_duration = registry.histogram(
+    "bot_handler_duration_seconds", "Handler execution time", ["handler"]
+)
+handler_errors_total = registry.counter(
+    "bot_handler_errors_total", "Exceptions raised by handlers", ["handler", "error"]
+)
+filter_verdicts_total = registry.counter(
+    "bot_filter_verdicts_total", "Spam and content filter verdicts", ["filter", "verdict"]
+)
+db_query_duration = registry.histogram(
+    "bot_db_query_duration_seconds", "SQL statement execution time, by statement type", ["statement"]
+)
+api_request_duration = registry.histogram(
+    "bot_api_request_duration_seconds", "Telegram Bot API call latency", ["method"]
+)
+api_errors_total = registry.counter(
+    "bot_api_errors_total", "Failed Telegram Bot API calls", ["method", "error"]
+)
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Замеряет время SQL-запросов через события движка SQLAlchemy"""
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_start"].pop()
+        keyword = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "UNKNOWN"
+        elapsed = time.perf_counter() - started
+        db_query_duration.observe(elapsed, keyword)
+        record_await("db", elapsed)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _on_error(context):
+        # after_cursor_execute для упавшего запроса не вызывается
+        starts = context.connection.info.get("query_start") if context.connection is not None else None
+        if starts:
+            starts.pop()
+
+
+class MetricsServer:
+    """Локальный HTTP-сервер с /metrics в текстовом формате Prometheus"""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self._runner: Optional[web.AppRunner] = None
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        return web.Response(
+            body=registry.render().encode("utf-8"),
+            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+        )
+
+    async def start(self) -> None:
+        if self._runner is not None or not self.port:
+            return
+        app = web.Application()
+        app.router.add_get("/metrics", self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host=self.host, port=self.port).start()
+        logger.info(f"Metrics available at http://{self.host}:{self.port}/metrics")
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+# Общий экземпляр сервера показателей
+metrics_server = MetricsServer(host=settings.METRICS_HOST, port=settings.METRICS_PORT)
@@ -0,0 +1,61 @@
+import asyncio
+import cProfile
+import io
+import marshal
+import pstats
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+
+class UpdateProfile:
+    """Разбивка времени обработки одного обновления по видам ожидания"""
+
+    __slots__ = ("update_type", "handler", "started", "awaits")
+
+    def __init__(self, update_type: str):
+        self.update_type = update_type
+        self.handler: Optional[str] = None
+        self.started = time.perf_counter()
+        # вид ожидания (api, api_wait, db) -> секунды
+        self.awaits: Dict[str, float] = {}
+
+
+# Профиль обновления, которое обрабатывается в текущем контексте (и в порождённых им задачах)
+current_profile: ContextVar[Optional[UpdateProfile]] = ContextVar("current_profile", default=None)
+
+
+def record_await(kind: str, seconds: float) -> None:
+    """Добавляет время ожидания к профилю текущего обновления, если он есть"""
+    profile = current_profile.get()
+    if profile is not None:
+        profile.awaits[kind] = profile.awaits.get(kind, 0.0) + seconds
+
+
+_capture_lock = asyncio.Lock()
+
+
+def is_capturing() -> bool:
+    return _capture_lock.locked()
+
+
+async def capture_cprofile(seconds: float, top: int = 40) -> Tuple[str, bytes]:
+    """
+    Профилирует поток event loop в течение seconds секунд.
+    Возвращает текстовый отчёт (top функций по суммарному времени) и сырые данные
+    в формате .prof для snakeviz/pstats. Одновременно идёт только одна запись.
+    """
+    async with _capture_lock:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            profiler.disable()
+
+    profiler.create_stats()
+    # pstats.Stats забирает данные у профилировщика, поэтому сериализуем их заранее
+    raw = marshal.dumps(profiler.stats)
+    report = io.StringIO()
+    pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(top)
+    return report.getvalue(), raw
@@ -0,0 +1,97 @@
+import asyncio
+import time
+from typing import Dict, Hashable, List, Optional, Tuple, Union
+
+
+# Отметки времени ключа: одно событие хранится как float, несколько - как кортеж.
+# У большинства пользователей в окне одно сообщение, а float без кортежа
+# и списка вдвое-втрое дешевле по памяти.
+Events = Union[float, Tuple[float, ...]]
+
+
+class RateTracker:
+    """
+    Скользящее окно событий по ключу (например, сообщений пользователя) с ограниченной памятью.
+
+    Для каждого ключа хранится не больше limit + 1 последних отметок времени:
+    этого достаточно, чтобы понять, превышен ли лимит. Ключи лежат в обычном
+    dict в порядке последнего обращения (при обращении ключ переставляется
+    в конец): при превышении max_keys вытесняется самый давний, а sweep()
+    удаляет ключи без событий в текущем окне. На один ключ уходит меньше
+    памяти, чем в прежнем defaultdict(list), а общий объём ограничен max_keys.
+    """
+
+    def __init__(self, window: float, limit: int, max_keys: int):
+        self.window = window
+        self.limit = limit
+        self.max_keys = max_keys
+        self._events: Dict[Hashable, Events] = {}
+        self.evicted = 0
+
+    def _trim(self, events: Events, now: float) -> Tuple[float, ...]:
+        """Отметки ключа внутри окна"""
+        threshold = now - self.window
+        if events.__class__ is float:
+            return () if events <= threshold else (events,)
+        start = 0
+        while start < len(events) and events[start] <= threshold:
+            start += 1
+        return events[start:]
+
+    def _store(self, key: Hashable, events: Tuple[float, ...]) -> None:
+        self._events[key] = events[0] if len(events) == 1 else events
+
+    def hit(self, key: Hashable, now: Optional[float] = None) -> int:
+        """Регистрирует событие и возвращает число событий в окне (не больше limit + 1)"""
+        now = time.monotonic() if now is None else now
+        # pop и повторная вставка переносят ключ в конец порядка обращений
+        events = self._events.pop(key, None)
+        if events is None:
+            self._events[key] = now
+            if len(self._events) > self.max_keys:
+                del self._events[next(iter(self._events))]
+                self.evicted += 1
+            return 1
+
+        events = self._trim(events, now) + (now,)
+        if len(events) > self.limit + 1:
+            events = events[1:]
+        self._store(key, events)
+        return len(events)
+
+    def count(self, key: Hashable, now: Optional[float] = None) -> int:
+        """Число событий ключа в текущем окне, без регистрации нового"""
+        events = self._events.get(key)
+        if events is None:
+            return 0
+        now = time.monotonic() if now is None else now
+        return len(self._trim(events, now))
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Удаляет ключи без событий в окне, возвращает число удалённых"""
+        now = time.monotonic() if now is None else now
+        threshold = now - self.window
+        removed = 0
+        # Ключи упорядочены по последнему событию: idle-записи всегда в начале
+        while self._events:
+            key, events = next(iter(self._events.items()))
+            last = events if events.__class__ is float else events[-1]
+            if last > threshold:
+                break
+            del self._events[key]
+            removed += 1
+        return removed
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def get_stats(self) -> Dict[str, int]:
+        return {"tracked": len(self._events), "evicted": self.evicted}
+
+
+async def sweep_periodically(trackers: List[RateTracker], interval: float) -> None:
+    """Фоновая очистка неактивных ключей"""
+    while True:
+        await asyncio.sleep(interval)
+        for tracker in trackers:
+            tracker.sweep()
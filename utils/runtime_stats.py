@@ -0,0 +1,97 @@
+import asyncio
+import time
+from collections import deque
+from typing import Optional, Sequence, Tuple
+import psutil
+from config import get_settings
+from utils.logger import BotLogger
+from utils.metrics import registry
+
+logger = BotLogger.get_logger()
+settings = get_settings()
+
+
+class RollingWindow:
+    """Последние size значений; перцентили считаются только при запросе"""
+
+    def __init__(self, size: int):
+        self._values = deque(maxlen=size)
+
+    def add(self, value: float) -> None:
+        self._values.append(value)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def percentiles(self, quantiles: Sequence[float] = (50, 95, 99)) -> Optional[Tuple[float, ...]]:
+        if not self._values:
+            return None
+        ordered = sorted(self._values)
+        last = len(ordered) - 1
+        return tuple(ordered[min(last, int(q / 100 * len(ordered)))] for q in quantiles)
+
+    def max(self) -> Optional[float]:
+        return max(self._values) if self._values else None
+
+
+class RuntimeMonitor:
+    """
+    Скользящие окна задержек для /ping:
+    - отставание цикла событий: насколько позже заказанного просыпается sleep(interval);
+    - доставка обновлений: сейчас минус message.date (точность Telegram - секунда);
+    - время запросов к Bot API без ожидания в очереди лимитов и без getUpdates.
+    Фоновая задача заодно раз в cpu_interval секунд снимает загрузку CPU процессом.
+    """
+
+    def __init__(self, interval: float, window: int, cpu_interval: float):
+        self.interval = interval
+        self.cpu_interval = cpu_interval
+        self.loop_lag = RollingWindow(window)
+        self.delivery_delay = RollingWindow(window)
+        self.api_latency = RollingWindow(window)
+        self.process = psutil.Process()
+        self.cpu_percent: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        # Первый вызов cpu_percent без интервала только запоминает точку отсчёта
+        self.process.cpu_percent(None)
+        next_cpu = loop.time() + self.cpu_interval
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            now = loop.time()
+            self.loop_lag.add(max(now - expected, 0.0))
+            if now >= next_cpu:
+                self.cpu_percent = self.process.cpu_percent(None)
+                next_cpu = now + self.cpu_interval
+
+    def observe_delivery(self, sent_at: float) -> None:
+        self.delivery_delay.add(max(time.time() - sent_at, 0.0))
+
+    def start(self) -> None:
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+# Общий монитор задержек
+runtime_monitor = RuntimeMonitor(
+    interval=settings.RUNTIME_LAG_INTERVAL,
+    window=settings.RUNTIME_WINDOW_SIZE,
+    cpu_interval=settings.RUNTIME_CPU_INTERVAL,
+)
+
+registry.gauge_callback(
+    "bot_event_loop_lag_seconds_max", "Longest event loop lag within the rolling window",
+    lambda: {(): runtime_monitor.loop_lag.max() or 0.0},
+)
+registry.gauge_callback(
+    "bot_asyncio_tasks", "Pending asyncio tasks",
+    lambda: {(): len(asyncio.all_tasks())},
+)
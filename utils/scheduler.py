@@ -0,0 +1,156 @@
+import asyncio
+import heapq
+import itertools
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from aiogram import Bot
+from sqlalchemy import delete, select
+from database.database import AsyncSessionLocal
+from database.models import PendingDeletion
+from utils.logger import BotLogger
+
+logger = BotLogger.get_logger()
+
+# Telegram позволяет удалить не больше 100 сообщений одним запросом deleteMessages
+DELETE_BATCH_LIMIT = 100
+
+# Элемент очереди: (время удаления по Unix time, порядковый номер, id записи в базе, chat_id, message_id).
+# Порядковый номер нужен, чтобы задания с одинаковым временем не сравнивались по id записи (он может быть None)
+ScheduledDeletion = Tuple[float, int, Optional[int], int, int]
+
+
+class DeferredActionScheduler:
+    """
+    Планировщик отложенных действий бота (пока только удаление сообщений).
+
+    Все задания лежат в одной куче по времени выполнения, их обрабатывает
+    одна фоновая задача. Сообщения, которые пора удалить, группируются по чатам
+    и удаляются пачками через deleteMessages. Задания дублируются в таблицу
+    pending_deletions, поэтому после перезапуска предупреждения всё равно удаляются.
+    """
+
+    def __init__(self, batch_window: float = 1.0):
+        # Задания, до срока которых осталось меньше batch_window, выполняются вместе
+        self.batch_window = batch_window
+        self._heap: List[ScheduledDeletion] = []
+        self._sequence = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._bot: Optional[Bot] = None
+
+    async def delete_later(self, chat_id: int, message_id: int, delay: float) -> None:
+        """Планирует удаление сообщения через delay секунд"""
+        due = time.time() + delay
+        row_id = None
+        try:
+            async with AsyncSessionLocal() as session:
+                async with session.begin():
+                    row = PendingDeletion(
+                        chat_id=chat_id,
+                        message_id=message_id,
+                        delete_at=datetime.utcfromtimestamp(due)
+                    )
+                    session.add(row)
+                row_id = row.id
+        except Exception as e:
+            # Без базы задание всё равно выполнится, просто не переживёт перезапуск
+            logger.error(f"Failed to persist scheduled deletion of {chat_id}/{message_id}: {e}")
+
+        self._push(due, row_id, chat_id, message_id)
+
+    def _push(self, due: float, row_id: Optional[int], chat_id: int, message_id: int) -> None:
+        item = (due, next(self._sequence), row_id, chat_id, message_id)
+        heapq.heappush(self._heap, item)
+        # Будим воркер, только если новое задание стало ближайшим
+        if self._heap[0] is item:
+            self._wakeup.set()
+
+    @property
+    def pending(self) -> int:
+        return len(self._heap)
+
+    async def _load_pending(self) -> None:
+        """Восстанавливает задания, не выполненные до перезапуска"""
+        try:
+            async with AsyncSessionLocal() as session:
+                result = await session.execute(select(PendingDeletion))
+                rows = result.scalars().all()
+        except Exception as e:
+            logger.error(f"Failed to load pending deletions: {e}")
+            return
+
+        for row in rows:
+            due = (row.delete_at - datetime(1970, 1, 1)).total_seconds()
+            self._push(due, row.id, row.chat_id, row.message_id)
+        if rows:
+            logger.info(f"Restored {len(rows)} pending message deletions")
+
+    def _pop_due(self) -> List[ScheduledDeletion]:
+        limit = time.time() + self.batch_window
+        due = []
+        while self._heap and self._heap[0][0] <= limit:
+            due.append(heapq.heappop(self._heap))
+        return due
+
+    async def _execute(self, items: List[ScheduledDeletion]) -> None:
+        by_chat: Dict[int, List[int]] = {}
+        for _, _, _, chat_id, message_id in items:
+            by_chat.setdefault(chat_id, []).append(message_id)
+
+        for chat_id, message_ids in by_chat.items():
+            for start in range(0, len(message_ids), DELETE_BATCH_LIMIT):
+                chunk = message_ids[start:start + DELETE_BATCH_LIMIT]
+                try:
+                    await self._bot.delete_messages(chat_id=chat_id, message_ids=chunk)
+                except Exception as e:
+                    # Сообщение могли уже удалить вручную: повторять бессмысленно
+                    logger.error(f"Failed to delete messages {chunk} in chat {chat_id}: {e}")
+
+        row_ids = [row_id for _, _, row_id, _, _ in items if row_id is not None]
+        if row_ids:
+            try:
+                async with AsyncSessionLocal() as session:
+                    async with session.begin():
+                        await session.execute(delete(PendingDeletion).where(PendingDeletion.id.in_(row_ids)))
+            except Exception as e:
+                logger.error(f"Failed to clear {len(row_ids)} completed deletions: {e}")
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+
+            delay = self._heap[0][0] - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self._execute(self._pop_due())
+
+    async def start(self, bot: Bot) -> None:
+        """Загружает сохранённые задания и запускает воркер"""
+        if self._task is not None:
+            return
+        self._bot = bot
+        await self._load_pending()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Останавливает воркер; невыполненные задания остаются в базе до следующего запуска"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Общий экземпляр планировщика
+scheduler = DeferredActionScheduler()
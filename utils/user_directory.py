@@ -0,0 +1,187 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from aiogram import Bot
+from aiogram.types import User
+from cachetools import LRUCache
+from database.database import AsyncSessionLocal
+from database.models import TelegramUser
+from database.repository import bulk_upsert_users, get_users
+from config import get_settings
+from utils.logger import BotLogger
+from utils.member_cache import member_cache
+
+logger = BotLogger.get_logger()
+settings = get_settings()
+
+
+class UserDirectory:
+    """
+    Справочник имён пользователей (таблица users) для вывода топов и списков.
+
+    Имена берутся из from_user проходящих сообщений. Запись в базу отложенная:
+    пользователь попадает в буфер, только если его имя изменилось или запись
+    пора освежить, а буфер сбрасывается одним upsert раз в flush_interval секунд.
+    Для отсутствующих или устаревших записей resolve() параллельно запрашивает
+    участников через API, не больше refresh_concurrency запросов одновременно.
+    """
+
+    def __init__(self, flush_interval: float, stale_after: timedelta, refresh_concurrency: int, cache_size: int):
+        self.flush_interval = flush_interval
+        self.stale_after = stale_after
+        # Запись освежается в базе заранее, чтобы активные пользователи не считались устаревшими
+        self._touch_after = stale_after / 2
+        self._refresh_limit = asyncio.Semaphore(refresh_concurrency)
+        # id -> (username, полное имя, когда записано в базу или поставлено в буфер)
+        self._known: LRUCache = LRUCache(maxsize=cache_size)
+        # id -> (username, полное имя, время обновления), ожидающие записи
+        self._pending: Dict[int, Tuple[Optional[str], str, datetime]] = {}
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def observe(self, user: Optional[User]) -> None:
+        """Запоминает актуальное имя пользователя, без обращения к базе"""
+        if user is None or user.is_bot:
+            return
+        now = datetime.utcnow()
+        known = self._known.get(user.id)
+        if (
+            known is not None
+            and known[0] == user.username
+            and known[1] == user.full_name
+            and now - known[2] < self._touch_after
+        ):
+            return
+        self._known[user.id] = (user.username, user.full_name, now)
+        self._pending[user.id] = (user.username, user.full_name, now)
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    async def flush(self) -> int:
+        """Записывает накопленные имена в базу, возвращает число записанных строк"""
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+
+            batch, self._pending = self._pending, {}
+            rows = [
+                (user_id, username, full_name, updated_at)
+                for user_id, (username, full_name, updated_at) in batch.items()
+            ]
+            try:
+                async with AsyncSessionLocal() as session:
+                    async with session.begin():
+                        await bulk_upsert_users(session, rows)
+            except Exception as e:
+                logger.error(f"Error flushing user directory ({len(rows)} rows): {e}")
+                # Более свежие данные, пришедшие во время записи, не перетираем
+                for user_id, entry in batch.items():
+                    self._pending.setdefault(user_id, entry)
+                return 0
+
+            return len(rows)
+
+    def _is_fresh(self, record: Optional[TelegramUser]) -> bool:
+        return (
+            record is not None
+            and record.updated_at is not None
+            and datetime.utcnow() - record.updated_at < self.stale_after
+        )
+
+    async def _refresh(self, bot: Bot, chat_id: int, user_id: int) -> Optional[TelegramUser]:
+        async with self._refresh_limit:
+            try:
+                member = await member_cache.get_member(bot, chat_id, user_id)
+            except Exception as e:
+                logger.error(f"Failed to refresh user {user_id} in chat {chat_id}: {e}")
+                return None
+        self.observe(member.user)
+        return TelegramUser(
+            id=user_id,
+            username=member.user.username,
+            full_name=member.user.full_name,
+            updated_at=datetime.utcnow(),
+        )
+
+    async def resolve(
+        self,
+        bot: Bot,
+        chat_id: int,
+        records: Iterable[Tuple[int, Optional[TelegramUser]]],
+    ) -> Dict[int, TelegramUser]:
+        """
+        Возвращает записи справочника по id пользователей. Отсутствующие и устаревшие
+        записи обновляются через API; если обновить не удалось, остаётся то, что есть в базе.
+        """
+        resolved: Dict[int, TelegramUser] = {}
+        stale = []
+        for user_id, record in records:
+            if record is not None:
+                resolved[user_id] = record
+            if not self._is_fresh(record):
+                stale.append(user_id)
+
+        if stale:
+            refreshed = await asyncio.gather(*(self._refresh(bot, chat_id, user_id) for user_id in stale))
+            for user_id, record in zip(stale, refreshed):
+                if record is not None:
+                    resolved[user_id] = record
+        return resolved
+
+    async def get_users(self, bot: Bot, chat_id: int, user_ids: List[int]) -> Dict[int, TelegramUser]:
+        """
+        Записи справочника по id: сначала из памяти, недостающие одним запросом
+        к таблице users, отсутствующие и устаревшие - через resolve().
+        """
+        records: Dict[int, Optional[TelegramUser]] = {}
+        missing = []
+        for user_id in user_ids:
+            known = self._known.get(user_id)
+            if known is None:
+                missing.append(user_id)
+            else:
+                username, full_name, updated_at = known
+                records[user_id] = TelegramUser(
+                    id=user_id, username=username, full_name=full_name, updated_at=updated_at
+                )
+
+        if missing:
+            async with AsyncSessionLocal() as session:
+                for record in await get_users(session, missing):
+                    records[record.id] = record
+                    self._known.setdefault(record.id, (record.username, record.full_name, record.updated_at or datetime.min))
+
+        return await self.resolve(bot, chat_id, [(user_id, records.get(user_id)) for user_id in user_ids])
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            # shield: отмена задачи при остановке не должна прерывать запись на середине
+            await asyncio.shield(self.flush())
+
+    def start(self) -> None:
+        """Запускает фоновую задачу периодической записи"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Останавливает фоновую задачу и записывает остаток буфера"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+# Общий экземпляр справочника
+user_directory = UserDirectory(
+    flush_interval=settings.STATS_FLUSH_INTERVAL,
+    stale_after=timedelta(hours=settings.USER_DIRECTORY_STALE_HOURS),
+    refresh_concurrency=settings.USER_DIRECTORY_REFRESH_CONCURRENCY,
+    cache_size=settings.USER_DIRECTORY_CACHE_SIZE,
+)
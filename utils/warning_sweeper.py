@@ -0,0 +1,118 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+from database.database import AsyncSessionLocal
+from database.repository import decay_warnings, delete_empty_warnings, expire_warnings
+from config import get_settings
+from utils.logger import BotLogger
+from utils.metrics import registry
+
+logger = BotLogger.get_logger()
+settings = get_settings()
+
+
+class WarningSweeper:
+    """
+    Давность предупреждений. Раз в interval секунд записи без новых предупреждений
+    дольше decay обрабатываются пачками по batch_size строк одним UPDATE/DELETE на пачку
+    (по индексу last_warning):
+    - mode="decrement": снимается одно предупреждение, следующий срок отсчитывается заново;
+    - mode="expire": запись удаляется целиком.
+    Записи, где предупреждений не осталось, удаляются.
+    """
+
+    def __init__(self, decay: timedelta, mode: str, interval: float, batch_size: int):
+        if mode not in ("decrement", "expire"):
+            raise ValueError(f"Unknown warning decay mode: {mode}")
+        self.decay = decay
+        self.mode = mode
+        self.interval = interval
+        self.batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+
+        self.sweeps = 0
+        self.decayed_total = 0
+        self.deleted_total = 0
+        self.last_duration = 0.0
+
+    async def _in_batches(self, operation) -> int:
+        """Повторяет операцию над пачкой в отдельных транзакциях, пока пачки заполнены"""
+        total = 0
+        while True:
+            async with AsyncSessionLocal() as session:
+                async with session.begin():
+                    affected = await operation(session)
+            total += affected
+            if affected < self.batch_size:
+                return total
+            # Отдаём цикл событий обработке обновлений между пачками
+            await asyncio.sleep(0)
+
+    async def sweep(self) -> Tuple[int, int]:
+        """Один проход. Возвращает (снято по одному предупреждению, удалено записей)"""
+        started = time.perf_counter()
+        # Модели хранят время в наивном UTC
+        now = datetime.utcnow()
+        cutoff = now - self.decay
+
+        decayed = 0
+        deleted = 0
+        if self.mode == "expire":
+            deleted += await self._in_batches(
+                lambda session: expire_warnings(session, cutoff, self.batch_size)
+            )
+        else:
+            decayed = await self._in_batches(
+                lambda session: decay_warnings(session, cutoff, now, self.batch_size)
+            )
+        deleted += await self._in_batches(
+            lambda session: delete_empty_warnings(session, self.batch_size)
+        )
+
+        self.last_duration = time.perf_counter() - started
+        self.sweeps += 1
+        self.decayed_total += decayed
+        self.deleted_total += deleted
+        logger.info(
+            f"Warning sweep: {decayed} decremented, {deleted} deleted "
+            f"in {self.last_duration * 1000:.1f} ms"
+        )
+        return decayed, deleted
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.error(f"Warning sweep failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        """Запускает периодическую очистку (первый проход - сразу)"""
+        if self._task is None and self.decay > timedelta(0):
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+# Общий экземпляр очистки предупреждений
+warning_sweeper = WarningSweeper(
+    decay=timedelta(days=settings.WARNING_DECAY_DAYS),
+    mode=settings.WARNING_DECAY_MODE,
+    interval=settings.WARNING_SWEEP_INTERVAL,
+    batch_size=settings.WARNING_SWEEP_BATCH_SIZE,
+)
+
+registry.gauge_callback(
+    "bot_warning_sweep_duration_seconds", "Duration of the last warning decay sweep",
+    lambda: {(): warning_sweeper.last_duration},
+)
+registry.gauge_callback(
+    "bot_warnings_decayed_total", "Warnings removed by decay, by action",
+    lambda: {("decremented",): warning_sweeper.decayed_total, ("deleted",): warning_sweeper.deleted_total},
+    ["action"], type_name="counter",
+)
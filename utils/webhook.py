@@ -0,0 +1,139 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict
+from aiogram import BaseMiddleware, Bot, Dispatcher
+from aiogram.types import Update
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+from config import get_settings
+from utils.logger import BotLogger
+from utils.metrics import registry, updates_rejected_total
+
+logger = BotLogger.get_logger()
+settings = get_settings()
+
+
+class ConcurrencyLimitMiddleware(BaseMiddleware):
+    """
+    Ограничивает число одновременно обрабатываемых обновлений.
+    В режиме webhook каждое обновление обрабатывается в отдельной задаче,
+    и без ограничения всплеск запросов от Telegram запускает их все сразу.
+    Очередь ожидающих ограничена max_waiting: сверх неё запросы Telegram
+    отклоняются с 503 ещё до ответа 200 (он повторит доставку). Обновление,
+    на которое Telegram уже получил ответ 200, ждёт слота и не теряется.
+
+    Регистрируется первым update middleware, чтобы ожидание в очереди
+    не попадало во время обработки обновления и в медленные обработчики.
+    """
+
+    def __init__(self, limit: int, max_waiting: int):
+        self.limit = limit
+        self.max_waiting = max_waiting
+        self._semaphore = asyncio.Semaphore(limit)
+        self.in_flight = 0
+        self.waiting = 0
+        self.rejected = 0
+        super().__init__()
+
+    @property
+    def full(self) -> bool:
+        return self.waiting >= self.max_waiting
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any]
+    ) -> Any:
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.in_flight += 1
+        try:
+            return await handler(event, data)
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+
+# Общий ограничитель; подключается в setup_dispatcher, если задан WEBHOOK_URL
+concurrency_limiter = ConcurrencyLimitMiddleware(
+    settings.WEBHOOK_MAX_CONCURRENT_UPDATES,
+    settings.WEBHOOK_MAX_WAITING_UPDATES,
+)
+
+registry.gauge_callback(
+    "bot_webhook_updates", "Webhook updates being processed or waiting for a slot",
+    lambda: {("in_flight",): concurrency_limiter.in_flight, ("waiting",): concurrency_limiter.waiting},
+    ["state"],
+)
+
+
+class LimitedRequestHandler(SimpleRequestHandler):
+    """Отвечает Telegram 503, пока очередь ограничителя заполнена"""
+
+    def __init__(self, limiter: ConcurrencyLimitMiddleware, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.limiter = limiter
+
+    async def handle(self, request: web.Request) -> web.Response:
+        if self.limiter.full:
+            self.limiter.rejected += 1
+            updates_rejected_total.inc()
+            return web.Response(status=503, text="Too many pending updates")
+        return await super().handle(request)
+
+
+def create_app(dp: Dispatcher, bot: Bot, limiter: ConcurrencyLimitMiddleware) -> web.Application:
+    """Приложение aiohttp с обработчиком обновлений и проверкой состояния"""
+    app = web.Application()
+    started = time.monotonic()
+
+    LimitedRequestHandler(
+        limiter,
+        dispatcher=dp,
+        bot=bot,
+        # Отвечаем Telegram сразу, обработка идёт в фоне под ограничением limiter
+        handle_in_background=True,
+        secret_token=settings.WEBHOOK_SECRET,
+    ).register(app, path=settings.WEBHOOK_PATH)
+
+    async def health(request: web.Request) -> web.Response:
+        return web.json_response({
+            "status": "ok",
+            "uptime": round(time.monotonic() - started),
+            "updates_in_flight": limiter.in_flight,
+            "updates_waiting": limiter.waiting,
+            "updates_rejected": limiter.rejected,
+            "concurrency_limit": limiter.limit,
+            "max_waiting": limiter.max_waiting,
+        })
+
+    app.router.add_get(settings.WEBHOOK_HEALTH_PATH, health)
+    setup_application(app, dp, bot=bot)
+    return app
+
+
+async def run_webhook(dp: Dispatcher, bot: Bot) -> None:
+    """Регистрирует webhook в Telegram и обслуживает обновления до отмены задачи"""
+    app = create_app(dp, bot, concurrency_limiter)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host=settings.WEBHOOK_HOST, port=settings.WEBHOOK_PORT)
+    await site.start()
+
+    await bot.set_webhook(
+        url=settings.WEBHOOK_URL.rstrip("/") + settings.WEBHOOK_PATH,
+        secret_token=settings.WEBHOOK_SECRET,
+        allowed_updates=dp.resolve_used_update_types(),
+    )
+    logger.info(f"Webhook server listening on {settings.WEBHOOK_HOST}:{settings.WEBHOOK_PORT}{settings.WEBHOOK_PATH}")
+
+    try:
+        await asyncio.Event().wait()
+    finally:
+        # Webhook в Telegram не снимаем: следующий запуск получит накопившиеся обновления
+        await runner.cleanup()